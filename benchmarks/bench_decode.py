@@ -0,0 +1,111 @@
+"""
+Micro-benchmark of payload decoding: generic dict path, compiled extraction plans
+and typed fast path.
+
+Usage:
+    python benchmarks/bench_decode.py [--corpus DIR] [--pages N] [--repeat R]
+
+With `--corpus`, every *.json file in DIR is used as a recorded search
+response; otherwise synthetic pages shaped like real responses are generated.
+Prints records/second for each path.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+if BENCH_DIR not in sys.path:
+    sys.path.insert(0, BENCH_DIR)
+
+from extractors.fast_decoder import FastPayloadDecoder, orjson  # noqa: E402
+from extractors.tiktok_parser import TikTokUserScraper  # noqa: E402
+from payload_corpus import build_page  # noqa: E402
+
+def load_corpus(directory: str | None, pages: int) -> List[bytes]:
+    if directory:
+        bodies = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            with open(path, "rb") as f:
+                bodies.append(f.read())
+        return bodies
+    return [
+        json.dumps(build_page(f"kw{i % 10}", cursor=i * 30, count=30, total=10**9)).encode()
+        for i in range(pages)
+    ]
+
+def measure(
+    name: str,
+    bodies: List[bytes],
+    decode: Callable[[bytes], int],
+    repeat: int,
+) -> Dict[str, Any]:
+    best = float("inf")
+    records = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records = sum(decode(body) for body in bodies)
+        best = min(best, time.perf_counter() - start)
+    return {
+        "path": name,
+        "records": records,
+        "seconds": round(best, 6),
+        "records_per_second": round(records / best) if best else None,
+    }
+
+def run(corpus: str | None = None, pages: int = 200, repeat: int = 5) -> List[Dict[str, Any]]:
+    bodies = load_corpus(corpus, pages)
+    scraper = TikTokUserScraper(base_url="http://localhost", user_agent="bench")
+    decoder = FastPayloadDecoder()
+
+    results = [
+        measure(
+            "dict (json)",
+            bodies,
+            lambda body: len(scraper._parse_users_from_response(json.loads(body))),
+            repeat,
+        ),
+        measure(
+            "dict (plan)",
+            bodies,
+            lambda body: len(scraper._extract_page(json.loads(body))[0]),
+            repeat,
+        ),
+    ]
+    if orjson is not None:
+        results.append(
+            measure(
+                "dict (orjson)",
+                bodies,
+                lambda body: len(scraper._parse_users_from_response(orjson.loads(body))),
+                repeat,
+            )
+        )
+    if decoder.available:
+        results.append(
+            measure("typed (msgspec)", bodies, lambda body: len(decoder.decode(body).users), repeat)
+        )
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Payload decoding micro-benchmark")
+    parser.add_argument("--corpus", default=None, help="Directory of recorded *.json responses.")
+    parser.add_argument("--pages", type=int, default=200, help="Synthetic pages to generate.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions; best time is kept.")
+    args = parser.parse_args()
+
+    for result in run(args.corpus, args.pages, args.repeat):
+        print(
+            f"{result['path']:<18} {result['records']:>8} records "
+            f"{result['records_per_second']:>12,} records/s"
+        )
+
+if __name__ == "__main__":
+    main()
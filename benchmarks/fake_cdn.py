@@ -0,0 +1,130 @@
+"""
+Local stand-in for TikTok's avatar CDN, for exercising the avatar downloader.
+
+Every path is served as a small deterministic image, identical on every
+mirror, so several FakeCdn instances behave like the mirrors of one
+`url_list`. Each can add latency, answer random 5xx errors, or be switched
+`down` at runtime:
+
+    with FakeCdn(latency=0.5) as slow, FakeCdn() as fast:
+        url_list = [f"{cdn.url}/tos-avt/123~c5_100x100.webp" for cdn in (slow, fast)]
+"""
+
+import hashlib
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+_CONTENT_TYPES = {
+    ".webp": "image/webp",
+    ".jpeg": "image/jpeg",
+    ".jpg": "image/jpeg",
+    ".png": "image/png",
+}
+
+def image_bytes(path: str, size: int = 4096) -> bytes:
+    """
+    Deterministic body served for `path` (query string ignored).
+    """
+    seed = hashlib.sha256(path.split("?", 1)[0].encode("utf-8")).digest()
+    return (seed * (size // len(seed) + 1))[:size]
+
+class FakeCdn:
+    """
+    Configurable image server on a background thread.
+
+    - `latency` / `latency_jitter`: seconds of delay per request (uniform jitter).
+    - `error_rate`: probability of a 503 response.
+    - `down`: when True every request gets a 503 (toggle at runtime).
+    - `image_size`: bytes per image.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        image_size: int = 4096,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.image_size = image_size
+        self.down = False
+        self.stats: Dict[str, int] = {"requests": 0, "ok": 0, "errors": 0}
+        self.paths: List[str] = []
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeCdn":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeCdn":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _decide(self, path: str) -> float:
+        """
+        Delay before answering `path`, or -1 for an error.
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            self.paths.append(path)
+            if self.down or (self.error_rate and self._rng.random() < self.error_rate):
+                self.stats["errors"] += 1
+                return -1.0
+            self.stats["ok"] += 1
+            return self.latency + self._rng.uniform(0, self.latency_jitter)
+
+    def _make_handler(self) -> Any:
+        cdn = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                delay = cdn._decide(self.path)
+                if delay < 0:
+                    self._send(503, b"unavailable", "text/plain")
+                    return
+                if delay:
+                    time.sleep(delay)
+                extension = os.path.splitext(self.path.split("?", 1)[0])[1].lower()
+                self._send(
+                    200,
+                    image_bytes(self.path, cdn.image_size),
+                    _CONTENT_TYPES.get(extension, "application/octet-stream"),
+                )
+
+        return Handler
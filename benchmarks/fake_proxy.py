@@ -0,0 +1,137 @@
+"""
+Local stand-in for an HTTP forward proxy, for exercising the egress pool.
+
+Forwards plain-HTTP requests (absolute-URI form, as sent to a proxy) to
+their target and can add latency, random 502s, random 429s, or be switched
+`down` entirely at runtime. Typically chained in front of FakeTikTokServer:
+
+    with FakeTikTokServer() as server, FakeProxy(latency=0.05) as proxy:
+        pool = EgressPool([proxy.url], user_agent="bench")
+        pool.get(server.url, params={"keyword": "cats"})
+"""
+
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+# Forward to the target directly, never through proxies from the environment
+_OPENER = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+_RELAYED_HEADERS = ("Content-Type", "Content-Encoding", "Retry-After")
+
+class FakeProxy:
+    """
+    Configurable forward proxy on a background thread.
+
+    - `latency`: seconds added to every forwarded request.
+    - `error_rate`: probability of answering 502 without forwarding.
+    - `throttle_rate`: probability of answering 429 without forwarding.
+    - `down`: when True every request gets a 502 (toggle at runtime).
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.down = False
+        self.stats: Dict[str, int] = {"requests": 0, "forwarded": 0, "errors": 0, "throttled": 0}
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeProxy":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeProxy":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _decide(self) -> str:
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.down or self._rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return "error"
+            if self._rng.random() < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return "throttle"
+            self.stats["forwarded"] += 1
+            return "forward"
+
+    def _make_handler(self) -> Any:
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send(self, status: int, body: bytes, headers: Dict[str, str]) -> None:
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                decision = proxy._decide()
+                if decision == "error":
+                    self._send(502, b"bad gateway", {"Content-Type": "text/plain"})
+                    return
+                if decision == "throttle":
+                    self._send(429, b'{"status_code": 429}', {"Content-Type": "application/json"})
+                    return
+                if proxy.latency:
+                    time.sleep(proxy.latency)
+                request = urllib.request.Request(
+                    self.path,
+                    headers={
+                        k: v
+                        for k, v in self.headers.items()
+                        if k.lower() not in {"proxy-connection", "connection", "host"}
+                    },
+                )
+                try:
+                    with _OPENER.open(request, timeout=30) as upstream:
+                        body = upstream.read()
+                        status, upstream_headers = upstream.status, upstream.headers
+                except urllib.error.HTTPError as exc:
+                    body, status, upstream_headers = exc.read(), exc.code, exc.headers
+                except OSError:
+                    self._send(502, b"upstream unreachable", {"Content-Type": "text/plain"})
+                    return
+                headers = {
+                    name: upstream_headers[name]
+                    for name in _RELAYED_HEADERS
+                    if upstream_headers.get(name) is not None
+                }
+                self._send(status, body, headers)
+
+        return Handler
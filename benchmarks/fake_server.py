@@ -0,0 +1,242 @@
+"""
+Local stand-in for TikTok's `/api/search/user/full/` endpoint.
+
+Serves synthetic pages from payload_corpus with configurable latency,
+page sizes, pagination behaviour, random 5xx errors, bursts of 429s,
+stragglers and outages.
+It can be used from code (`with FakeTikTokServer(...) as server:`) or
+run standalone:
+
+    python benchmarks/fake_server.py --port 8765 --latency 0.05
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from payload_corpus import build_page
+
+SEARCH_PATH = "/api/search/user/full/"
+
+class FakeTikTokServer:
+    """
+    Configurable fake search server running on a background thread.
+
+    - `latency` / `latency_jitter`: seconds of delay per request (uniform jitter).
+    - `results_per_keyword` / `max_page_size`: how deep each keyword goes and
+      the most users returned per page regardless of the requested `count`.
+    - `cursor_style`: "int" (data.cursor), "string" (data.cursor as a digit
+      string) or "top_level" (cursor/hasMore at the top level).
+    - `error_rate`: probability of a 500 response.
+    - `straggler_rate` / `straggler_latency`: probability that a request
+      hangs for `straggler_latency` seconds instead of `latency`.
+    - `down`: when True every request gets a 503 (toggle at runtime).
+    - `burst_every` / `burst_length` / `retry_after`: after every
+      `burst_every` requests, answer the next `burst_length` with 429.
+    - `uid_space`: share creators across keywords so dedup has work to do.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        results_per_keyword: int = 300,
+        max_page_size: int = 30,
+        cursor_style: str = "int",
+        error_rate: float = 0.0,
+        straggler_rate: float = 0.0,
+        straggler_latency: float = 5.0,
+        burst_every: int = 0,
+        burst_length: int = 0,
+        retry_after: Optional[float] = 1.0,
+        uid_space: Optional[int] = None,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.results_per_keyword = results_per_keyword
+        self.max_page_size = max_page_size
+        self.cursor_style = cursor_style
+        self.error_rate = error_rate
+        self.straggler_rate = straggler_rate
+        self.straggler_latency = straggler_latency
+        self.down = False
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.uid_space = uid_space
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "ok": 0,
+            "errors": 0,
+            "throttled": 0,
+            "stragglers": 0,
+        }
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._burst_remaining = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{SEARCH_PATH}"
+
+    def start(self) -> "FakeTikTokServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeTikTokServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _decide(self) -> str:
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.down:
+                self.stats["errors"] += 1
+                return "down"
+            if self._burst_remaining:
+                self._burst_remaining -= 1
+                self.stats["throttled"] += 1
+                return "throttle"
+            if self.burst_every and self.stats["requests"] % self.burst_every == 0:
+                self._burst_remaining = max(self.burst_length - 1, 0)
+                self.stats["throttled"] += 1
+                return "throttle"
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return "error"
+            self.stats["ok"] += 1
+            delay = self.latency + self._rng.uniform(0, self.latency_jitter)
+            if self.straggler_rate and self._rng.random() < self.straggler_rate:
+                self.stats["stragglers"] += 1
+                delay = self.straggler_latency
+        return f"ok:{delay}"
+
+    def build_payload(self, keyword: str, cursor: int, count: int) -> Dict[str, Any]:
+        page_size = max(1, min(count, self.max_page_size))
+        payload = build_page(
+            keyword,
+            cursor=cursor,
+            count=page_size,
+            total=self.results_per_keyword,
+            uid_space=self.uid_space,
+        )
+        data = payload["data"]
+        if self.cursor_style == "string":
+            data["cursor"] = str(data["cursor"])
+        elif self.cursor_style == "top_level":
+            payload["cursor"] = data.pop("cursor")
+            payload["hasMore"] = bool(data.pop("has_more"))
+        return payload
+
+    def _make_handler(self) -> Any:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send(self, status: int, body: bytes, headers: Dict[str, str]) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                parsed = urlparse(self.path)
+                if parsed.path.rstrip("/") != SEARCH_PATH.rstrip("/"):
+                    self._send(404, b"{}", {})
+                    return
+                query = parse_qs(parsed.query)
+                keyword = query.get("keyword", [""])[0]
+                cursor = int(query.get("cursor", ["0"])[0] or 0)
+                count = int(query.get("count", ["30"])[0] or 30)
+
+                decision = server._decide()
+                if decision == "throttle":
+                    headers = {}
+                    if server.retry_after is not None:
+                        headers["Retry-After"] = str(server.retry_after)
+                    self._send(429, b'{"status_code": 429}', headers)
+                    return
+                if decision == "error":
+                    self._send(500, b'{"status_code": 500}', {})
+                    return
+                if decision == "down":
+                    self._send(503, b'{"status_code": 503}', {})
+                    return
+
+                delay = float(decision.split(":", 1)[1])
+                if delay:
+                    time.sleep(delay)
+                body = json.dumps(server.build_payload(keyword, cursor, count)).encode("utf-8")
+                self._send(200, body, {})
+
+        return Handler
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake TikTok user search server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--results-per-keyword", type=int, default=300)
+    parser.add_argument("--max-page-size", type=int, default=30)
+    parser.add_argument("--cursor-style", choices=["int", "string", "top_level"], default="int")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--straggler-rate", type=float, default=0.0)
+    parser.add_argument("--straggler-latency", type=float, default=5.0)
+    parser.add_argument("--burst-every", type=int, default=0)
+    parser.add_argument("--burst-length", type=int, default=0)
+    parser.add_argument("--uid-space", type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeTikTokServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        results_per_keyword=args.results_per_keyword,
+        max_page_size=args.max_page_size,
+        cursor_style=args.cursor_style,
+        error_rate=args.error_rate,
+        straggler_rate=args.straggler_rate,
+        straggler_latency=args.straggler_latency,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        uid_space=args.uid_space,
+    )
+    print(f"Serving fake TikTok search on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+if __name__ == "__main__":
+    main()
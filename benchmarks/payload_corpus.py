@@ -0,0 +1,155 @@
+"""
+Synthetic TikTok search payloads shaped like real `/api/search/user/full/` responses.
+
+Each user entry carries the fields the scraper keeps plus the many extra
+fields real responses include, so decoding cost is representative.
+
+    python benchmarks/payload_corpus.py DIR [--keywords N] [--pages-per-keyword N]
+
+writes a corpus of pages to DIR for replaying with `bench_decode.py --corpus`.
+"""
+
+import argparse
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+def build_user_entry(keyword: str, index: int, rng: random.Random | None = None) -> Dict[str, Any]:
+    rng = rng or random.Random(index)
+    uid = str(6_700_000_000_000_000_000 + index)
+    avatar_id = f"tos-maliva-avt-0068/{7_310_000_000_000_000_000 + index}"
+    followers = rng.randint(0, 50_000_000)
+    user_info: Dict[str, Any] = {
+        "uid": uid,
+        "short_id": "0",
+        "nickname": f"{keyword.title()} Creator {index}",
+        "signature": f"Posting about {keyword} every day #{index}",
+        "avatar_thumb": {
+            "uri": avatar_id,
+            "url_list": [
+                f"https://p16-sign-va.tiktokcdn.com/{avatar_id}~c5_100x100.webp",
+                f"https://p77-sign-va.tiktokcdn.com/{avatar_id}~c5_100x100.webp",
+                f"https://p16-sign-va.tiktokcdn.com/{avatar_id}~c5_100x100.jpeg",
+            ],
+            "width": 720,
+            "height": 720,
+        },
+        "follow_status": 0,
+        "custom_verify": "Verified account" if followers > 10_000_000 else "",
+        "unique_id": f"{keyword}_{index}",
+        "sec_uid": f"MS4wLjABAAAA{uid}{'x' * 40}",
+        "enterprise_verify_reason": "",
+        "region": "US",
+        "language": "en",
+        "is_star": False,
+        "room_id": 0,
+        "commerce_user_level": 0,
+        "verification_type": 1 if followers > 10_000_000 else 0,
+        "cover_url": [],
+        "item_list": None,
+        "type_label": [],
+        "ad_cover_url": None,
+        "relative_users": None,
+        "cha_list": None,
+        "need_points": None,
+        "homepage_bottom_toast": None,
+        "can_set_geofencing": None,
+        "white_cover_url": None,
+        "user_tags": None,
+        "bold_fields": None,
+        "search_highlight": None,
+        "mutual_relation_avatars": None,
+        "events": None,
+        "advance_feature_item_order": None,
+        "user_canceled": False,
+        "account_labels": None,
+        "social_info": "",
+    }
+    # Real responses carry dozens of feature flags we never read
+    for flag in range(40):
+        user_info[f"feature_flag_{flag}"] = rng.random() < 0.5
+    return {
+        "user_info": user_info,
+        "stats": {"follower_count": followers, "following_count": rng.randint(0, 5000)},
+        "follow_status": 0,
+        "platform_sync_info": None,
+        "position": None,
+        "uniqid_position": None,
+        "effects": None,
+        "musics": None,
+        "items": None,
+        "mix_list": None,
+        "challenges": None,
+    }
+
+def build_page(
+    keyword: str,
+    cursor: int,
+    count: int,
+    total: int,
+    uid_space: int | None = None,
+) -> Dict[str, Any]:
+    """
+    Build one search page for `keyword` starting at `cursor`.
+
+    `total` is the number of results the keyword has in all. `uid_space`
+    maps results into a shared pool of creators, so related keywords
+    return overlapping users. With None, every keyword's users are distinct.
+    """
+    end = min(cursor + count, total)
+    offset = sum(ord(c) for c in keyword) * 100_003
+    entries = []
+    for position in range(cursor, end):
+        index = (offset + position) % uid_space if uid_space else offset + position
+        entries.append(build_user_entry(keyword, index))
+    return {
+        "status_code": 0,
+        "data": {
+            "user_list": entries,
+            "cursor": end,
+            "has_more": 1 if end < total else 0,
+            "rid": f"bench-{keyword}-{cursor}",
+        },
+        "extra": {"now": 1_700_000_000_000, "logid": "bench", "fatal_item_ids": []},
+        "log_pb": {"impr_id": "bench"},
+    }
+
+def write_corpus(
+    directory: str,
+    keywords: int = 10,
+    pages_per_keyword: int = 20,
+    page_size: int = 30,
+    uid_space: int | None = None,
+) -> List[str]:
+    """
+    Write a corpus of search responses to `directory`, one *.json file per page.
+
+    The files can be replayed with `bench_decode.py --corpus DIR`; recorded
+    real responses dropped into the same directory are picked up the same way.
+    """
+    os.makedirs(directory, exist_ok=True)
+    total = pages_per_keyword * page_size
+    paths = []
+    for k in range(keywords):
+        keyword = f"kw{k}"
+        for page in range(pages_per_keyword):
+            payload = build_page(keyword, page * page_size, page_size, total, uid_space)
+            path = os.path.join(directory, f"{keyword}_{page:05d}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            paths.append(path)
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic search payload corpus")
+    parser.add_argument("directory")
+    parser.add_argument("--keywords", type=int, default=10)
+    parser.add_argument("--pages-per-keyword", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=30)
+    parser.add_argument("--uid-space", type=int, default=None)
+    args = parser.parse_args()
+    written = write_corpus(
+        args.directory, args.keywords, args.pages_per_keyword, args.page_size, args.uid_space
+    )
+    print(f"Wrote {len(written)} pages to {args.directory}")
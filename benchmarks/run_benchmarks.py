@@ -0,0 +1,569 @@
+"""
+End-to-end benchmark suite for the scraper.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--scenario NAME ...] [--output FILE]
+                                        [--compare BASELINE.json] [--tolerance 0.10]
+                                        [--min-speedup 3.0]
+
+Scenarios run against a local FakeTikTokServer and synthetic payloads, each
+in a fresh process so peak RSS is attributable to that scenario:
+
+- scrape_sync / scrape_async: pages/s and records/s through the real
+  request, retry, decode and pagination code.
+- scrape_speedup: the sync and async scrapers over the same keywords on
+  one server. The async scraper must be at least `--min-speedup` times
+  faster and return the same records for every keyword, otherwise the
+  exit status is 1.
+- scrape_faulty: the async scraper against random 5xx errors and 429 bursts.
+- scrape_stragglers: the async scraper with and without request hedging
+  against a server where `--straggler-rate` of requests hang for 50x the
+  normal latency.
+- scrape_outage: the async scraper with and without a circuit breaker
+  against a server that is down (503) for `--outage` seconds, counting
+  the requests each sends into the outage.
+- parse: records/s per decode path (see bench_decode.py).
+- export_<format>: MB/s and records/s streaming `--export-records` records
+  through each format's writer, one page (`--page-size`) at a time.
+- avatars: avatars/s downloading `--avatars` avatars from three FakeCdn
+  mirrors (slow and flaky, healthy, down), then re-running against the
+  filled store, which must not send a single request.
+
+Results are written as JSON (default: benchmarks/results/<timestamp>.json).
+With `--compare`, throughput that dropped or peak RSS that grew by more than
+`--tolerance` against a previous results file is reported as a regression and
+the exit status is 1.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+if BENCH_DIR not in sys.path:
+    sys.path.insert(0, BENCH_DIR)
+
+EXPORT_FORMATS = ("json", "jsonl", "csv", "xml", "xlsx", "html", "parquet", "feather", "sqlite")
+# Distinct records generated for the export scenarios; larger runs reuse them
+EXPORT_POOL_SIZE = 20000
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+def _rate(count: float, seconds: float) -> Optional[float]:
+    return round(count / seconds, 1) if seconds > 0 else None
+
+def _scrape(params: Dict[str, Any], concurrent: bool, faulty: bool) -> Dict[str, Any]:
+    from extractors.async_scraper import AsyncTikTokUserScraper
+    from extractors.metrics import ScrapeMetrics
+    from extractors.tiktok_parser import TikTokUserScraper
+    from fake_server import FakeTikTokServer
+
+    server_kwargs: Dict[str, Any] = {
+        "latency": params["latency"],
+        "latency_jitter": params["latency"] / 2,
+        "results_per_keyword": params["results_per_keyword"],
+        "max_page_size": params["page_size"],
+    }
+    if faulty:
+        server_kwargs.update(
+            error_rate=params["error_rate"],
+            burst_every=params["burst_every"],
+            burst_length=params["burst_length"],
+            retry_after=0.05,
+        )
+    keywords = [f"bench{i}" for i in range(params["keywords"])]
+    scraper_kwargs: Dict[str, Any] = {
+        "user_agent": "benchmark",
+        "sleep_between_requests": 0,
+        "max_retries": 5,
+        "backoff_base": 0.01,
+        "backoff_max": 0.2,
+        "fast_decode": params["fast_decode"],
+        "metrics": ScrapeMetrics() if params["metrics"] else None,
+    }
+
+    pages = records = 0
+    with FakeTikTokServer(**server_kwargs) as server:
+        if concurrent:
+            scraper: TikTokUserScraper = AsyncTikTokUserScraper(
+                base_url=server.url, max_concurrency=params["concurrency"], **scraper_kwargs
+            )
+            start = time.perf_counter()
+            for page in scraper.iter_many(keywords, params["max_items"]):
+                pages += 1
+                records += len(page.users)
+        else:
+            scraper = TikTokUserScraper(base_url=server.url, **scraper_kwargs)
+            start = time.perf_counter()
+            for keyword in keywords:
+                for page in scraper.iter_user_pages(keyword, params["max_items"]):
+                    pages += 1
+                    records += len(page.users)
+        elapsed = time.perf_counter() - start
+        server_stats = dict(server.stats)
+
+    return {
+        "seconds": round(elapsed, 3),
+        "pages": pages,
+        "records": records,
+        "pages_per_second": _rate(pages, elapsed),
+        "records_per_second": _rate(records, elapsed),
+        "requests": server_stats["requests"],
+        "throttled": server_stats["throttled"],
+        "errors": server_stats["errors"],
+    }
+
+def _speedup(params: Dict[str, Any]) -> Dict[str, Any]:
+    from extractors.async_scraper import AsyncTikTokUserScraper
+    from extractors.fast_decoder import as_plain_dict
+    from extractors.tiktok_parser import TikTokUserScraper
+    from fake_server import FakeTikTokServer
+
+    keywords = [f"bench{i}" for i in range(params["keywords"])]
+    scraper_kwargs: Dict[str, Any] = {
+        "user_agent": "benchmark",
+        "sleep_between_requests": 0,
+        "fast_decode": params["fast_decode"],
+    }
+    with FakeTikTokServer(
+        latency=params["latency"],
+        latency_jitter=params["latency"] / 2,
+        results_per_keyword=params["results_per_keyword"],
+        max_page_size=params["page_size"],
+    ) as server:
+        sync_records: Dict[str, List[Dict[str, Any]]] = {}
+        scraper = TikTokUserScraper(base_url=server.url, **scraper_kwargs)
+        start = time.perf_counter()
+        for keyword in keywords:
+            for page in scraper.iter_user_pages(keyword, params["max_items"]):
+                sync_records.setdefault(keyword, []).extend(map(as_plain_dict, page.users))
+        sync_seconds = time.perf_counter() - start
+
+        async_records: Dict[str, List[Dict[str, Any]]] = {}
+        scraper = AsyncTikTokUserScraper(
+            base_url=server.url, max_concurrency=params["concurrency"], **scraper_kwargs
+        )
+        start = time.perf_counter()
+        for page in scraper.iter_many(keywords, params["max_items"]):
+            async_records.setdefault(page.keyword, []).extend(map(as_plain_dict, page.users))
+        async_seconds = time.perf_counter() - start
+
+    return {
+        "sync_seconds": round(sync_seconds, 3),
+        "async_seconds": round(async_seconds, 3),
+        "records": sum(len(records) for records in async_records.values()),
+        "speedup": round(sync_seconds / async_seconds, 2) if async_seconds > 0 else None,
+        "records_match": async_records == sync_records,
+    }
+
+def _stragglers(params: Dict[str, Any]) -> Dict[str, Any]:
+    from extractors.async_scraper import AsyncTikTokUserScraper
+    from extractors.hedging import HedgePolicy
+    from extractors.metrics import ScrapeMetrics
+    from fake_server import FakeTikTokServer
+
+    latency = params["latency"]
+    keywords = [f"bench{i}" for i in range(params["keywords"])]
+    result: Dict[str, Any] = {}
+    for label, hedge in (("unhedged", None), ("hedged", HedgePolicy(min_delay=latency))):
+        metrics = ScrapeMetrics()
+        pages = 0
+        with FakeTikTokServer(
+            latency=latency,
+            latency_jitter=latency / 2,
+            results_per_keyword=params["results_per_keyword"],
+            max_page_size=params["page_size"],
+            straggler_rate=params["straggler_rate"],
+            straggler_latency=latency * 50,
+            seed=3,
+        ) as server:
+            scraper = AsyncTikTokUserScraper(
+                base_url=server.url,
+                user_agent="benchmark",
+                sleep_between_requests=0,
+                max_concurrency=params["concurrency"],
+                metrics=metrics,
+                hedge_policy=hedge,
+            )
+            start = time.perf_counter()
+            for _ in scraper.iter_many(keywords, params["max_items"]):
+                pages += 1
+            elapsed = time.perf_counter() - start
+            result[f"{label}_requests"] = server.stats["requests"]
+        result[f"{label}_seconds"] = round(elapsed, 3)
+        result[f"{label}_pages_per_second"] = _rate(pages, elapsed)
+    result["hedges"] = metrics.counter_value("tiktok_hedges_total") - metrics.counter_value(
+        "tiktok_hedges_total", outcome="denied"
+    )
+    result["hedges_won"] = metrics.counter_value("tiktok_hedges_total", outcome="won")
+    return result
+
+def _outage(params: Dict[str, Any]) -> Dict[str, Any]:
+    from extractors.async_scraper import AsyncTikTokUserScraper
+    from extractors.circuit_breaker import CircuitBreaker
+    from extractors.metrics import ScrapeMetrics
+    from fake_server import FakeTikTokServer
+
+    outage = params["outage"]
+    keywords = [f"bench{i}" for i in range(params["keywords"])]
+    result: Dict[str, Any] = {}
+    for label, with_breaker in (("unprotected", False), ("breaker", True)):
+        metrics = ScrapeMetrics()
+        breaker = (
+            CircuitBreaker(min_requests=10, open_seconds=outage / 4, metrics=metrics)
+            if with_breaker
+            else None
+        )
+        records = 0
+        with FakeTikTokServer(
+            latency=params["latency"],
+            results_per_keyword=params["results_per_keyword"],
+            max_page_size=params["page_size"],
+        ) as server:
+            scraper = AsyncTikTokUserScraper(
+                base_url=server.url,
+                user_agent="benchmark",
+                sleep_between_requests=0,
+                max_retries=5,
+                backoff_base=0.01,
+                backoff_max=0.2,
+                max_concurrency=params["concurrency"],
+                metrics=metrics,
+                circuit_breaker=breaker,
+            )
+            server.down = True
+            recovery = threading.Timer(outage, setattr, (server, "down", False))
+            recovery.start()
+            start = time.perf_counter()
+            for page in scraper.iter_many(keywords, params["max_items"]):
+                records += len(page.users)
+            elapsed = time.perf_counter() - start
+            recovery.cancel()
+            result[f"{label}_failed_requests"] = server.stats["errors"]
+        result[f"{label}_seconds"] = round(elapsed, 3)
+        result[f"{label}_records"] = records
+    result["rejected"] = metrics.counter_value("tiktok_circuit_rejected_total")
+    result["opened"] = metrics.counter_value("tiktok_circuit_transitions_total", state="open")
+    return result
+
+def _parse(params: Dict[str, Any]) -> Dict[str, Any]:
+    import bench_decode
+
+    results = bench_decode.run(params["corpus"], params["parse_pages"], params["repeat"])
+    # "typed (msgspec)" -> "typed_msgspec_records_per_second"
+    return {
+        "_".join(re.findall(r"\w+", result["path"])) + "_records_per_second": result[
+            "records_per_second"
+        ]
+        for result in results
+    }
+
+def _export_records(count: int) -> List[Dict[str, Any]]:
+    from extractors.tiktok_parser import TikTokUserScraper
+    from payload_corpus import build_page
+
+    parser = TikTokUserScraper(base_url="http://localhost", user_agent="benchmark")
+    records: List[Dict[str, Any]] = []
+    page = 0
+    while len(records) < count:
+        keyword = f"kw{page % 10}"
+        payload = build_page(keyword, cursor=page * 30, count=30, total=10**9)
+        for user in parser._parse_users_from_response(payload):
+            user["search_keyword"] = keyword
+            records.append(user)
+        page += 1
+    return records[:count]
+
+def _export_batches(count: int, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield `count` records in pages of `batch_size`, cycling over a pool of
+    distinct records so peak RSS reflects the writer rather than its input.
+    """
+    pool = _export_records(min(count, EXPORT_POOL_SIZE))
+    emitted = 0
+    while emitted < count:
+        start = emitted % len(pool)
+        batch = pool[start : start + min(batch_size, count - emitted)]
+        emitted += len(batch)
+        yield batch
+
+def _export(params: Dict[str, Any], fmt: str) -> Dict[str, Any]:
+    from outputs.dataset_exporter import DatasetExporter
+
+    count = params["export_records"]
+    batches = _export_batches(count, params["page_size"])
+    exporter = DatasetExporter(logger=logging.getLogger("benchmark"))
+    with tempfile.TemporaryDirectory() as output_dir:
+        try:
+            start = time.perf_counter()
+            writer = exporter.open_stream(fmt, output_dir, "bench")
+            for batch in batches:
+                writer.write_batch(batch)
+            writer.close()
+            elapsed = time.perf_counter() - start
+        except ImportError as exc:
+            return {"skipped": f"missing dependency: {exc}"}
+        size = os.path.getsize(writer.path)
+
+    return {
+        "seconds": round(elapsed, 3),
+        "records": count,
+        "bytes": size,
+        "mb_per_second": _rate(size / (1024 * 1024), elapsed),
+        "records_per_second": _rate(count, elapsed),
+    }
+
+def _avatars(params: Dict[str, Any]) -> Dict[str, Any]:
+    from fake_cdn import FakeCdn
+    from pipeline.avatars import AvatarDownloader, AvatarStore
+
+    count = params["avatars"]
+    latency = params["latency"]
+    with FakeCdn(
+        latency=latency, latency_jitter=latency * 20, error_rate=params["error_rate"] * 5, seed=1
+    ) as flaky, FakeCdn(latency=latency, seed=2) as healthy, FakeCdn() as down:
+        down.down = True
+        mirrors = (flaky, healthy, down)
+        # Every tenth user shares an avatar with the previous one
+        users = [
+            {
+                "uid": str(index),
+                "avatar_thumb": {
+                    "uri": f"tos-avt/{index - index % 10 // 9}",
+                    "url_list": [
+                        f"{cdn.url}/tos-avt/{index - index % 10 // 9}~c5_100x100.webp"
+                        for cdn in mirrors
+                    ],
+                },
+            }
+            for index in range(count)
+        ]
+        pages = [
+            users[start : start + params["page_size"]]
+            for start in range(0, count, params["page_size"])
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            downloader = AvatarDownloader(
+                AvatarStore(directory),
+                user_agent="benchmark",
+                max_concurrency=params["concurrency"],
+                race_after=latency * 5,
+            )
+            start = time.perf_counter()
+            for page in pages:
+                downloader.process_page(page)
+            elapsed = time.perf_counter() - start
+            downloader.close()
+            stats = dict(downloader.stats)
+
+            requests_before = sum(cdn.stats["requests"] for cdn in mirrors)
+            rerun = AvatarDownloader(AvatarStore(directory), user_agent="benchmark")
+            for page in pages:
+                rerun.process_page(page)
+            rerun.close()
+            rerun_requests = sum(cdn.stats["requests"] for cdn in mirrors) - requests_before
+
+        missing = sum(1 for user in users if not user.get("avatar_local_path"))
+
+    return {
+        "seconds": round(elapsed, 3),
+        "avatars": count,
+        "avatars_per_second": _rate(count, elapsed),
+        "downloaded": stats["downloaded"],
+        "failed": stats["failed"],
+        "missing": missing,
+        "failovers": stats["failovers"],
+        "races": stats["races"],
+        "requests": requests_before,
+        "rerun_requests": rerun_requests,
+    }
+
+def _scenarios() -> Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]:
+    scenarios: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+        "scrape_sync": lambda params: _scrape(params, concurrent=False, faulty=False),
+        "scrape_async": lambda params: _scrape(params, concurrent=True, faulty=False),
+        "scrape_speedup": _speedup,
+        "scrape_faulty": lambda params: _scrape(params, concurrent=True, faulty=True),
+        "scrape_stragglers": _stragglers,
+        "scrape_outage": _outage,
+        "parse": _parse,
+        "avatars": _avatars,
+    }
+    for fmt in EXPORT_FORMATS:
+        scenarios[f"export_{fmt}"] = lambda params, fmt=fmt: _export(params, fmt)
+    return scenarios
+
+SCENARIOS = _scenarios()
+
+def _run_isolated(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    logging.basicConfig(level=logging.ERROR)
+    result = SCENARIOS[name](params)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+def run_scenario(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one scenario in a fresh interpreter and return its metrics.
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_run_isolated, (name, params))
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float,
+) -> List[Tuple[str, str, float, float]]:
+    """
+    Return (scenario, metric, baseline, current) for every regressed metric.
+
+    Throughput metrics (`*_per_second`) regress when they drop by more than
+    `tolerance`; `peak_rss_mb` regresses when it grows by more than `tolerance`.
+    """
+    regressions = []
+    for name, metrics in current.get("results", {}).items():
+        previous = baseline.get("results", {}).get(name) or {}
+        for metric, value in metrics.items():
+            old = previous.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            if metric.endswith("_per_second") and value < old * (1 - tolerance):
+                regressions.append((name, metric, old, value))
+            elif metric == "peak_rss_mb" and value > old * (1 + tolerance):
+                regressions.append((name, metric, old, value))
+    return regressions
+
+def check(current: Dict[str, Any], min_speedup: float) -> List[str]:
+    """
+    Describe every failed correctness check in `current` (empty when all pass).
+    """
+    failures = []
+    speedup = current.get("results", {}).get("scrape_speedup")
+    if speedup is not None:
+        if not speedup["records_match"]:
+            failures.append("scrape_speedup: async records differ from sync records")
+        if speedup["speedup"] is None or speedup["speedup"] < min_speedup:
+            failures.append(
+                f"scrape_speedup: speedup {speedup['speedup']} is below {min_speedup}"
+            )
+    return failures
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scraper benchmark suite")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="Scenario to run (repeatable). Default: all.",
+    )
+    parser.add_argument("--output", default=None, help="Where to write the results JSON.")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare with.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative change.")
+    parser.add_argument(
+        "--min-speedup",
+        type=float,
+        default=3.0,
+        help="Async over sync speedup the scrape_speedup scenario must reach.",
+    )
+    parser.add_argument("--keywords", type=int, default=20)
+    parser.add_argument("--max-items", type=int, default=300)
+    parser.add_argument("--results-per-keyword", type=int, default=300)
+    parser.add_argument("--page-size", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake server latency (s).")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--burst-every", type=int, default=50)
+    parser.add_argument("--burst-length", type=int, default=3)
+    parser.add_argument("--straggler-rate", type=float, default=0.02)
+    parser.add_argument("--outage", type=float, default=1.0, help="Fake outage length (s).")
+    parser.add_argument("--fast-decode", action="store_true")
+    parser.add_argument("--metrics", action="store_true", help="Scrape with instrumentation on.")
+    parser.add_argument("--corpus", default=None, help="Recorded corpus for the parse scenario.")
+    parser.add_argument("--parse-pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--export-records", type=int, default=20000)
+    parser.add_argument("--avatars", type=int, default=2000)
+    args = parser.parse_args()
+
+    params = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"scenario", "output", "compare", "tolerance", "min_speedup"}
+    }
+    names = args.scenario or list(SCENARIOS)
+
+    results: Dict[str, Any] = {}
+    for name in names:
+        metrics = run_scenario(name, params)
+        results[name] = metrics
+        summary = ", ".join(f"{key}={value}" for key, value in metrics.items())
+        print(f"{name:<16} {summary}")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        BENCH_DIR, "results", time.strftime("%Y%m%d_%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    failures = check(report, args.min_speedup)
+    for failure in failures:
+        print(f"CHECK FAILED {failure}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.tolerance)
+        for name, metric, old, new in regressions:
+            print(f"REGRESSION {name}.{metric}: {old} -> {new}")
+        if not regressions:
+            print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+        failures.extend(f"{name}.{metric}" for name, metric, _, _ in regressions)
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+import asyncio
+import functools
+import math
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from extractors.tiktok_parser import (
+    KeywordEntry,
+    Page,
+    SearchPage,
+    TikTokUserScraper,
+    keyword_limit,
+)
+from extractors.utils_pagination import should_continue_pagination
+
+class AsyncTikTokUserScraper(TikTokUserScraper):
+    """
+    Fans out keyword searches concurrently on top of TikTokUserScraper.
+
+    Pages are fetched with the same request/parse code as the sync scraper
+    (offloaded to a thread pool), so records are identical to what
+    `search_users` would return. Within a keyword the cursor chain stays
+    sequential; concurrency comes from paginating many keywords at once.
+
+    - `max_concurrency` caps the number of in-flight page requests overall.
+    - `per_keyword_concurrency` caps in-flight requests for a single keyword
+      (relevant when the same keyword is queued more than once). Its
+      semaphore only lives while the keyword is being paginated.
+    - `prefetch_depth` (0 = off) speculatively fetches up to that many pages
+      ahead of a keyword's cursor, predicting that the cursor advances by
+      the page size (or by the stride last observed). A prefetched page is
+      only used once the previous page's real cursor and `has_more` lead to
+      it; wrong guesses are dropped and counted as wasted. Speculative
+      requests pass through the same rate limiter and count towards the
+      global cap, which grows to `max_concurrency * (1 + prefetch_depth)`.
+
+    All other constructor arguments are passed through unchanged. The rate
+    limiter is shared by every worker thread, so the request budget is global.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        max_concurrency: int = 8,
+        per_keyword_concurrency: int = 1,
+        prefetch_depth: int = 0,
+        **kwargs: Any,
+    ) -> None:
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.per_keyword_concurrency = max(1, int(per_keyword_concurrency))
+        self.prefetch_depth = max(0, int(prefetch_depth))
+        # Each paginating keyword may have its own page plus its prefetches in flight
+        self.max_requests = self.max_concurrency * (1 + self.prefetch_depth)
+        # Keep one pooled connection per concurrent request, otherwise
+        # connections are discarded and re-opened.
+        kwargs["pool_maxsize"] = max(kwargs.get("pool_maxsize", 10), self.max_requests)
+        super().__init__(*args, **kwargs)
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._keyword_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Pagination loops holding each keyword's semaphore
+        self._keyword_holders: Dict[str, int] = {}
+        # Dedicated pool so blocking requests are not capped by the loop's
+        # default executor size.
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_requests, thread_name_prefix="tiktok-fetch"
+        )
+
+    def _global_semaphore_for_loop(self) -> asyncio.Semaphore:
+        # Semaphores are bound to the running loop, so create them lazily.
+        if self._global_semaphore is None:
+            self._global_semaphore = asyncio.Semaphore(self.max_requests)
+        return self._global_semaphore
+
+    def _hold_keyword(self, keyword: str) -> asyncio.Semaphore:
+        if keyword not in self._keyword_semaphores:
+            self._keyword_semaphores[keyword] = asyncio.Semaphore(self.per_keyword_concurrency)
+        self._keyword_holders[keyword] = self._keyword_holders.get(keyword, 0) + 1
+        return self._keyword_semaphores[keyword]
+
+    def _release_keyword(self, keyword: str) -> None:
+        # Drop the semaphore with its last holder, so long runs do not keep one per keyword
+        self._keyword_holders[keyword] -= 1
+        if not self._keyword_holders[keyword]:
+            del self._keyword_holders[keyword]
+            del self._keyword_semaphores[keyword]
+
+    async def _fetch_search_page_async(
+        self,
+        keyword: str,
+        cursor: int | None,
+        count: int,
+        keyword_semaphore: asyncio.Semaphore,
+    ) -> Optional[Page]:
+        async with keyword_semaphore:
+            async with self._global_semaphore_for_loop():
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor,
+                    functools.partial(
+                        self._fetch_search_page, keyword=keyword, cursor=cursor, count=count
+                    ),
+                )
+
+    async def _prefetch_search_page(
+        self,
+        keyword: str,
+        cursor: int,
+        count: int,
+        sent: threading.Event,
+    ) -> Optional[Page]:
+        # Speculative fetches skip the keyword semaphore, which would serialise them
+        def fetch() -> Optional[Page]:
+            sent.set()
+            return self._fetch_search_page(keyword=keyword, cursor=cursor, count=count)
+
+        async with self._global_semaphore_for_loop():
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fetch)
+
+    def _schedule_prefetch(
+        self,
+        keyword: str,
+        cursor: int,
+        stride: int,
+        page_size: int,
+        pages_left: int,
+        inflight: Dict[int, Tuple["asyncio.Task[Optional[Page]]", threading.Event]],
+    ) -> None:
+        """
+        Keep the pages predicted after `cursor` in flight and drop stale guesses.
+        """
+        depth = min(self.prefetch_depth, pages_left)
+        wanted = [cursor + stride * step for step in range(1, depth + 1)]
+        self._discard_prefetch(keyword, inflight, keep=wanted)
+        for predicted in wanted:
+            if predicted not in inflight:
+                sent = threading.Event()
+                task = asyncio.ensure_future(
+                    self._prefetch_search_page(keyword, predicted, page_size, sent)
+                )
+                # Results of dropped guesses are never awaited; retrieve their errors here
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                inflight[predicted] = (task, sent)
+
+    def _discard_prefetch(
+        self,
+        keyword: str,
+        inflight: Dict[int, Tuple["asyncio.Task[Optional[Page]]", threading.Event]],
+        keep: Iterable[int] = (),
+    ) -> None:
+        keep = set(keep)
+        wasted = 0
+        for predicted in [cursor for cursor in inflight if cursor not in keep]:
+            task, sent = inflight.pop(predicted)
+            task.cancel()
+            # Guesses cancelled before their request went out cost nothing
+            if sent.is_set():
+                wasted += 1
+        if wasted:
+            self.logger.debug("Dropped %d mispredicted page(s) for '%s'", wasted, keyword)
+            if self.metrics is not None:
+                self.metrics.inc("tiktok_prefetch_pages_total", wasted, outcome="wasted")
+
+    async def iter_user_pages_async(
+        self,
+        keyword: str,
+        max_items: int = 50,
+        start_cursor: int = 0,
+        start_collected: int = 0,
+    ) -> AsyncIterator[SearchPage]:
+        """
+        Async counterpart of `iter_user_pages` with identical pagination semantics.
+
+        With `prefetch_depth`, the following pages are requested while the
+        current one is in flight; pages are still consumed strictly in cursor
+        order, so records are the same as without prefetching.
+        """
+        collected_count = start_collected
+        cursor: Optional[int] = start_cursor
+        inflight: Dict[int, Tuple["asyncio.Task[Optional[Page]]", threading.Event]] = {}
+
+        page_size = min(max_items, 30)
+
+        if not should_continue_pagination(collected_count, max_items, True):
+            yield SearchPage(keyword, [], cursor, None, collected_count, "max_items", 0)
+            return
+
+        stride = page_size
+        keyword_semaphore = self._hold_keyword(keyword)
+        try:
+            while cursor is not None:
+                prefetched = inflight.pop(cursor, None)
+                if self.prefetch_depth:
+                    # Assume full pages: no more guesses than max_items can still use
+                    pages_left = math.ceil((max_items - collected_count) / page_size) - 1
+                    self._schedule_prefetch(
+                        keyword, cursor, stride, page_size, pages_left, inflight
+                    )
+                if prefetched is not None:
+                    payload = await prefetched[0]
+                    if self.metrics is not None:
+                        self.metrics.inc("tiktok_prefetch_pages_total", outcome="hit")
+                else:
+                    payload = await self._fetch_search_page_async(
+                        keyword, cursor, page_size, keyword_semaphore
+                    )
+                users, next_cursor, stop_reason = self._consume_page(
+                    keyword, payload, collected_count, max_items
+                )
+                if next_cursor is not None and next_cursor > cursor:
+                    stride = next_cursor - cursor
+                collected_count += len(users)
+                yield SearchPage(keyword, users, cursor, next_cursor, collected_count, stop_reason)
+                early_stop = (
+                    self._should_stop_early(keyword) if next_cursor is not None else None
+                )
+                if early_stop is not None:
+                    yield SearchPage(
+                        keyword, [], next_cursor, None, collected_count, early_stop, 0
+                    )
+                    next_cursor = None
+                cursor = next_cursor
+        finally:
+            self._discard_prefetch(keyword, inflight)
+            self._release_keyword(keyword)
+
+        self.logger.info(
+            "Finished search for '%s': collected %d user records.",
+            keyword,
+            collected_count,
+        )
+
+    async def stream_many_async(
+        self,
+        keywords: Iterable[KeywordEntry],
+        max_items: int = 50,
+        start_state: Optional[Dict[str, Tuple[int, int]]] = None,
+    ) -> AsyncIterator[SearchPage]:
+        """
+        Yield pages for all keywords as they arrive, interleaved across keywords.
+
+        `keywords` may pair a keyword with its own max_items, and is consumed
+        lazily, one keyword per free worker. `start_state` maps keywords to a
+        (cursor, collected) pair to resume from.
+
+        Workers hand pages over through a bounded queue, so a slow consumer
+        applies backpressure instead of letting parsed pages pile up.
+        A keyword that fails unexpectedly still ends with an empty final page.
+        """
+        out: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrency * 2)
+        keyword_iter = iter(keywords)
+        finished = object()
+
+        async def worker() -> None:
+            try:
+                for entry in keyword_iter:
+                    keyword, keyword_max_items = keyword_limit(entry, max_items)
+                    start_cursor, collected = (start_state or {}).get(keyword, (0, 0))
+                    try:
+                        async for page in self.iter_user_pages_async(
+                            keyword,
+                            max_items=keyword_max_items,
+                            start_cursor=start_cursor,
+                            start_collected=collected,
+                        ):
+                            collected = page.collected
+                            await out.put(page)
+                    except Exception as exc:
+                        self.logger.exception(
+                            "Unexpected error while scraping keyword '%s': %s", keyword, exc
+                        )
+                        await out.put(SearchPage(keyword, [], None, None, collected, "error", 0))
+            finally:
+                await out.put(finished)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+        running = len(workers)
+        try:
+            while running:
+                item = await out.get()
+                if item is finished:
+                    running -= 1
+                    continue
+                yield item
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def iter_many(
+        self,
+        keywords: Iterable[KeywordEntry],
+        max_items: int = 50,
+        start_state: Optional[Dict[str, Tuple[int, int]]] = None,
+    ) -> Iterator[SearchPage]:
+        """
+        Synchronous iterator over `stream_many_async`.
+
+        The event loop runs in a background thread and pages are passed back
+        through a bounded queue, so callers can write each page to disk
+        before the next ones are fetched.
+        """
+        pages: "queue.Queue[Any]" = queue.Queue(maxsize=self.max_concurrency * 2)
+        stop = threading.Event()
+        finished = object()
+        errors: List[BaseException] = []
+
+        def put(item: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        async def pump() -> None:
+            self._global_semaphore = None
+            self._keyword_semaphores = {}
+            self._keyword_holders = {}
+            loop = asyncio.get_running_loop()
+            async for page in self.stream_many_async(
+                keywords, max_items=max_items, start_state=start_state
+            ):
+                if not await loop.run_in_executor(None, put, page):
+                    break
+
+        def runner() -> None:
+            try:
+                asyncio.run(pump())
+            except BaseException as exc:  # surfaced to the consuming thread
+                errors.append(exc)
+            finally:
+                put(finished)
+
+        thread = threading.Thread(target=runner, name="tiktok-async-pump", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is finished:
+                    break
+                yield item
+        finally:
+            stop.set()
+            thread.join()
+        if errors:
+            raise errors[0]
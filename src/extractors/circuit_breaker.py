@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from extractors.metrics import ScrapeMetrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Stops sending search requests while the endpoint is failing.
+
+    Outcomes of the last `window` requests are kept. Once at least
+    `min_requests` of them are known and `failure_ratio` or more failed
+    (network errors and every non-OK status, so an endpoint that blocks us
+    with 403 counts as failing too), the breaker opens and `allow()`
+    refuses every request, so callers hold back instead of waiting for
+    timeouts; `retry_in()` tells them when trying again is worthwhile.
+    Callers should give up on a request held back for `max_hold_seconds`
+    in total.
+
+    After `open_seconds` the breaker lets `probe_requests` requests through
+    (half-open). If all of them succeed it closes again with a clean
+    window; any failure re-opens it, and each consecutive re-open doubles
+    the wait up to `max_open_seconds`. State changes are logged and counted
+    in `tiktok_circuit_transitions_total`, refused requests in
+    `tiktok_circuit_rejected_total`. All methods may be called from any thread.
+    """
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        min_requests: int = 20,
+        window: int = 50,
+        open_seconds: float = 30.0,
+        max_open_seconds: float = 300.0,
+        probe_requests: int = 3,
+        max_hold_seconds: float = 60.0,
+        logger: Optional[logging.Logger] = None,
+        metrics: Optional[ScrapeMetrics] = None,
+    ) -> None:
+        self.failure_ratio = float(failure_ratio)
+        self.min_requests = max(1, int(min_requests))
+        self.open_seconds = max(0.0, float(open_seconds))
+        self.max_open_seconds = max(self.open_seconds, float(max_open_seconds))
+        self.probe_requests = max(1, int(probe_requests))
+        self.max_hold_seconds = max(0.0, float(max_hold_seconds))
+        self.logger = logger or logging.getLogger(__name__)
+        self.metrics = metrics
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=max(int(window), self.min_requests))
+        self._opened_at = 0.0
+        self._open_for = self.open_seconds
+        self._probes_sent = 0
+        self._probes_passed = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(
+        cls,
+        scraper_cfg: Dict[str, Any],
+        enabled: Optional[bool] = None,
+        logger: Optional[logging.Logger] = None,
+        metrics: Optional[ScrapeMetrics] = None,
+    ) -> Optional["CircuitBreaker"]:
+        """
+        Build a breaker from the `scraper.circuit_breaker` settings; None unless enabled.
+
+        `enabled`, when not None, overrides the configured `enabled` flag.
+        """
+        breaker_cfg = scraper_cfg.get("circuit_breaker") or {}
+        if not (enabled if enabled is not None else breaker_cfg.get("enabled", False)):
+            return None
+        return cls(
+            failure_ratio=breaker_cfg.get("failure_ratio", 0.5),
+            min_requests=breaker_cfg.get("min_requests", 20),
+            window=breaker_cfg.get("window", 50),
+            open_seconds=breaker_cfg.get("open_seconds", 30.0),
+            max_open_seconds=breaker_cfg.get("max_open_seconds", 300.0),
+            probe_requests=breaker_cfg.get("probe_requests", 3),
+            max_hold_seconds=breaker_cfg.get("max_hold_seconds", 60.0),
+            logger=logger,
+            metrics=metrics,
+        )
+
+    def _transition(self, state: str) -> None:
+        # Called with the lock held
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.logger.warning(
+                "Circuit breaker open: failing search requests fast for %.0fs", self._open_for
+            )
+        elif state == HALF_OPEN:
+            self._probes_sent = self._probes_passed = 0
+            self.logger.info(
+                "Circuit breaker half-open: probing with %d requests", self.probe_requests
+            )
+        else:
+            self._outcomes.clear()
+            self._open_for = self.open_seconds
+            self.logger.info("Circuit breaker closed: search endpoint recovered")
+        if self.metrics is not None:
+            self.metrics.inc("tiktok_circuit_transitions_total", state=state)
+
+    def allow(self) -> bool:
+        """
+        True if a request may be sent now; False means hold it back.
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self._open_for:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes_sent < self.probe_requests:
+                self._probes_sent += 1
+                return True
+        if self.metrics is not None:
+            self.metrics.inc("tiktok_circuit_rejected_total")
+        return False
+
+    def retry_in(self) -> float:
+        """
+        Seconds until the open breaker starts letting probe requests through.
+        """
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(self._opened_at + self._open_for - time.monotonic(), 0.0)
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if not success:
+                    self._open_for = min(self._open_for * 2, self.max_open_seconds)
+                    self._transition(OPEN)
+                    return
+                self._probes_passed += 1
+                if self._probes_passed >= self.probe_requests:
+                    self._transition(CLOSED)
+                return
+            if self.state == OPEN:
+                # Requests sent before the breaker opened tell nothing new
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (
+                len(self._outcomes) >= self.min_requests
+                and failures >= self.failure_ratio * len(self._outcomes)
+            ):
+                self._transition(OPEN)
@@ -0,0 +1,308 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from extractors.metrics import ScrapeMetrics
+
+def build_http_session(
+    user_agent: str,
+    accept_encoding: Optional[str] = None,
+    keep_alive: bool = True,
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    pool_block: bool = False,
+    proxy: Optional[str] = None,
+) -> requests.Session:
+    """
+    Create a Session with the scraper's headers and a sized keep-alive pool.
+
+    `accept_encoding` overrides requests' default Accept-Encoding;
+    `keep_alive=False` sends `Connection: close` so every request opens a
+    fresh connection. `proxy` routes both http and https through one proxy.
+    """
+    session = requests.Session()
+    session.headers.update(
+        {
+            "User-Agent": user_agent,
+            "Accept": "application/json,text/plain;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9",
+        }
+    )
+    if accept_encoding:
+        session.headers["Accept-Encoding"] = accept_encoding
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if proxy:
+        session.proxies.update({"http": proxy, "https": proxy})
+        # Proxy settings from the environment must not override the pool's choice
+        session.trust_env = False
+    return session
+
+def _endpoint_name(proxy: Optional[str]) -> str:
+    if not proxy:
+        return "direct"
+    parsed = urlparse(proxy)
+    # Never log proxy credentials
+    name = f"{parsed.scheme}://{parsed.hostname or proxy}"
+    return f"{name}:{parsed.port}" if parsed.port else name
+
+class EgressEndpoint:
+    """
+    One egress path (a proxy, or a direct connection) with its own session and health.
+
+    Health is tracked with exponentially weighted moving averages of latency,
+    error rate and 429 rate, plus the number of consecutive failures.
+    """
+
+    def __init__(self, proxy: Optional[str], session: requests.Session) -> None:
+        self.proxy = proxy
+        self.name = _endpoint_name(proxy)
+        self.session = session
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.throttle_rate = 0.0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+
+    def score(self) -> float:
+        """
+        Expected cost of sending the next request here; lower is better.
+        """
+        # Untried endpoints look as fast as the best case so they get sampled
+        latency = self.latency if self.latency is not None else 0.0
+        return (
+            (latency + 0.01)
+            * (1 + self.in_flight)
+            * (1 + 4 * self.error_rate)
+            * (1 + 4 * self.throttle_rate)
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.name,
+            "requests": self.requests,
+            "latency": round(self.latency, 4) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "throttle_rate": round(self.throttle_rate, 3),
+            "ejections": self.ejections,
+            "ejected": self.ejected_until > time.monotonic(),
+        }
+
+class EgressPool:
+    """
+    Routes requests across several egress endpoints based on their health.
+
+    Every endpoint has its own Session, and so its own keep-alive connection
+    pool. For each request the endpoint with the lowest score (recent
+    latency, weighted by in-flight requests, error rate and 429 rate) is
+    picked, ties broken at random; a small `explore_ratio` of requests goes
+    to a random endpoint so the scores of the others stay current.
+
+    An endpoint that fails `eject_after_failures` times in a row (network
+    error, 5xx or 429) is taken out of rotation for `eject_seconds`. The
+    period doubles on each consecutive ejection up to `max_eject_seconds`.
+    Once it expires, the endpoint is given traffic again and its first
+    success resets the penalty. If every endpoint is ejected, the one due
+    back soonest is used rather than failing outright.
+
+    `get()` mirrors `requests.Session.get`, so the pool can stand in for the
+    scraper's session. With no proxies configured the pool holds a single
+    direct endpoint.
+    """
+
+    def __init__(
+        self,
+        proxies: Sequence[Optional[str]],
+        user_agent: str,
+        accept_encoding: Optional[str] = None,
+        keep_alive: bool = True,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        eject_after_failures: int = 5,
+        eject_seconds: float = 30.0,
+        max_eject_seconds: float = 300.0,
+        latency_alpha: float = 0.2,
+        explore_ratio: float = 0.05,
+        logger: Optional[logging.Logger] = None,
+        metrics: Optional[ScrapeMetrics] = None,
+    ) -> None:
+        self.explore_ratio = explore_ratio
+        self.eject_after_failures = max(1, int(eject_after_failures))
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.alpha = latency_alpha
+        self.logger = logger or logging.getLogger(__name__)
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self.endpoints: List[EgressEndpoint] = [
+            EgressEndpoint(
+                proxy,
+                build_http_session(
+                    user_agent,
+                    accept_encoding=accept_encoding,
+                    keep_alive=keep_alive,
+                    pool_connections=pool_connections,
+                    pool_maxsize=pool_maxsize,
+                    pool_block=pool_block,
+                    proxy=proxy,
+                ),
+            )
+            for proxy in (list(proxies) or [None])
+        ]
+
+    @classmethod
+    def from_config(
+        cls,
+        tiktok_cfg: Dict[str, Any],
+        user_agent: str,
+        min_pool_size: int = 1,
+        logger: Optional[logging.Logger] = None,
+        metrics: Optional[ScrapeMetrics] = None,
+    ) -> Optional["EgressPool"]:
+        """
+        Build a pool from the `tiktok.egress` settings; None if no proxies are configured.
+        """
+        egress_cfg = tiktok_cfg.get("egress", {})
+        proxies: List[Optional[str]] = list(egress_cfg.get("proxies") or [])
+        if not proxies:
+            return None
+        if egress_cfg.get("include_direct", False):
+            proxies.append(None)
+        pool_maxsize = max(int(tiktok_cfg.get("pool_maxsize", 10)), min_pool_size)
+        return cls(
+            proxies,
+            user_agent,
+            accept_encoding=tiktok_cfg.get("accept_encoding"),
+            keep_alive=tiktok_cfg.get("keep_alive", True),
+            pool_connections=tiktok_cfg.get("pool_connections", 10),
+            pool_maxsize=pool_maxsize,
+            pool_block=tiktok_cfg.get("pool_block", False),
+            eject_after_failures=egress_cfg.get("eject_after_failures", 5),
+            eject_seconds=egress_cfg.get("eject_seconds", 30.0),
+            max_eject_seconds=egress_cfg.get("max_eject_seconds", 300.0),
+            latency_alpha=egress_cfg.get("latency_alpha", 0.2),
+            explore_ratio=egress_cfg.get("explore_ratio", 0.05),
+            logger=logger,
+            metrics=metrics,
+        )
+
+    def _choose(self) -> EgressEndpoint:
+        now = time.monotonic()
+        with self._lock:
+            for endpoint in self.endpoints:
+                if endpoint.ejected_until and endpoint.ejected_until <= now:
+                    # Back in rotation: forget the bad history so it gets a fair trial
+                    endpoint.ejected_until = 0.0
+                    endpoint.latency = None
+                    endpoint.error_rate = endpoint.throttle_rate = 0.0
+                    self.logger.info("Egress %s is back in rotation", endpoint.name)
+            available = [e for e in self.endpoints if not e.ejected_until]
+            if not available:
+                endpoint = min(self.endpoints, key=lambda e: e.ejected_until)
+            elif random.random() < self.explore_ratio:
+                # Keep health data fresh for endpoints that are not currently the best
+                endpoint = random.choice(available)
+            else:
+                best = min(e.score() for e in available)
+                endpoint = random.choice([e for e in available if e.score() <= best])
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _record(self, endpoint: EgressEndpoint, latency: float, status: Optional[int]) -> None:
+        throttled = status == 429
+        failed = status is None or status >= 500 or throttled
+        alpha = self.alpha
+        ejected_for = 0.0
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.latency = (
+                latency
+                if endpoint.latency is None
+                else (1 - alpha) * endpoint.latency + alpha * latency
+            )
+            endpoint.error_rate = (1 - alpha) * endpoint.error_rate + alpha * (
+                1.0 if failed and not throttled else 0.0
+            )
+            endpoint.throttle_rate = (1 - alpha) * endpoint.throttle_rate + alpha * (
+                1.0 if throttled else 0.0
+            )
+            if not failed:
+                endpoint.consecutive_failures = 0
+                endpoint.ejections = 0
+            else:
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= self.eject_after_failures:
+                    ejected_for = min(
+                        self.eject_seconds * (2 ** endpoint.ejections), self.max_eject_seconds
+                    )
+                    endpoint.ejected_until = time.monotonic() + ejected_for
+                    endpoint.ejections += 1
+                    endpoint.consecutive_failures = 0
+
+        if self.metrics is not None:
+            self.metrics.inc(
+                "tiktok_egress_requests_total",
+                endpoint=endpoint.name,
+                status=status if status is not None else "error",
+            )
+            if ejected_for:
+                self.metrics.inc("tiktok_egress_ejections_total", endpoint=endpoint.name)
+        if ejected_for:
+            self.logger.warning(
+                "Taking egress %s out of rotation for %.0fs after repeated failures",
+                endpoint.name,
+                ejected_for,
+            )
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        endpoint = self._choose()
+        start = time.perf_counter()
+        try:
+            response = endpoint.session.get(url, **kwargs)
+        except requests.RequestException:
+            self._record(endpoint, time.perf_counter() - start, None)
+            raise
+        except BaseException:
+            with self._lock:
+                endpoint.in_flight -= 1
+            raise
+        self._record(endpoint, time.perf_counter() - start, response.status_code)
+        return response
+
+    def log_stats(self) -> None:
+        with self._lock:
+            snapshots = [endpoint.snapshot() for endpoint in self.endpoints]
+        for snapshot in snapshots:
+            self.logger.info(
+                "Egress %s: %d requests, latency %s, error rate %.2f, 429 rate %.2f, "
+                "%d consecutive ejections%s",
+                snapshot["endpoint"],
+                snapshot["requests"],
+                f"{snapshot['latency']:.3f}s" if snapshot["latency"] is not None else "n/a",
+                snapshot["error_rate"],
+                snapshot["throttle_rate"],
+                snapshot["ejections"],
+                " (out of rotation)" if snapshot["ejected"] else "",
+            )
+
+    def close(self) -> None:
+        for endpoint in self.endpoints:
+            endpoint.session.close()
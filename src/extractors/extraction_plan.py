@@ -0,0 +1,358 @@
+import logging
+import threading
+from operator import itemgetter
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from extractors.metrics import ScrapeMetrics
+from extractors.utils_normalize import first_count
+
+MISSING = "-"
+
+# Alternative keys in the order the defensive parser tries them
+USER_KEYS = ("user_info", "user")
+UNIQUE_ID_KEYS = ("unique_id", "short_id")
+AVATAR_KEYS = ("avatar_thumb", "avatarThumb")
+VERIFY_KEYS = ("custom_verify", "enterprise_verify_reason")
+FOLLOWER_KEYS = ("follower_count", "followerCount", "followerCountStr")
+
+ExtractedPage = Tuple[List[Dict[str, Any]], bool, Optional[int]]
+
+class PayloadShape(NamedTuple):
+    """
+    Where one search payload keeps the fields we extract; MISSING when absent.
+
+    The entry fields name the key a sampled `user_list` entry uses for each
+    alternative (e.g. `avatar` is "avatar_thumb" or "avatarThumb"); `cursor`
+    also records the value type, e.g. "data.cursor:str".
+    """
+
+    user_list: str
+    user: str
+    unique_id: str
+    avatar: str
+    verify: str
+    followers: str
+    has_more: str
+    cursor: str
+
+    @property
+    def complete(self) -> bool:
+        return MISSING not in self[:6]
+
+    def changes(self, other: "PayloadShape") -> List[Tuple[str, str, str]]:
+        """
+        (field, old, new) for every field where `other` differs from this shape.
+        """
+        return [
+            (field, old, new)
+            for field, old, new in zip(self._fields, self, other)
+            if old != new
+        ]
+
+def parse_user_entry(entry: Any) -> Optional[Dict[str, Any]]:
+    """
+    Defensive extraction of one `user_list` entry; None for entries to skip.
+
+    Tolerates any missing key and tries every known alternative of each field.
+    """
+    if not isinstance(entry, dict):
+        return None
+
+    user_info = entry.get("user_info") or entry.get("user") or {}
+    if not isinstance(user_info, dict):
+        user_info = {}
+
+    stats = entry.get("stats") or {}
+    if not isinstance(stats, dict):
+        stats = {}
+
+    uid = user_info.get("uid")
+    sec_uid = user_info.get("sec_uid")
+    unique_id = user_info.get("unique_id") or user_info.get("short_id")
+    nickname = user_info.get("nickname")
+    signature = user_info.get("signature") or ""
+    avatar_thumb = user_info.get("avatar_thumb") or user_info.get("avatarThumb") or {}
+    follower_count = first_count(
+        stats.get("follower_count"),
+        stats.get("followerCount"),
+        stats.get("followerCountStr"),
+    )
+    custom_verify = user_info.get("custom_verify") or user_info.get("enterprise_verify_reason")
+    follow_status = entry.get("follow_status")
+    platform_sync_info = entry.get("platform_sync_info")
+
+    # Skip records that are clearly invalid
+    if not uid and not unique_id and not sec_uid:
+        return None
+
+    return {
+        "uid": uid,
+        "nickname": nickname,
+        "signature": signature,
+        "avatar_thumb": avatar_thumb,
+        "follower_count": follower_count,
+        "custom_verify": custom_verify,
+        "unique_id": unique_id,
+        "sec_uid": sec_uid,
+        "follow_status": follow_status,
+        "platform_sync_info": platform_sync_info,
+    }
+
+def _first_present(container: Dict[str, Any], keys: Tuple[str, ...]) -> str:
+    for key in keys:
+        if key in container:
+            return key
+    return MISSING
+
+def _has_more_source(payload: Dict[str, Any], data: Dict[str, Any]) -> str:
+    # Same precedence as get_has_more_flag
+    if isinstance(payload.get("hasMore"), int):
+        return "hasMore"
+    if "has_more" in data:
+        return "data.has_more"
+    if "hasMore" in data:
+        return "data.hasMore"
+    return MISSING
+
+def _cursor_source(payload: Dict[str, Any], data: Dict[str, Any]) -> str:
+    # Same precedence as get_next_cursor
+    for location, container in (("cursor", payload), ("data.cursor", data)):
+        cursor = container.get("cursor")
+        if isinstance(cursor, int):
+            return location + ":int"
+        if isinstance(cursor, str) and cursor.isdigit():
+            return location + ":str"
+    return MISSING
+
+def detect_shape(payload: Any, previous: Optional[PayloadShape] = None) -> Optional[PayloadShape]:
+    """
+    Read the shape of `payload` off its pagination fields and first user entry.
+
+    A page without entries keeps the entry fields of `previous`; None when
+    there is nothing to sample them from.
+    """
+    if not isinstance(payload, dict):
+        return None
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        data = {}
+    user_list = data.get("user_list")
+    entry = user_list[0] if isinstance(user_list, list) and user_list else None
+
+    if isinstance(entry, dict):
+        user = MISSING
+        for key in USER_KEYS:
+            value = entry.get(key)
+            if isinstance(value, dict) and value:
+                user = key
+                break
+        info = entry.get(user) if user != MISSING else {}
+        stats = entry.get("stats")
+        entry_fields: Tuple[str, ...] = (
+            user,
+            _first_present(info, UNIQUE_ID_KEYS),
+            _first_present(info, AVATAR_KEYS),
+            _first_present(info, VERIFY_KEYS),
+            _first_present(stats, FOLLOWER_KEYS) if isinstance(stats, dict) else MISSING,
+        )
+    elif previous is not None:
+        entry_fields = previous[1:6]
+    else:
+        return None
+
+    return PayloadShape(
+        "data.user_list" if isinstance(user_list, list) else MISSING,
+        *entry_fields,
+        _has_more_source(payload, data),
+        _cursor_source(payload, data),
+    )
+
+def _flag(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value != 0
+    return False
+
+class ExtractionPlan:
+    """
+    Direct field lookups compiled for one complete PayloadShape.
+
+    Each entry is read with the key its shape names, and the other
+    alternatives are only tried when that value is empty, so records equal
+    those of `parse_user_entry` as long as an entry uses the sampled keys.
+    Entries that do not (a missing key, an unexpected type) are parsed
+    defensively instead.
+    """
+
+    def __init__(self, shape: PayloadShape) -> None:
+        self.shape = shape
+        self._user_key = shape.user
+        self._fetch_info = itemgetter(
+            "uid", "sec_uid", "nickname", "signature", shape.unique_id, shape.avatar, shape.verify
+        )
+        self._fetch_followers = itemgetter(shape.followers)
+        location, _, kind = shape.cursor.partition(":")
+        self._cursor_in_data = location == "data.cursor"
+        self._cursor_is_str = kind == "str"
+
+    def _has_more(self, payload: Dict[str, Any], data: Dict[str, Any]) -> bool:
+        source = self.shape.has_more
+        if source == "hasMore":
+            return _flag(payload["hasMore"])
+        if source == "data.has_more":
+            return _flag(data["has_more"] or data.get("hasMore"))
+        if source == "data.hasMore":
+            return _flag(data["hasMore"])
+        return False
+
+    def _cursor(self, payload: Dict[str, Any], data: Dict[str, Any]) -> Optional[int]:
+        if self.shape.cursor == MISSING:
+            return None
+        cursor = data["cursor"] if self._cursor_in_data else payload["cursor"]
+        return int(cursor) if self._cursor_is_str else cursor
+
+    def extract(self, payload: Dict[str, Any]) -> Tuple[ExtractedPage, int]:
+        """
+        Extract a payload detected as this plan's shape.
+
+        Returns the users, has-more flag and next cursor, and how many
+        entries had to be parsed defensively.
+        """
+        data = payload["data"]
+        user_key = self._user_key
+        fetch_info = self._fetch_info
+        fetch_followers = self._fetch_followers
+        parsed: List[Dict[str, Any]] = []
+        append = parsed.append
+        fallbacks = 0
+
+        for entry in data["user_list"]:
+            try:
+                info = entry[user_key]
+                uid, sec_uid, nickname, signature, unique_id, avatar, verify = fetch_info(info)
+                stats = entry["stats"]
+                followers = fetch_followers(stats)
+            except (KeyError, TypeError):
+                fallbacks += 1
+                record = parse_user_entry(entry)
+                if record is not None:
+                    append(record)
+                continue
+
+            if not unique_id:
+                unique_id = info.get("unique_id") or info.get("short_id")
+            # Skip records that are clearly invalid
+            if not uid and not unique_id and not sec_uid:
+                continue
+            if followers.__class__ is not int or not followers:
+                followers = first_count(
+                    stats.get("follower_count"),
+                    stats.get("followerCount"),
+                    stats.get("followerCountStr"),
+                )
+
+            append(
+                {
+                    "uid": uid,
+                    "nickname": nickname,
+                    "signature": signature or "",
+                    "avatar_thumb": (
+                        avatar or info.get("avatar_thumb") or info.get("avatarThumb") or {}
+                    ),
+                    "follower_count": followers,
+                    "custom_verify": (
+                        verify
+                        or info.get("custom_verify")
+                        or info.get("enterprise_verify_reason")
+                    ),
+                    "unique_id": unique_id,
+                    "sec_uid": sec_uid,
+                    "follow_status": entry.get("follow_status"),
+                    "platform_sync_info": entry.get("platform_sync_info"),
+                }
+            )
+
+        return (parsed, self._has_more(payload, data), self._cursor(payload, data)), fallbacks
+
+class ExtractionPlanner:
+    """
+    Extracts search pages through plans compiled per payload shape, and reports shape drift.
+
+    Each page's shape is read off its pagination fields and first entry (a
+    dozen key lookups) and looked up in a cache of up to `cache_size`
+    compiled ExtractionPlans. `extract()` returns None for pages whose shape
+    is incomplete (no `user_list`, or an entry field found under none of its
+    known keys); callers then use the defensive parser.
+
+    When a page's shape differs from the previous page's, every changed
+    field is logged as a warning and counted in `drift` and in
+    `tiktok_schema_drift_total`, so a TikTok API change shows up at its
+    first page instead of as an empty export. Entries parsed defensively
+    because they did not fit their page's plan are counted in
+    `tiktok_extraction_fallbacks_total`. All methods may be called from any thread.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = 8,
+        logger: Optional[logging.Logger] = None,
+        metrics: Optional[ScrapeMetrics] = None,
+    ) -> None:
+        self.cache_size = max(1, int(cache_size))
+        self.logger = logger or logging.getLogger(__name__)
+        self.metrics = metrics
+        self.shape: Optional[PayloadShape] = None
+        self.drift: Dict[str, int] = {}
+        self.fallbacks = 0
+        self._plans: Dict[PayloadShape, ExtractionPlan] = {}
+        self._lock = threading.Lock()
+
+    def _plan_for(self, shape: PayloadShape) -> ExtractionPlan:
+        # Called with the lock held
+        plan = self._plans.get(shape)
+        if plan is None:
+            if len(self._plans) >= self.cache_size:
+                del self._plans[next(iter(self._plans))]
+            plan = self._plans[shape] = ExtractionPlan(shape)
+            self.logger.debug("Compiled extraction plan for payload shape %s", shape)
+        return plan
+
+    def _record_drift(self, previous: PayloadShape, shape: PayloadShape) -> None:
+        # Called with the lock held
+        changes = previous.changes(shape)
+        for field, _, _ in changes:
+            self.drift[field] = self.drift.get(field, 0) + 1
+            if self.metrics is not None:
+                self.metrics.inc("tiktok_schema_drift_total", field=field)
+        self.logger.warning(
+            "TikTok payload shape changed: %s",
+            ", ".join(f"{field} {old} -> {new}" for field, old, new in changes),
+        )
+
+    def extract(self, payload: Any) -> Optional[ExtractedPage]:
+        """
+        Users, has-more flag and next cursor of `payload`; None to use the defensive path.
+        """
+        previous = self.shape
+        shape = detect_shape(payload, previous)
+        if shape is None:
+            return None
+        plan: Optional[ExtractionPlan] = None
+        with self._lock:
+            if shape != self.shape:
+                if self.shape is not None:
+                    self._record_drift(self.shape, shape)
+                self.shape = shape
+            if shape.complete:
+                plan = self._plan_for(shape)
+        if plan is None:
+            return None
+
+        page, fallbacks = plan.extract(payload)
+        if fallbacks:
+            with self._lock:
+                self.fallbacks += fallbacks
+            if self.metrics is not None:
+                self.metrics.inc("tiktok_extraction_fallbacks_total", fallbacks)
+        return page
@@ -0,0 +1,293 @@
+import functools
+import json
+import logging
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+try:  # Optional dependency: faster generic JSON decoding
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+from extractors.utils_normalize import first_count
+
+USER_FIELDS = (
+    "uid",
+    "nickname",
+    "signature",
+    "avatar_thumb",
+    "follower_count",
+    "custom_verify",
+    "unique_id",
+    "sec_uid",
+    "follow_status",
+    "platform_sync_info",
+)
+
+class UserRecord(MutableMapping):
+    """
+    Compact user record backed by `__slots__` instead of a per-user dict.
+
+    It behaves like the dicts produced by `_parse_users_from_response`: it
+    has the same keys in the same order, and `get`, `setdefault`, item
+    assignment and equality with dicts all work. Keys added later (such as
+    `search_keyword`) go into a small overflow dict. Exporters call
+    `to_dict()` only at serialization time.
+    """
+
+    __slots__ = USER_FIELDS + ("_extra",)
+
+    def __init__(self, **values: Any) -> None:
+        for field in USER_FIELDS:
+            setattr(self, field, values.pop(field, None))
+        self._extra: Optional[Dict[str, Any]] = values or None
+
+    @classmethod
+    def from_values(cls, *values: Any) -> "UserRecord":
+        """
+        Build a record from positional values in USER_FIELDS order (hot path).
+        """
+        record = cls.__new__(cls)
+        (
+            record.uid,
+            record.nickname,
+            record.signature,
+            record.avatar_thumb,
+            record.follower_count,
+            record.custom_verify,
+            record.unique_id,
+            record.sec_uid,
+            record.follow_status,
+            record.platform_sync_info,
+        ) = values
+        record._extra = None
+        return record
+
+    def __getitem__(self, key: str) -> Any:
+        if key in USER_FIELDS:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in USER_FIELDS:
+            setattr(self, key, value)
+            return
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in USER_FIELDS:
+            raise KeyError(f"Cannot delete fixed field {key!r}")
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from USER_FIELDS
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return len(USER_FIELDS) + (len(self._extra) if self._extra else 0)
+
+    def __repr__(self) -> str:
+        return f"UserRecord({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {field: getattr(self, field) for field in USER_FIELDS}
+        if self._extra:
+            record.update(self._extra)
+        return record
+
+def as_plain_dict(record: Any) -> Dict[str, Any]:
+    """
+    Return `record` as a plain dict, converting UserRecord lazily.
+    """
+    if isinstance(record, dict):
+        return record
+    if isinstance(record, UserRecord):
+        return record.to_dict()
+    return dict(record)
+
+class DecodedPage(NamedTuple):
+    """
+    A search page decoded by FastPayloadDecoder: users plus pagination state.
+    """
+
+    users: List[UserRecord]
+    has_more: bool
+    cursor: Optional[int]
+
+@functools.lru_cache(maxsize=None)
+def _typed_schema() -> Optional[Tuple[Any, Any, Any]]:
+    """
+    Import msgspec and define the payload structs on first use.
+
+    Returns (msgspec, payload type, empty user info), or None when msgspec
+    is not installed. Runs without `fast_decode` never pay for the import.
+    """
+    try:  # Optional dependency: typed, schema-driven decoding
+        import msgspec
+    except ImportError:  # pragma: no cover - depends on the environment
+        return None
+
+    class _Stats(msgspec.Struct):
+        follower_count: Any = None
+        followerCount: Any = None
+        followerCountStr: Any = None
+
+    class _UserInfo(msgspec.Struct):
+        uid: Any = None
+        sec_uid: Any = None
+        unique_id: Any = None
+        short_id: Any = None
+        nickname: Any = None
+        signature: Any = None
+        avatar_thumb: Any = None
+        avatarThumb: Any = None
+        custom_verify: Any = None
+        enterprise_verify_reason: Any = None
+
+    _EMPTY_USER_INFO = _UserInfo()
+
+    class _Entry(msgspec.Struct):
+        user_info: Optional[_UserInfo] = None
+        user: Optional[_UserInfo] = None
+        stats: Optional[_Stats] = None
+        follow_status: Any = None
+        platform_sync_info: Any = None
+
+    class _Data(msgspec.Struct):
+        user_list: Optional[List[_Entry]] = None
+        cursor: Any = None
+        has_more: Any = None
+        hasMore: Any = None
+
+    class _Payload(msgspec.Struct):
+        data: Optional[_Data] = None
+        cursor: Any = None
+        hasMore: Any = None
+
+    return msgspec, _Payload, _EMPTY_USER_INFO
+
+def _is_empty(info: Any) -> bool:
+    # Structs are always truthy; treat one with no kept field set like an empty dict
+    return info is None or (
+        info.uid is None
+        and info.sec_uid is None
+        and info.unique_id is None
+        and info.short_id is None
+        and info.nickname is None
+        and info.signature is None
+        and info.avatar_thumb is None
+        and info.avatarThumb is None
+        and info.custom_verify is None
+        and info.enterprise_verify_reason is None
+    )
+
+def _flag(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value != 0
+    return None
+
+def _cursor(value: Any) -> Optional[int]:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+class FastPayloadDecoder:
+    """
+    Decodes raw search responses straight into UserRecord objects.
+
+    With msgspec installed, responses are decoded against typed structs that
+    declare only the fields we keep; everything else in the (large)
+    `user_info` objects is skipped without being materialised. Field
+    fallbacks mirror `_parse_users_from_response` exactly.
+
+    `decode()` returns None when the payload does not fit the expected shape
+    (or msgspec is unavailable); callers then use the generic dict path.
+    `loads()` is the generic JSON decoder, preferring orjson when installed.
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None) -> None:
+        self.logger = logger or logging.getLogger(__name__)
+        schema = _typed_schema()
+        self.available = schema is not None
+        self.fallbacks = 0
+        self._decoder: Any = None
+        self._errors: Tuple[type, ...] = ()
+        self._empty_user_info: Any = None
+        if schema is not None:
+            msgspec, payload_type, self._empty_user_info = schema
+            self._decoder = msgspec.json.Decoder(payload_type)
+            self._errors = (msgspec.ValidationError, msgspec.DecodeError)
+
+    @staticmethod
+    def loads(body: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(body)
+        return json.loads(body)
+
+    def decode(self, body: bytes) -> Optional[DecodedPage]:
+        if self._decoder is None:
+            return None
+        try:
+            payload = self._decoder.decode(body)
+        except self._errors as exc:
+            self.fallbacks += 1
+            self.logger.debug("Fast decoder fell back to dict parsing: %s", exc)
+            return None
+
+        users: List[UserRecord] = []
+        data = payload.data
+        for entry in (data.user_list if data is not None else None) or []:
+            # `entry.get("user_info") or entry.get("user")` in the dict path
+            info = entry.user_info
+            if _is_empty(info):
+                info = entry.user or self._empty_user_info
+            stats = entry.stats
+
+            uid = info.uid
+            sec_uid = info.sec_uid
+            unique_id = info.unique_id or info.short_id
+
+            # Skip records that are clearly invalid
+            if not uid and not unique_id and not sec_uid:
+                continue
+
+            users.append(
+                UserRecord.from_values(
+                    uid,
+                    info.nickname,
+                    info.signature or "",
+                    info.avatar_thumb or info.avatarThumb or {},
+                    (
+                        first_count(
+                            stats.follower_count, stats.followerCount, stats.followerCountStr
+                        )
+                        if stats is not None
+                        else None
+                    ),
+                    info.custom_verify or info.enterprise_verify_reason,
+                    unique_id,
+                    sec_uid,
+                    entry.follow_status,
+                    entry.platform_sync_info,
+                )
+            )
+
+        has_more = _flag(payload.hasMore)
+        if has_more is None and data is not None:
+            has_more = _flag(data.has_more or data.hasMore)
+        cursor = _cursor(payload.cursor)
+        if cursor is None and data is not None:
+            cursor = _cursor(data.cursor)
+
+        return DecodedPage(users, bool(has_more), cursor)
@@ -0,0 +1,93 @@
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+class HedgePolicy:
+    """
+    Decides when a slow search request gets a duplicate ("hedge") sent alongside it.
+
+    Latencies of the last `window` answered requests are kept; a request
+    still waiting after their `quantile` (p95 by default) is hedged, and
+    whichever response arrives first is used. Until `min_samples`
+    latencies are known nothing is hedged, and the delay never drops below
+    `min_delay`, so a uniformly fast endpoint is not flooded with duplicates.
+
+    Hedges are paid from a budget: every request earns `max_ratio` of a
+    hedge (up to `burst` saved), so at most about that share of extra
+    requests is ever sent, even when the whole endpoint slows down.
+    All methods may be called from any thread.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        max_ratio: float = 0.1,
+        burst: int = 5,
+        window: int = 200,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.quantile = min(max(float(quantile), 0.0), 1.0)
+        self.max_ratio = max(0.0, float(max_ratio))
+        self.burst = max(1, int(burst))
+        self.min_samples = max(1, int(min_samples))
+        self.min_delay = max(0.0, float(min_delay))
+        self.logger = logger or logging.getLogger(__name__)
+        self._latencies: Deque[float] = deque(maxlen=max(int(window), self.min_samples))
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(
+        cls,
+        scraper_cfg: Dict[str, Any],
+        enabled: Optional[bool] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> Optional["HedgePolicy"]:
+        """
+        Build a policy from the `scraper.hedge` settings; None unless enabled.
+
+        `enabled`, when not None, overrides the configured `enabled` flag.
+        """
+        hedge_cfg = scraper_cfg.get("hedge") or {}
+        if not (enabled if enabled is not None else hedge_cfg.get("enabled", False)):
+            return None
+        return cls(
+            quantile=hedge_cfg.get("quantile", 0.95),
+            max_ratio=hedge_cfg.get("max_ratio", 0.1),
+            burst=hedge_cfg.get("burst", 5),
+            window=hedge_cfg.get("window", 200),
+            min_samples=hedge_cfg.get("min_samples", 20),
+            min_delay=hedge_cfg.get("min_delay", 0.05),
+            logger=logger,
+        )
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def delay(self) -> Optional[float]:
+        """
+        Seconds to wait before hedging a request that is about to be sent; None to not hedge.
+
+        Each call also earns the request its share of the hedge budget.
+        """
+        with self._lock:
+            self._tokens = min(float(self.burst), self._tokens + self.max_ratio)
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(int(self.quantile * len(ordered)), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+    def try_spend(self) -> bool:
+        """
+        Take one hedge from the budget; False if it is spent.
+        """
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
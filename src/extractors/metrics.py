@@ -0,0 +1,351 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECORD_BUCKETS = (0, 1, 5, 10, 20, 30, 50, 100)
+
+# name -> (type, help, histogram buckets)
+METRICS: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {
+    "tiktok_requests_total": (
+        "counter",
+        "HTTP attempts against the search endpoint by status code ('error' = network failure).",
+        (),
+    ),
+    "tiktok_request_seconds": ("histogram", "Wall time of one HTTP attempt.", LATENCY_BUCKETS),
+    "tiktok_response_ttfb_seconds": (
+        "histogram",
+        "Time from sending a request until its response headers were parsed.",
+        LATENCY_BUCKETS,
+    ),
+    "tiktok_response_bytes_total": ("counter", "Response body bytes downloaded.", ()),
+    "tiktok_retries_total": ("counter", "Attempts retried after a retryable failure.", ()),
+    "tiktok_sleep_seconds_total": (
+        "counter",
+        "Time spent sleeping by reason (rate_limit, backoff).",
+        (),
+    ),
+    "tiktok_cache_hits_total": ("counter", "Pages served from the response cache.", ()),
+    "tiktok_egress_requests_total": (
+        "counter",
+        "HTTP attempts per egress endpoint by status code.",
+        (),
+    ),
+    "tiktok_egress_ejections_total": (
+        "counter",
+        "Times an egress endpoint was taken out of rotation.",
+        (),
+    ),
+    "tiktok_hedges_total": (
+        "counter",
+        "Hedged requests by outcome (won = duplicate answered first, lost, denied = no budget).",
+        (),
+    ),
+    "tiktok_circuit_transitions_total": (
+        "counter",
+        "Circuit breaker state changes by new state (open, half_open, closed).",
+        (),
+    ),
+    "tiktok_circuit_rejected_total": (
+        "counter",
+        "Request attempts held back while the circuit breaker was open.",
+        (),
+    ),
+    "tiktok_prefetch_pages_total": (
+        "counter",
+        "Speculatively prefetched pages by outcome (hit = used, wasted = mispredicted).",
+        (),
+    ),
+    "tiktok_schema_drift_total": (
+        "counter",
+        "Search payload shape changes by the field whose location changed.",
+        (),
+    ),
+    "tiktok_extraction_fallbacks_total": (
+        "counter",
+        "User entries parsed defensively because they did not fit their page's extraction plan.",
+        (),
+    ),
+    "tiktok_fetch_seconds": (
+        "histogram",
+        "Time to obtain one page, including cache lookup, pacing and retries.",
+        LATENCY_BUCKETS,
+    ),
+    "tiktok_decode_seconds": ("histogram", "Time to decode one response body.", LATENCY_BUCKETS),
+    "tiktok_parse_seconds": (
+        "histogram",
+        "Time to extract user records from one decoded payload.",
+        LATENCY_BUCKETS,
+    ),
+    "tiktok_pages_total": ("counter", "Pages processed by the pagination loop.", ()),
+    "tiktok_records_per_page": ("histogram", "User records parsed per page.", RECORD_BUCKETS),
+    "tiktok_filtered_records_total": (
+        "counter",
+        "Parsed users dropped by the user filter before counting towards max_items.",
+        (),
+    ),
+    "tiktok_pagination_stops_total": ("counter", "Keywords finished, by stop reason.", ()),
+    "tiktok_export_seconds": (
+        "histogram",
+        "Time to write one batch (streaming) or one full export, by format.",
+        LATENCY_BUCKETS,
+    ),
+    "tiktok_export_records_total": ("counter", "Records written by the exporter, by format.", ()),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-quantile by linear interpolation inside its bucket, like
+        Prometheus' histogram_quantile, capped at the largest observed value.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return round(self.max, 6)
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                estimate = lower + (upper - lower) * (rank - seen) / count
+                return round(min(estimate, self.max), 6)
+            seen += count
+        return round(self.max, 6)
+
+class ScrapeMetrics:
+    """
+    In-process counters and histograms for the scraping hot path.
+
+    Components take an optional `metrics` argument and only record when it
+    is set, so passing None disables instrumentation with nothing on the
+    hot path but an `is not None` check. Recording is a dict lookup and a
+    bucket bisect under one lock, which is cheap next to an HTTP request.
+
+    Metric names and help texts are declared in METRICS. Results can be
+    rendered in the Prometheus text format (`render_prometheus`,
+    `write_prometheus`, `serve`) or summarised as JSON (`summary`).
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None) -> None:
+        self.logger = logger or logging.getLogger(__name__)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(METRICS[name][2])
+            histogram.observe(value)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        """
+        Value of one counter series, or the sum over all series without labels.
+        """
+        with self._lock:
+            series = self._counters.get(name, {})
+            if labels:
+                return series.get(tuple(sorted((k, str(v)) for k, v in labels.items())), 0.0)
+            return sum(series.values())
+
+    @staticmethod
+    def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(key) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        body = ",".join(
+            '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs
+        )
+        return "{" + body + "}"
+
+    def _iter_prometheus_lines(self) -> Iterator[str]:
+        for name, (kind, help_text, _) in METRICS.items():
+            if name not in self._counters and name not in self._histograms:
+                continue
+            yield f"# HELP {name} {help_text}"
+            yield f"# TYPE {name} {kind}"
+            if kind == "counter":
+                for key, value in sorted(self._counters[name].items()):
+                    yield f"{name}{self._format_labels(key)} {value:.17g}"
+                continue
+            for key, histogram in sorted(self._histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = self._format_labels(key, ("le", f"{bound:g}"))
+                    yield f"{name}_bucket{le} {cumulative}"
+                yield f"{name}_bucket{self._format_labels(key, ('le', '+Inf'))} {histogram.count}"
+                yield f"{name}_sum{self._format_labels(key)} {histogram.sum:.6f}"
+                yield f"{name}_count{self._format_labels(key)} {histogram.count}"
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            return "\n".join(self._iter_prometheus_lines()) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Atomically write the metrics for node_exporter's textfile collector.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> None:
+        """
+        Expose `/metrics` over HTTP from a daemon thread.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.logger.info("Serving metrics on http://%s:%d/metrics", host, port)
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        JSON-friendly snapshot: counter values and histogram count/sum/mean/p50/p90/p99/max.
+        """
+
+        def series_name(name: str, key: LabelKey) -> str:
+            return name + self._format_labels(key)
+
+        with self._lock:
+            counters = {
+                series_name(name, key): value
+                for name, series in self._counters.items()
+                for key, value in sorted(series.items())
+            }
+            histograms: Dict[str, Dict[str, Any]] = {}
+            for name, series in self._histograms.items():
+                for key, histogram in sorted(series.items()):
+                    histograms[series_name(name, key)] = {
+                        "count": histogram.count,
+                        "sum": round(histogram.sum, 6),
+                        "mean": round(histogram.sum / histogram.count, 6),
+                        "p50": histogram.quantile(0.5),
+                        "p90": histogram.quantile(0.9),
+                        "p99": histogram.quantile(0.99),
+                        "max": round(histogram.max, 6),
+                    }
+        return {
+            "elapsed_seconds": round(time.time() - self.started_at, 3),
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def write_summary(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def _histogram_total(self, name: str) -> Tuple[int, float]:
+        with self._lock:
+            series: List[_Histogram] = list(self._histograms.get(name, {}).values())
+            return sum(h.count for h in series), sum(h.sum for h in series)
+
+    def log_summary(self) -> None:
+        requests, request_time = self._histogram_total("tiktok_request_seconds")
+        _, fetch_time = self._histogram_total("tiktok_fetch_seconds")
+        _, decode_time = self._histogram_total("tiktok_decode_seconds")
+        _, parse_time = self._histogram_total("tiktok_parse_seconds")
+        _, export_time = self._histogram_total("tiktok_export_seconds")
+        self.logger.info(
+            "Metrics: %d pages, %d requests (%d retries), %.1f MB downloaded; "
+            "time in requests %.1fs, fetch %.1fs, sleeping %.1fs, decode %.2fs, "
+            "parse %.2fs, export %.2fs",
+            self.counter_value("tiktok_pages_total"),
+            requests,
+            self.counter_value("tiktok_retries_total"),
+            self.counter_value("tiktok_response_bytes_total") / (1024 * 1024),
+            request_time,
+            fetch_time,
+            self.counter_value("tiktok_sleep_seconds_total"),
+            decode_time,
+            parse_time,
+            export_time,
+        )
+        hedges = self.counter_value("tiktok_hedges_total")
+        rejected = self.counter_value("tiktok_circuit_rejected_total")
+        if hedges or rejected:
+            self.logger.info(
+                "Resilience: %d hedges sent (%d won), %d denied by budget; "
+                "circuit opened %d times, %d attempts held back",
+                hedges - self.counter_value("tiktok_hedges_total", outcome="denied"),
+                self.counter_value("tiktok_hedges_total", outcome="won"),
+                self.counter_value("tiktok_hedges_total", outcome="denied"),
+                self.counter_value("tiktok_circuit_transitions_total", state="open"),
+                rejected,
+            )
+        drift = self.counter_value("tiktok_schema_drift_total")
+        fallbacks = self.counter_value("tiktok_extraction_fallbacks_total")
+        if drift or fallbacks:
+            self.logger.warning(
+                "Schema: %d payload field change(s) seen, %d entries parsed defensively",
+                drift,
+                fallbacks,
+            )
+        prefetched = self.counter_value("tiktok_prefetch_pages_total")
+        if prefetched:
+            self.logger.info(
+                "Prefetch: %d pages used, %d requests wasted on mispredicted cursors",
+                self.counter_value("tiktok_prefetch_pages_total", outcome="hit"),
+                self.counter_value("tiktok_prefetch_pages_total", outcome="wasted"),
+            )
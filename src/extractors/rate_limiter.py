@@ -0,0 +1,172 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+# Status codes that signal throttling or a transient server-side failure
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Convert a Retry-After header into a delay in seconds.
+
+    Both forms allowed by RFC 9110 are handled: delta-seconds and HTTP-date.
+    Returns None when the header is absent or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Exponential backoff with full jitter for the given zero-based retry attempt.
+    """
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+class AdaptiveRateLimiter:
+    """
+    Token-bucket rate limiter shared by every worker of a run.
+
+    The bucket refills at the current rate, which starts at
+    `requests_per_second`. Throttling signals (429/5xx) cut the rate
+    multiplicatively and may pause all callers until a Retry-After deadline;
+    healthy responses raise it back additively towards the target.
+
+    State is guarded by a `threading.Lock` that is only held for arithmetic,
+    so the same instance can be used from threads (`acquire`) and from
+    asyncio tasks (`acquire_async`) at the same time.
+    A non-positive `requests_per_second` disables throttling except for
+    Retry-After pauses.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float,
+        burst: int = 1,
+        min_requests_per_second: float = 0.1,
+        decrease_factor: float = 0.5,
+        increase_step: Optional[float] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.target_rate = float(requests_per_second)
+        self.burst = max(1, int(burst))
+        self.min_rate = min(float(min_requests_per_second), max(self.target_rate, 0.0))
+        self.decrease_factor = decrease_factor
+        self.increase_step = (
+            increase_step if increase_step is not None else max(self.target_rate * 0.1, 0.01)
+        )
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._rate = self.target_rate
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    @classmethod
+    def from_config(
+        cls,
+        scraper_cfg: Dict[str, Any],
+        logger: Optional[logging.Logger] = None,
+    ) -> "AdaptiveRateLimiter":
+        """
+        Build a limiter from the `scraper` section of settings.json.
+
+        Without a `rate_limit` block the legacy `sleep_between_requests`
+        value is turned into the equivalent requests-per-second target.
+        """
+        rate_cfg = scraper_cfg.get("rate_limit") or {}
+        if "requests_per_second" in rate_cfg:
+            rps = float(rate_cfg["requests_per_second"])
+        else:
+            sleep = float(scraper_cfg.get("sleep_between_requests", 1.0))
+            rps = 1.0 / sleep if sleep > 0 else 0.0
+        return cls(
+            requests_per_second=rps,
+            burst=rate_cfg.get("burst", 1),
+            min_requests_per_second=rate_cfg.get("min_requests_per_second", 0.1),
+            decrease_factor=rate_cfg.get("decrease_factor", 0.5),
+            increase_step=rate_cfg.get("increase_step"),
+            logger=logger,
+        )
+
+    @property
+    def current_rate(self) -> float:
+        with self._lock:
+            return self._rate
+
+    def _reserve(self) -> float:
+        """
+        Take one token and return how long the caller must wait before sending.
+
+        Tokens may go negative; the debt makes concurrent callers queue up
+        behind each other instead of all waking at the same instant.
+        """
+        with self._lock:
+            now = time.monotonic()
+            pause = max(self._blocked_until - now, 0.0)
+            if self._rate <= 0:
+                return pause
+
+            elapsed = now - self._updated
+            self._updated = now
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self._rate)
+            self._tokens -= 1.0
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+            return max(wait, pause)
+
+    def acquire(self) -> float:
+        """
+        Block the current thread until a request may be sent; returns seconds waited.
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """
+        Asyncio counterpart of `acquire` that suspends the task instead of the thread.
+        """
+        import asyncio  # already loaded by the running loop; kept off sync start-up
+
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def record_success(self) -> None:
+        """
+        Ramp the rate back up towards the target after a healthy response.
+        """
+        with self._lock:
+            if 0 < self._rate < self.target_rate:
+                self._rate = min(self.target_rate, self._rate + self.increase_step)
+
+    def record_throttle(self, retry_after: Optional[float] = None) -> None:
+        """
+        Slow down after a 429/5xx and optionally pause everyone until Retry-After elapses.
+        """
+        with self._lock:
+            if self._rate > 0:
+                self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            rate = self._rate
+        self.logger.info(
+            "Throttled by TikTok; rate lowered to %.2f req/s (retry_after=%s)", rate, retry_after
+        )
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+class ResponseCache:
+    """
+    On-disk cache of raw search-page responses backed by SQLite.
+
+    Entries are keyed on the request identity (base_url, keyword, cursor,
+    count, lang) and stored zlib-compressed. Entries older than
+    `ttl_seconds` are treated as misses. Once the compressed total exceeds
+    `max_bytes`, the least recently used entries are evicted.
+    A single connection guarded by a lock is shared, so one instance can
+    serve every worker thread of a run.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 86400.0,
+        max_bytes: int = 512 * 1024 * 1024,
+        compression_level: int = 6,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        self._total_bytes = int(row[0])
+
+    @staticmethod
+    def make_key(base_url: str, params: Dict[str, Any]) -> str:
+        identity = [
+            base_url,
+            params.get("keyword"),
+            params.get("cursor"),
+            params.get("count"),
+            params.get("lang"),
+        ]
+        return hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[bytes]:
+        """
+        Return the cached response body for `key`, or None on a miss or expired entry.
+
+        `allow_stale` ignores the TTL, which is what offline replays want.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            body, created_at = row
+            if not allow_stale and self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+        return zlib.decompress(body)
+
+    def put(self, key: str, body: bytes) -> None:
+        compressed = zlib.compress(body, self.compression_level)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, compressed, len(compressed), now, now),
+            )
+            self._total_bytes += len(compressed) - (old[0] if old else 0)
+            self.stats["stores"] += 1
+            if self.max_bytes and self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Caller holds the lock. Drop least recently used rows until under the cap.
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            doomed = []
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                self._total_bytes -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            self.stats["evictions"] += len(doomed)
+
+    def log_stats(self) -> None:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        self.logger.info(
+            "Response cache: %d hits, %d misses (%d expired), hit rate %.1f%%, "
+            "%d stored, %d evicted, %.1f MB on disk",
+            self.stats["hits"],
+            self.stats["misses"],
+            self.stats["expired"],
+            100.0 * self.stats["hits"] / lookups if lookups else 0.0,
+            self.stats["stores"],
+            self.stats["evictions"],
+            self._total_bytes / (1024 * 1024),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,16 +1,77 @@
-thonimport json
+thonimport copy
+import json
 import logging
 import time
-from typing import Any, Dict, List, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
 
 import requests
 
+from extractors.circuit_breaker import CircuitBreaker
+from extractors.egress_pool import EgressPool, build_http_session
+from extractors.extraction_plan import ExtractedPage, ExtractionPlanner, parse_user_entry
+from extractors.fast_decoder import DecodedPage, FastPayloadDecoder
+from extractors.hedging import HedgePolicy
+from extractors.metrics import ScrapeMetrics
+from extractors.rate_limiter import (
+    RETRYABLE_STATUS_CODES,
+    AdaptiveRateLimiter,
+    backoff_delay,
+    parse_retry_after,
+)
+from extractors.response_cache import ResponseCache
+from extractors.user_filter import UserFilter
 from extractors.utils_pagination import (
     get_has_more_flag,
     get_next_cursor,
     should_continue_pagination,
 )
 
+class FetchFailed:
+    """
+    Returned instead of a page when TikTok could not be reached or refused the request.
+    """
+
+FETCH_FAILED = FetchFailed()
+
+# Stop reasons of keywords that did not really end, so must not be marked done
+FAILED_STOP_REASONS = frozenset({"fetch_failed", "error"})
+
+# A fetched page: the generic JSON payload, a DecodedPage from the fast decoder,
+# or FETCH_FAILED
+Page = Union[Dict[str, Any], DecodedPage, FetchFailed]
+
+class SearchPage(NamedTuple):
+    """
+    One parsed page of search results for a keyword.
+
+    `cursor` is the cursor the page was requested with, `next_cursor` the one
+    to request next (None once the keyword is finished) and `collected` the
+    number of users accepted for the keyword so far, including this page.
+    The final page also carries `stop_reason`, why pagination ended.
+    `requests` is 0 for pages that only mark the end of a keyword.
+    """
+
+    keyword: str
+    users: List[Dict[str, Any]]
+    cursor: Optional[int]
+    next_cursor: Optional[int]
+    collected: int
+    stop_reason: Optional[str] = None
+    requests: int = 1
+
+# A keyword to search, alone or paired with its own max_items (None for the default)
+KeywordEntry = Union[str, Tuple[str, Optional[int]]]
+
+def keyword_limit(entry: KeywordEntry, max_items: int) -> Tuple[str, int]:
+    """
+    Split a keyword entry into the keyword and the max_items that applies to it.
+    """
+    if isinstance(entry, str):
+        return entry, max_items
+    keyword, keyword_max_items = entry
+    return keyword, keyword_max_items if keyword_max_items is not None else max_items
+
 class TikTokUserScraper:
     """
     Scrapes TikTok user search results into structured Python dictionaries.
@@ -20,6 +81,52 @@ class TikTokUserScraper:
     - Network and parsing errors are logged and result in graceful degradation.
     - Unexpected response shapes simply produce fewer or no records,
       without raising fatal exceptions.
+
+    Requests are paced by an AdaptiveRateLimiter (shared between scrapers if
+    the same instance is passed in). When none is given, one is derived from
+    `sleep_between_requests`. Throttling and transient failures are retried
+    up to `max_retries` times with jittered exponential backoff. When every
+    attempt fails (or TikTok answers with a non-retryable error status), the
+    keyword ends with stop reason "fetch_failed", one of FAILED_STOP_REASONS
+    that checkpoints and work queues do not treat as finished.
+
+    With a ResponseCache, pages are served from disk when a fresh copy
+    exists; `offline=True` never touches the network and treats cache
+    misses as the end of pagination.
+
+    `fast_decode=True` decodes pages with FastPayloadDecoder (msgspec
+    structs, UserRecord objects). Payloads it cannot handle fall back to
+    the generic dict path.
+
+    With a ScrapeMetrics instance, request latencies, status codes, bytes,
+    retries, sleeps, decode/parse times and records per page are recorded.
+    Without one (the default) nothing is measured.
+
+    Requests go through one keep-alive Session sized by `pool_maxsize`
+    (with `pool_block`, threads wait for a free connection instead of
+    opening extra ones), or, with an EgressPool, through whichever proxy
+    endpoint is healthiest.
+
+    With a HedgePolicy, a request still unanswered after the policy's
+    delay gets a duplicate (paced by the rate limiter like any request)
+    and the first response wins. With a CircuitBreaker, every attempt's
+    outcome is reported to it. While it is open, requests are held back
+    without being sent, and without using up a retry, until the breaker lets
+    probes through; a request held back for the breaker's
+    `max_hold_seconds` in total fails instead. Cached pages are still served.
+
+    Decoded payloads are extracted through an ExtractionPlanner, which
+    compiles direct lookups for the payload shape it sees and warns when
+    that shape changes; `extraction_plans=False` always uses the defensive
+    `_parse_users_from_response`. Records are the same either way.
+
+    `stop_early(keyword)` is asked after every page that would be followed
+    by another; returning True ends the keyword there (stop reason
+    "unchanged"), and returning a string ends it with that stop reason.
+    Incremental runs use it to skip pages of known users, the request
+    budget to drop keywords that stopped finding new ones.
+    The async scraper asks while earlier pages may still be waiting for the
+    consumer, so it can stop a page or so later than a sequential run.
     """
 
     def __init__(
@@ -29,37 +136,115 @@ class TikTokUserScraper:
         timeout_seconds: int = 10,
         sleep_between_requests: float = 1.0,
         logger: Optional[logging.Logger] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        response_cache: Optional[ResponseCache] = None,
+        offline: bool = False,
+        fast_decode: bool = False,
+        metrics: Optional[ScrapeMetrics] = None,
+        egress_pool: Optional[EgressPool] = None,
+        accept_encoding: Optional[str] = None,
+        keep_alive: bool = True,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        stop_early: Optional[Callable[[str], Union[bool, str, None]]] = None,
+        user_filter: Optional[UserFilter] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        extraction_plans: bool = True,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.user_agent = user_agent
         self.timeout_seconds = timeout_seconds
         self.sleep_between_requests = sleep_between_requests
         self.logger = logger or logging.getLogger(__name__)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(
+            requests_per_second=1.0 / sleep_between_requests if sleep_between_requests > 0 else 0.0,
+            logger=self.logger,
+        )
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.response_cache = response_cache
+        self.offline = offline
+        self.fast_decoder = FastPayloadDecoder(logger=self.logger) if fast_decode else None
+        if self.fast_decoder is not None and not self.fast_decoder.available:
+            self.logger.warning(
+                "Fast decoding needs msgspec (pip install msgspec); decoding pages generically"
+            )
+        self.metrics = metrics
+        self.egress_pool = egress_pool
+        self.accept_encoding = accept_encoding
+        self.keep_alive = keep_alive
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.stop_early = stop_early
+        self.user_filter = user_filter
+        self.hedge_policy = hedge_policy
+        self.circuit_breaker = circuit_breaker
+        self.extraction_planner = (
+            ExtractionPlanner(logger=self.logger, metrics=metrics) if extraction_plans else None
+        )
         self.session = self._build_session()
+        # Hedged requests wait on a primary and a duplicate, both run here
+        self._hedge_executor = (
+            ThreadPoolExecutor(max_workers=2 * pool_maxsize, thread_name_prefix="tiktok-hedge")
+            if hedge_policy is not None
+            else None
+        )
 
     def _build_session(self) -> requests.Session:
-        session = requests.Session()
-        session.headers.update(
-            {
-                "User-Agent": self.user_agent,
-                "Accept": "application/json,text/plain;q=0.9,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9",
-            }
+        return build_http_session(
+            self.user_agent,
+            accept_encoding=self.accept_encoding,
+            keep_alive=self.keep_alive,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
         )
-        return session
+
+    def derive(self, **overrides: Any) -> "TikTokUserScraper":
+        """
+        Shallow copy with some attributes replaced, e.g. a per-job `user_filter`.
+
+        The copy shares the session, rate limiter, cache, metrics and pools,
+        so jobs run through it reuse warm connections and one request budget.
+        """
+        clone = copy.copy(self)
+        for name, value in overrides.items():
+            setattr(clone, name, value)
+        return clone
 
     def _fetch_search_page(
         self,
         keyword: str,
         cursor: int | None,
         count: int,
-    ) -> Optional[Dict[str, Any]]:
+    ) -> Optional[Page]:
         """
         Perform a single HTTP request to TikTok's search API.
 
         The actual parameters used by TikTok may evolve; this function aims
         to be reasonably compatible while remaining robust to failures.
         """
+        if self.metrics is None:
+            return self._request_search_page(keyword, cursor, count)
+        start = time.perf_counter()
+        try:
+            return self._request_search_page(keyword, cursor, count)
+        finally:
+            self.metrics.observe("tiktok_fetch_seconds", time.perf_counter() - start)
+
+    def _request_search_page(
+        self,
+        keyword: str,
+        cursor: int | None,
+        count: int,
+    ) -> Optional[Page]:
         params: Dict[str, Any] = {
             "keyword": keyword,
             "count": count,
@@ -68,32 +253,219 @@ class TikTokUserScraper:
             "lang": "en",
         }
 
-        try:
-            response = self.session.get(
-                self.base_url,
-                params=params,
-                timeout=self.timeout_seconds,
+        cache_key: Optional[str] = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.make_key(self.base_url, params)
+            cached = self.response_cache.get(cache_key, allow_stale=self.offline)
+            if cached is not None:
+                cached_payload = self._decode_payload(cached)
+                if cached_payload is not None:
+                    if self.metrics is not None:
+                        self.metrics.inc("tiktok_cache_hits_total")
+                    return cached_payload
+                self.logger.warning("Ignoring undecodable cached page for '%s'", keyword)
+
+        if self.offline:
+            self.logger.info(
+                "Offline mode: no cached page for '%s' at cursor %s", keyword, cursor
             )
-        except requests.RequestException as exc:
-            self.logger.warning("HTTP error while querying TikTok for '%s': %s", keyword, exc)
             return None
 
-        if not response.ok:
+        metrics = self.metrics
+        breaker = self.circuit_breaker
+        http = self.egress_pool if self.egress_pool is not None else self.session
+        response: Optional[requests.Response] = None
+        attempt = 0
+        held = False
+        held_for = 0.0
+        while True:
+            retry_after: Optional[float] = None
+            if breaker is not None and not breaker.allow():
+                # Not sent, so no retry is used up: wait until probes are let through
+                if held_for >= breaker.max_hold_seconds:
+                    self.logger.warning(
+                        "Circuit breaker held '%s' at cursor %s for %.0fs; giving up",
+                        keyword,
+                        cursor,
+                        held_for,
+                    )
+                    return FETCH_FAILED
+                if not held:
+                    self.logger.warning(
+                        "Circuit breaker open; holding '%s' at cursor %s until it admits requests",
+                        keyword,
+                        cursor,
+                    )
+                    held = True
+                delay = min(
+                    max(breaker.retry_in(), self.backoff_base, 0.05),
+                    breaker.max_hold_seconds - held_for,
+                )
+                held_for += delay
+                if metrics is not None:
+                    metrics.inc("tiktok_sleep_seconds_total", delay, reason="circuit")
+                time.sleep(delay)
+                continue
+            held = False
+            waited = self.rate_limiter.acquire()
+            if metrics is not None:
+                if attempt:
+                    metrics.inc("tiktok_retries_total")
+                if waited:
+                    metrics.inc("tiktok_sleep_seconds_total", waited, reason="rate_limit")
+                sent_at = time.perf_counter()
+            try:
+                response = self._send(http, params)
+            except requests.RequestException as exc:
+                if breaker is not None:
+                    breaker.record(False)
+                if metrics is not None:
+                    metrics.observe("tiktok_request_seconds", time.perf_counter() - sent_at)
+                    metrics.inc("tiktok_requests_total", status="error")
+                self.logger.warning(
+                    "HTTP error while querying TikTok for '%s' (attempt %d/%d): %s",
+                    keyword,
+                    attempt + 1,
+                    self.max_retries + 1,
+                    exc,
+                )
+                response = None
+            else:
+                if breaker is not None:
+                    breaker.record(response.ok)
+                if metrics is not None:
+                    metrics.observe("tiktok_request_seconds", time.perf_counter() - sent_at)
+                    metrics.observe(
+                        "tiktok_response_ttfb_seconds", response.elapsed.total_seconds()
+                    )
+                    metrics.inc("tiktok_requests_total", status=response.status_code)
+                    metrics.inc("tiktok_response_bytes_total", len(response.content))
+                if response.ok:
+                    self.rate_limiter.record_success()
+                    break
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    self.logger.warning(
+                        "Received non-OK status %s from TikTok for keyword '%s'",
+                        response.status_code,
+                        keyword,
+                    )
+                    return FETCH_FAILED
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                self.rate_limiter.record_throttle(retry_after)
+                self.logger.warning(
+                    "Received retryable status %s from TikTok for keyword '%s' "
+                    "(attempt %d/%d)",
+                    response.status_code,
+                    keyword,
+                    attempt + 1,
+                    self.max_retries + 1,
+                )
+
+            if attempt >= self.max_retries:
+                break
+            delay = max(
+                backoff_delay(attempt, self.backoff_base, self.backoff_max),
+                retry_after or 0.0,
+            )
+            if metrics is not None:
+                metrics.inc("tiktok_sleep_seconds_total", delay, reason="backoff")
+            time.sleep(delay)
+            attempt += 1
+
+        if response is None or not response.ok:
             self.logger.warning(
-                "Received non-OK status %s from TikTok for keyword '%s'",
-                response.status_code,
+                "Giving up on keyword '%s' at cursor %s after %d attempts",
                 keyword,
+                cursor,
+                self.max_retries + 1,
             )
+            return FETCH_FAILED
+
+        payload = self._decode_payload(response.content)
+        if payload is None:
             return None
 
+        if cache_key is not None:
+            self.response_cache.put(cache_key, response.content)
+
+        return payload
+
+    def _get(self, http: Any, params: Dict[str, Any]) -> requests.Response:
+        start = time.perf_counter()
+        response = http.get(self.base_url, params=params, timeout=self.timeout_seconds)
+        if self.hedge_policy is not None:
+            self.hedge_policy.observe(time.perf_counter() - start)
+        return response
+
+    def _get_hedge(self, http: Any, params: Dict[str, Any]) -> requests.Response:
+        self.rate_limiter.acquire()
+        return self._get(http, params)
+
+    def _send(self, http: Any, params: Dict[str, Any]) -> requests.Response:
+        """
+        Send one search request, hedged with a duplicate when it is slower than usual.
+        """
+        hedge = self.hedge_policy
+        delay = hedge.delay() if hedge is not None else None
+        if delay is None or self._hedge_executor is None:
+            return self._get(http, params)
+
+        primary = self._hedge_executor.submit(self._get, http, params)
+        done, _ = wait((primary,), timeout=delay)
+        if done:
+            return primary.result()
+        if not hedge.try_spend():
+            if self.metrics is not None:
+                self.metrics.inc("tiktok_hedges_total", outcome="denied")
+            return primary.result()
+
+        secondary = self._hedge_executor.submit(self._get_hedge, http, params)
+        pending = {primary, secondary}
+        errors: List[BaseException] = []
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                try:
+                    response = future.result()
+                except requests.RequestException as exc:
+                    errors.append(exc)
+                    continue
+                # The slower request keeps running; its response is dropped
+                self._count_hedge(future is secondary)
+                return response
+        self._count_hedge(False)
+        raise errors[0]
+
+    def _count_hedge(self, won: bool) -> None:
+        if self.metrics is not None:
+            self.metrics.inc("tiktok_hedges_total", outcome="won" if won else "lost")
+
+    def _decode_payload(self, body: bytes) -> Optional[Page]:
+        """
+        Decode a raw response body, via the typed fast path when enabled.
+        """
+        if self.metrics is None:
+            return self._decode_body(body)
+        start = time.perf_counter()
+        try:
+            return self._decode_body(body)
+        finally:
+            self.metrics.observe("tiktok_decode_seconds", time.perf_counter() - start)
+
+    def _decode_body(self, body: bytes) -> Optional[Page]:
+        loads = json.loads
+        if self.fast_decoder is not None:
+            page = self.fast_decoder.decode(body)
+            if page is not None:
+                return page
+            loads = self.fast_decoder.loads
+
         try:
-            payload: Dict[str, Any] = response.json()
-        except json.JSONDecodeError as exc:
+            return loads(body)
+        except ValueError as exc:
             self.logger.warning("Failed to decode TikTok response as JSON: %s", exc)
             return None
 
-        return payload
-
     def _parse_users_from_response(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Extracts user profiles from a TikTok search response payload.
@@ -129,113 +501,168 @@ class TikTokUserScraper:
             return []
 
         parsed: List[Dict[str, Any]] = []
-
         for entry in user_list:
-            if not isinstance(entry, dict):
-                continue
-
-            user_info = entry.get("user_info") or entry.get("user") or {}
-            if not isinstance(user_info, dict):
-                user_info = {}
-
-            stats = entry.get("stats") or {}
-            if not isinstance(stats, dict):
-                stats = {}
-
-            uid = user_info.get("uid")
-            sec_uid = user_info.get("sec_uid")
-            unique_id = user_info.get("unique_id") or user_info.get("short_id")
-            nickname = user_info.get("nickname")
-            signature = user_info.get("signature") or ""
-            avatar_thumb = user_info.get("avatar_thumb") or user_info.get("avatarThumb") or {}
-            follower_count = (
-                stats.get("follower_count")
-                or stats.get("followerCount")
-                or stats.get("followerCountStr")
-            )
-            custom_verify = user_info.get("custom_verify") or user_info.get(
-                "enterprise_verify_reason"
-            )
-            follow_status = entry.get("follow_status")
-            platform_sync_info = entry.get("platform_sync_info")
+            record = parse_user_entry(entry)
+            if record is not None:
+                parsed.append(record)
 
-            # Skip records that are clearly invalid
-            if not uid and not unique_id and not sec_uid:
-                continue
-
-            record: Dict[str, Any] = {
-                "uid": uid,
-                "nickname": nickname,
-                "signature": signature,
-                "avatar_thumb": avatar_thumb,
-                "follower_count": follower_count,
-                "custom_verify": custom_verify,
-                "unique_id": unique_id,
-                "sec_uid": sec_uid,
-                "follow_status": follow_status,
-                "platform_sync_info": platform_sync_info,
-            }
+        return parsed
 
-            parsed.append(record)
+    def _extract_page(self, payload: Dict[str, Any]) -> ExtractedPage:
+        """
+        Users, has-more flag and next cursor of a decoded payload.
 
-        return parsed
+        Goes through the compiled plan for the payload's shape when there
+        is one, else through the defensive parser.
+        """
+        if self.extraction_planner is not None:
+            page = self.extraction_planner.extract(payload)
+            if page is not None:
+                return page
+        return (
+            self._parse_users_from_response(payload),
+            get_has_more_flag(payload),
+            get_next_cursor(payload),
+        )
 
-    def search_users(self, keyword: str, max_items: int = 50) -> List[Dict[str, Any]]:
+    def _consume_page(
+        self,
+        keyword: str,
+        payload: Optional[Page],
+        collected_count: int,
+        max_items: int,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int], Optional[str]]:
         """
-        Fetch up to `max_items` TikTok users for the given keyword, following pagination.
+        Process one fetched page and decide whether pagination should go on.
+
+        Returns the users accepted from this page (those passing `user_filter`,
+        trimmed so the keyword never exceeds `max_items`), the cursor of the next page, or None when
+        pagination for this keyword should stop, and the reason for stopping.
         """
-        collected: List[Dict[str, Any]] = []
-        cursor: Optional[int] = 0
-        has_more: bool = True
+        metrics = self.metrics
+        if payload is None:
+            self.logger.info(
+                "Stopping pagination for '%s' due to missing/invalid payload.", keyword
+            )
+            return [], None, self._stopped("invalid_payload")
+        if payload is FETCH_FAILED:
+            self.logger.warning("Stopping pagination for '%s': fetching a page failed.", keyword)
+            return [], None, self._stopped("fetch_failed")
+
+        if isinstance(payload, DecodedPage):
+            users: List[Any] = payload.users
+            has_more, cursor = payload.has_more, payload.cursor
+        elif metrics is None:
+            users, has_more, cursor = self._extract_page(payload)
+        else:
+            start = time.perf_counter()
+            users, has_more, cursor = self._extract_page(payload)
+            metrics.observe("tiktok_parse_seconds", time.perf_counter() - start)
 
-        # TikTok often returns 20-30 records per page; we ask for a bit more
-        page_size = min(max_items, 30)
+        if metrics is not None:
+            metrics.inc("tiktok_pages_total")
+            metrics.observe("tiktok_records_per_page", len(users))
 
-        while should_continue_pagination(len(collected), max_items, has_more):
-            payload = self._fetch_search_page(keyword=keyword, cursor=cursor, count=page_size)
-            if payload is None:
-                self.logger.info(
-                    "Stopping pagination for '%s' due to missing/invalid payload.", keyword
-                )
-                break
+        if not users:
+            self.logger.info(
+                "No users parsed from response for '%s'; stopping pagination.", keyword
+            )
+            return [], None, self._stopped("no_users")
 
-            users = self._parse_users_from_response(payload)
-            if not users:
-                self.logger.info(
-                    "No users parsed from response for '%s'; stopping pagination.", keyword
-                )
-                break
+        if self.user_filter is not None:
+            matching = self.user_filter.apply(users)
+            if metrics is not None and len(matching) < len(users):
+                metrics.inc("tiktok_filtered_records_total", len(users) - len(matching))
+            users = matching
 
-            for user in users:
-                if len(collected) >= max_items:
-                    break
-                collected.append(user)
+        accepted = users[: max(max_items - collected_count, 0)]
+        collected_count += len(accepted)
 
-            has_more = get_has_more_flag(payload)
-            cursor = get_next_cursor(payload)
+        self.logger.debug(
+            "Pagination state for '%s': collected=%d, has_more=%s, next_cursor=%s",
+            keyword,
+            collected_count,
+            has_more,
+            cursor,
+        )
 
-            self.logger.debug(
-                "Pagination state for '%s': collected=%d, has_more=%s, next_cursor=%s",
-                keyword,
-                len(collected),
-                has_more,
-                cursor,
+        if not should_continue_pagination(collected_count, max_items, has_more):
+            reason = "max_items" if collected_count >= max_items else "has_more"
+            return accepted, None, self._stopped(reason)
+
+        if cursor is None:
+            self.logger.info(
+                "No cursor returned for '%s'; assuming no more pages.", keyword
             )
+            return accepted, None, self._stopped("no_cursor")
 
-            if not should_continue_pagination(len(collected), max_items, has_more):
-                break
+        return accepted, cursor, None
 
-            if cursor is None:
-                self.logger.info(
-                    "No cursor returned for '%s'; assuming no more pages.", keyword
-                )
-                break
+    def _stopped(self, reason: str) -> str:
+        if self.metrics is not None:
+            self.metrics.inc("tiktok_pagination_stops_total", reason=reason)
+        return reason
 
-            time.sleep(self.sleep_between_requests)
+    def _should_stop_early(self, keyword: str) -> Optional[str]:
+        verdict = self.stop_early(keyword) if self.stop_early is not None else None
+        if not verdict:
+            return None
+        if verdict is True:
+            self.logger.info(
+                "Stopping pagination for '%s': recent pages held no new or changed users.", keyword
+            )
+            return self._stopped("unchanged")
+        self.logger.info("Stopping pagination for '%s': %s.", keyword, verdict)
+        return self._stopped(str(verdict))
+
+    def iter_user_pages(
+        self,
+        keyword: str,
+        max_items: int = 50,
+        start_cursor: int = 0,
+        start_collected: int = 0,
+    ) -> Iterator[SearchPage]:
+        """
+        Lazily paginate a keyword, yielding each page's users as soon as it is parsed.
+
+        The final page of a keyword always has `next_cursor=None` (an empty
+        page is yielded if nothing could be fetched), so consumers can tell
+        when a keyword is finished without holding its records in memory.
+        """
+        collected_count = start_collected
+        cursor: Optional[int] = start_cursor
+
+        # TikTok often returns 20-30 records per page; we ask for a bit more
+        page_size = min(max_items, 30)
+
+        if not should_continue_pagination(collected_count, max_items, True):
+            yield SearchPage(keyword, [], cursor, None, collected_count, "max_items", 0)
+            return
+
+        while cursor is not None:
+            payload = self._fetch_search_page(keyword=keyword, cursor=cursor, count=page_size)
+            users, next_cursor, stop_reason = self._consume_page(
+                keyword, payload, collected_count, max_items
+            )
+            collected_count += len(users)
+            yield SearchPage(keyword, users, cursor, next_cursor, collected_count, stop_reason)
+            early_stop = self._should_stop_early(keyword) if next_cursor is not None else None
+            if early_stop is not None:
+                yield SearchPage(keyword, [], next_cursor, None, collected_count, early_stop, 0)
+                next_cursor = None
+            cursor = next_cursor
 
         self.logger.info(
             "Finished search for '%s': collected %d user records.",
             keyword,
-            len(collected),
+            collected_count,
         )
-        return collected
\ No newline at end of file
+
+    def search_users(self, keyword: str, max_items: int = 50) -> List[Dict[str, Any]]:
+        """
+        Fetch up to `max_items` TikTok users for the given keyword, following pagination.
+        """
+        collected: List[Dict[str, Any]] = []
+        for page in self.iter_user_pages(keyword, max_items=max_items):
+            collected.extend(page.users)
+        return collected
@@ -0,0 +1,92 @@
+import re
+from typing import Any, List, Mapping, Optional
+
+from extractors.utils_normalize import parse_count, setting_count
+
+class UserFilter:
+    """
+    Predicate applied to every user as its page is parsed.
+
+    All configured conditions must hold:
+
+    - `min_followers` / `max_followers`: inclusive bounds on `follower_count`.
+      Users without a known count never match a bound.
+    - `verified_only`: `custom_verify` must be non-empty.
+    - `signature_regex` / `nickname_regex`: searched case-insensitively.
+
+    Users that fail are dropped before they count towards `max_items`, so
+    a keyword keeps paging until it has `max_items` matches (or runs out).
+    """
+
+    def __init__(
+        self,
+        min_followers: Optional[int] = None,
+        max_followers: Optional[int] = None,
+        verified_only: bool = False,
+        signature_regex: Optional[str] = None,
+        nickname_regex: Optional[str] = None,
+    ) -> None:
+        self.min_followers = min_followers
+        self.max_followers = max_followers
+        self.verified_only = verified_only
+        self.signature_regex = signature_regex
+        self.nickname_regex = nickname_regex
+        self._signature = re.compile(signature_regex, re.IGNORECASE) if signature_regex else None
+        self._nickname = re.compile(nickname_regex, re.IGNORECASE) if nickname_regex else None
+
+    @classmethod
+    def from_config(cls, filters_cfg: Mapping[str, Any]) -> Optional["UserFilter"]:
+        """
+        Build a filter from the `filters` config section, or None when it sets no condition.
+
+        Raises ValueError for follower bounds that are not exact counts.
+        """
+        user_filter = cls(
+            min_followers=setting_count(filters_cfg.get("min_followers"), "min_followers"),
+            max_followers=setting_count(filters_cfg.get("max_followers"), "max_followers"),
+            verified_only=bool(filters_cfg.get("verified_only", False)),
+            signature_regex=filters_cfg.get("signature_regex") or None,
+            nickname_regex=filters_cfg.get("nickname_regex") or None,
+        )
+        return user_filter if user_filter.conditions() else None
+
+    def conditions(self) -> List[str]:
+        """
+        Human-readable list of the active conditions (empty when the filter accepts everyone).
+        """
+        conditions = []
+        if self.min_followers is not None:
+            conditions.append(f"follower_count >= {self.min_followers}")
+        if self.max_followers is not None:
+            conditions.append(f"follower_count <= {self.max_followers}")
+        if self.verified_only:
+            conditions.append("verified")
+        if self.signature_regex:
+            conditions.append(f"signature ~ /{self.signature_regex}/i")
+        if self.nickname_regex:
+            conditions.append(f"nickname ~ /{self.nickname_regex}/i")
+        return conditions
+
+    def __call__(self, user: Mapping[str, Any]) -> bool:
+        if self.min_followers is not None or self.max_followers is not None:
+            followers = user.get("follower_count")
+            if not isinstance(followers, int):
+                followers = parse_count(followers)
+            if followers is None:
+                return False
+            if self.min_followers is not None and followers < self.min_followers:
+                return False
+            if self.max_followers is not None and followers > self.max_followers:
+                return False
+        if self.verified_only and not user.get("custom_verify"):
+            return False
+        if self._signature is not None and not self._signature.search(
+            user.get("signature") or ""
+        ):
+            return False
+        if self._nickname is not None and not self._nickname.search(user.get("nickname") or ""):
+            return False
+        return True
+
+    def apply(self, users: List[Any]) -> List[Any]:
+        return [user for user in users if self(user)]
@@ -0,0 +1,72 @@
+import math
+import re
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Any, Optional
+
+# "3.9M" / "1,2B": with a suffix, a comma is the decimal separator
+_SUFFIXED_COUNT_PATTERN = re.compile(r"^\s*([0-9]+(?:[.,][0-9]+)?)\s*([kmb])\s*$", re.IGNORECASE)
+# "1,234,567" / "1 234 567" / "1234.5": without one, commas and spaces group thousands
+_PLAIN_COUNT_PATTERN = re.compile(r"^\s*([0-9]{1,3}(?:[, ][0-9]{3})+|[0-9]+)(\.[0-9]+)?\s*$")
+_COUNT_MULTIPLIERS = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+
+def parse_count(value: Any, exact: bool = False) -> Optional[int]:
+    """
+    Normalize a TikTok count into an int.
+
+    Accepts ints, floats, digit strings ("3900000", "1,234,567") and the
+    abbreviated display form used by `followerCountStr` ("3.9M", "12.5K",
+    "1,2B"). Fractions are rounded, or rejected with `exact=True`.
+    Returns None for anything that is not recognisably a count.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        if not math.isfinite(value) or (exact and not value.is_integer()):
+            return None
+        # Half to even, like the strings below
+        return round(value)
+    if not isinstance(value, str):
+        return None
+
+    match = _SUFFIXED_COUNT_PATTERN.match(value)
+    if match:
+        number, suffix = match.groups()
+        count = Decimal(number.replace(",", ".")) * _COUNT_MULTIPLIERS[suffix.lower()]
+    else:
+        match = _PLAIN_COUNT_PATTERN.match(value)
+        if not match:
+            return None
+        whole, fraction = match.groups()
+        count = Decimal(whole.replace(",", "").replace(" ", "") + (fraction or ""))
+    if exact and count != count.to_integral_value():
+        return None
+    return int(count.to_integral_value(ROUND_HALF_EVEN))
+
+def setting_count(value: Any, name: str) -> Optional[int]:
+    """
+    Exact count from a setting such as "10k"; None when unset, ValueError when not a count.
+    """
+    if value is None or value == "":
+        return None
+    count = parse_count(value, exact=True)
+    if count is None:
+        raise ValueError(f"invalid {name}: {value!r} (e.g. 5000, 100k, 3.9M)")
+    return count
+
+def first_count(*values: Any) -> Optional[int]:
+    """
+    The first of `values` that parses to a non-zero count, else 0 if one parsed, else None.
+
+    Mirrors the `follower_count or followerCount or followerCountStr`
+    fallback of the parsers, but always yields an int.
+    """
+    fallback: Optional[int] = None
+    for value in values:
+        count = parse_count(value)
+        if count:
+            return count
+        if count is not None:
+            fallback = count
+    return fallback
@@ -2,9 +2,15 @@ thonimport argparse
 import json
 import logging
 import os
+import re
+import shutil
+import signal
+import socket
+import subprocess
 import sys
+import uuid
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
 
 # Ensure the src directory (this file's directory) is on sys.path so we can import sibling packages
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -15,8 +21,42 @@ if CURRENT_DIR not in sys.path:
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from extractors.tiktok_parser import TikTokUserScraper  # type: ignore
+from extractors.circuit_breaker import CircuitBreaker  # type: ignore
+from extractors.egress_pool import EgressPool  # type: ignore
+from extractors.fast_decoder import as_plain_dict  # type: ignore
+from extractors.hedging import HedgePolicy  # type: ignore
+from extractors.metrics import ScrapeMetrics  # type: ignore
+from extractors.rate_limiter import AdaptiveRateLimiter  # type: ignore
+from extractors.response_cache import ResponseCache  # type: ignore
+from extractors.tiktok_parser import (  # type: ignore
+    KeywordEntry,
+    SearchPage,
+    TikTokUserScraper,
+    keyword_limit,
+)
+from extractors.user_filter import UserFilter  # type: ignore
+from extractors.utils_normalize import parse_count, setting_count  # type: ignore
 from outputs.dataset_exporter import DatasetExporter  # type: ignore
+from outputs.sqlite_store import QUERY_COLUMNS, UserStore  # type: ignore
+from pipeline.avatars import AvatarDownloader  # type: ignore
+from pipeline.checkpoint import CheckpointJournal  # type: ignore
+from pipeline.dedup import DedupIndex  # type: ignore
+from pipeline.distributed import merge_shards, run_worker, wait_for_queue  # type: ignore
+from pipeline.job_server import Job, JobServer  # type: ignore
+from pipeline.keyword_input import (  # type: ignore
+    INPUT_FORMATS,
+    KeywordInput,
+    KeywordSpec,
+    parse_keyword_entry,
+)
+from pipeline.keyword_schedule import KeywordSchedule  # type: ignore
+from pipeline.page_exporter import PageExporter  # type: ignore
+from pipeline.snapshot import UserSnapshot  # type: ignore
+from pipeline.top_k import TopKSelector  # type: ignore
+from pipeline.work_queue import KeywordQueue  # type: ignore
+from pipeline.yield_budget import YieldBudget  # type: ignore
+
+DEFAULT_INPUT_PATH = os.path.join(PROJECT_ROOT, "data", "input.sample.json")
 
 def load_json_file(path: str) -> Any:
     if not os.path.exists(path):
@@ -42,12 +82,857 @@ def resolve_output_directory(arg_output_dir: str | None, config: Dict[str, Any])
     os.makedirs(output_dir, exist_ok=True)
     return output_dir
 
+def resolve_sqlite_path(config: Dict[str, Any]) -> str | None:
+    sqlite_path = config.get("output", {}).get("sqlite_path")
+    if sqlite_path and not os.path.isabs(sqlite_path):
+        sqlite_path = os.path.join(PROJECT_ROOT, sqlite_path)
+    return sqlite_path or None
+
+def open_response_cache(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+    logger: logging.Logger,
+) -> ResponseCache | None:
+    cache_cfg = config.get("cache", {})
+    if args.cache is None and not args.offline and not cache_cfg.get("enabled", False):
+        return None
+    cache_path = args.cache or cache_cfg.get("path", "data/cache/responses.sqlite3")
+    if not os.path.isabs(cache_path):
+        cache_path = os.path.join(PROJECT_ROOT, cache_path)
+    response_cache = ResponseCache(
+        path=cache_path,
+        ttl_seconds=cache_cfg.get("ttl_seconds", 86400),
+        max_bytes=int(cache_cfg.get("max_mb", 512) * 1024 * 1024),
+        logger=logging.getLogger("tiktok_response_cache"),
+    )
+    logger.info("Using response cache at %s (offline=%s)", cache_path, args.offline)
+    return response_cache
+
+def create_metrics(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+    use_config_port: bool = True,
+) -> Tuple[ScrapeMetrics | None, str | None]:
+    """
+    Return the run's ScrapeMetrics (None when disabled) and Prometheus file path.
+    """
+    metrics_cfg = config.get("metrics", {})
+    if not metrics_cfg.get("enabled", True) or args.no_metrics:
+        return None, None
+    metrics = ScrapeMetrics(logger=logging.getLogger("tiktok_metrics"))
+    metrics_port = args.metrics_port
+    if metrics_port is None and use_config_port:
+        metrics_port = metrics_cfg.get("port")
+    if metrics_port:
+        metrics.serve(int(metrics_port))
+    metrics_file = args.metrics_file or metrics_cfg.get("prometheus_file")
+    if metrics_file and not os.path.isabs(metrics_file):
+        metrics_file = os.path.join(PROJECT_ROOT, metrics_file)
+    return metrics, metrics_file
+
+def count_arg(value: str) -> int:
+    # Exact: "1.5" or "1.2345k" are errors rather than silently rounded
+    count = parse_count(value, exact=True)
+    if count is None:
+        raise argparse.ArgumentTypeError(f"invalid count: {value!r} (e.g. 5000, 100k, 3.9M)")
+    return count
+
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+def parse_size(value: Any) -> int | None:
+    """
+    Byte size from an int or a string like "512MB", "1.5G" or "64k" (binary units).
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*", str(value).upper())
+    if match is None:
+        return None
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+def size_arg(value: str) -> int:
+    size = parse_size(value)
+    if size is None:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r} (e.g. 500000, 64MB, 1.5G)")
+    return size
+
+def filter_settings(args: argparse.Namespace, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The `filters` config section with any filter flags given on the command line applied.
+    """
+    filters_cfg = dict(config.get("filters", {}))
+    for option in (
+        "min_followers",
+        "max_followers",
+        "verified_only",
+        "signature_regex",
+        "nickname_regex",
+    ):
+        if getattr(args, option) is not None:
+            filters_cfg[option] = getattr(args, option)
+    if args.top is not None:
+        filters_cfg["top_k"] = args.top
+    return filters_cfg
+
+def create_user_filter(args: argparse.Namespace, config: Dict[str, Any]) -> UserFilter | None:
+    try:
+        user_filter = UserFilter.from_config(filter_settings(args, config))
+    except re.error as exc:
+        logging.getLogger("tiktok_scraper_main").error("Invalid filter pattern: %s", exc)
+        raise SystemExit(1)
+    except ValueError as exc:
+        logging.getLogger("tiktok_scraper_main").error("Invalid filter settings: %s", exc)
+        raise SystemExit(1)
+    if user_filter is not None:
+        logging.getLogger("tiktok_scraper_main").info(
+            "Keeping only users with %s", " and ".join(user_filter.conditions())
+        )
+    return user_filter
+
+def build_scraper_kwargs(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+    response_cache: ResponseCache | None,
+    metrics: ScrapeMetrics | None,
+    concurrency: int = 1,
+) -> Dict[str, Any]:
+    tiktok_cfg = config.get("tiktok", {})
+    scraper_cfg = config.get("scraper", {})
+    user_agent = tiktok_cfg.get(
+        "user_agent",
+        (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/125.0 Safari/537.36"
+        ),
+    )
+    return dict(
+        base_url=tiktok_cfg.get("base_url", "https://www.tiktok.com/api/search/user/full/"),
+        user_agent=user_agent,
+        timeout_seconds=tiktok_cfg.get("timeout", 10),
+        sleep_between_requests=scraper_cfg.get("sleep_between_requests", 1.0),
+        logger=logging.getLogger("tiktok_scraper"),
+        rate_limiter=AdaptiveRateLimiter.from_config(
+            scraper_cfg, logger=logging.getLogger("tiktok_rate_limiter")
+        ),
+        max_retries=scraper_cfg.get("retry", {}).get("max_retries", 3),
+        backoff_base=scraper_cfg.get("retry", {}).get("backoff_base", 1.0),
+        backoff_max=scraper_cfg.get("retry", {}).get("backoff_max", 30.0),
+        response_cache=response_cache,
+        offline=args.offline,
+        fast_decode=(
+            args.fast_decode
+            if args.fast_decode is not None
+            else scraper_cfg.get("fast_decode", False)
+        ),
+        extraction_plans=scraper_cfg.get("extraction_plans", True),
+        metrics=metrics,
+        egress_pool=EgressPool.from_config(
+            tiktok_cfg,
+            user_agent,
+            min_pool_size=concurrency,
+            logger=logging.getLogger("tiktok_egress"),
+            metrics=metrics,
+        ),
+        accept_encoding=tiktok_cfg.get("accept_encoding"),
+        keep_alive=tiktok_cfg.get("keep_alive", True),
+        pool_connections=tiktok_cfg.get("pool_connections", 10),
+        pool_maxsize=tiktok_cfg.get("pool_maxsize", 10),
+        pool_block=tiktok_cfg.get("pool_block", False),
+        user_filter=create_user_filter(args, config),
+        hedge_policy=HedgePolicy.from_config(
+            scraper_cfg, enabled=args.hedge, logger=logging.getLogger("tiktok_hedge")
+        ),
+        circuit_breaker=CircuitBreaker.from_config(
+            scraper_cfg,
+            enabled=args.circuit_breaker,
+            logger=logging.getLogger("tiktok_circuit"),
+            metrics=metrics,
+        ),
+    )
+
+def create_scraper(
+    scraper_kwargs: Dict[str, Any],
+    scraper_cfg: Dict[str, Any],
+    concurrency: int,
+    prefetch_depth: int = 0,
+) -> TikTokUserScraper:
+    if concurrency <= 1 and prefetch_depth <= 0:
+        return TikTokUserScraper(**scraper_kwargs)
+    # asyncio and the thread pool are only loaded for concurrent or prefetching runs
+    from extractors.async_scraper import AsyncTikTokUserScraper  # type: ignore
+
+    return AsyncTikTokUserScraper(
+        **scraper_kwargs,
+        max_concurrency=concurrency,
+        per_keyword_concurrency=scraper_cfg.get("per_keyword_concurrency", 1),
+        prefetch_depth=prefetch_depth,
+    )
+
+def create_yield_budget(args: argparse.Namespace, config: Dict[str, Any]) -> YieldBudget | None:
+    budget_cfg = config.get("budget", {})
+    try:
+        max_requests = (
+            args.request_budget
+            if args.request_budget is not None
+            else setting_count(budget_cfg.get("max_requests"), "budget.max_requests")
+        )
+    except ValueError as exc:
+        logging.getLogger("tiktok_scraper_main").error("Invalid budget settings: %s", exc)
+        raise SystemExit(1)
+    min_yield = args.min_yield if args.min_yield is not None else budget_cfg.get("min_yield", 0.0)
+    if not max_requests and not min_yield:
+        return None
+    return YieldBudget(
+        max_requests=max_requests,
+        min_yield=min_yield,
+        window=budget_cfg.get("window", 2),
+        report_keywords=budget_cfg.get("report_keywords", 1000),
+        logger=logging.getLogger("tiktok_budget"),
+    )
+
+def chain_stop_checks(
+    *checks: Callable[[str], Any] | None,
+) -> Callable[[str], Any] | None:
+    """
+    One `stop_early` hook asking each check in turn; the first verdict wins.
+    """
+    active = [check for check in checks if check is not None]
+    if len(active) <= 1:
+        return active[0] if active else None
+
+    def stop_early(keyword: str) -> Any:
+        for check in active:
+            verdict = check(keyword)
+            if verdict:
+                return verdict
+        return None
+
+    return stop_early
+
+def create_dedup(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+    mode: str | None = None,
+) -> DedupIndex | None:
+    dedup_cfg = config.get("dedup", {})
+    dedup_mode = mode or (args.dedup if args.dedup is not None else dedup_cfg.get("mode", "off"))
+    if dedup_mode == "off":
+        return None
+    return DedupIndex(
+        mode=dedup_mode,
+        expected_items=dedup_cfg.get("expected_items", 1_000_000),
+        false_positive_rate=dedup_cfg.get("false_positive_rate", 0.001),
+        logger=logging.getLogger("tiktok_dedup"),
+    )
+
+def create_exporter(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+    metrics: ScrapeMetrics | None = None,
+) -> DatasetExporter:
+    """
+    DatasetExporter with the output compression and sharding from the CLI or config.
+    """
+    output_cfg = config.get("output", {})
+    compression = args.compress if args.compress is not None else output_cfg.get("compression")
+    shard_bytes = (
+        args.shard_size
+        if args.shard_size is not None
+        else parse_size(output_cfg.get("shard_max_bytes"))
+    )
+    try:
+        shard_records = (
+            args.shard_records
+            if args.shard_records is not None
+            else setting_count(output_cfg.get("shard_max_records"), "output.shard_max_records")
+        )
+        return DatasetExporter(
+            logger=logging.getLogger("dataset_exporter"),
+            metrics=metrics,
+            sqlite_path=resolve_sqlite_path(config),
+            compression=None if compression in (None, "none") else compression,
+            shard_max_records=shard_records or None,
+            shard_max_bytes=shard_bytes or None,
+        )
+    except ValueError as exc:
+        logging.getLogger("tiktok_scraper_main").error("Invalid output settings: %s", exc)
+        raise SystemExit(1)
+
+def create_top_k(args: argparse.Namespace, config: Dict[str, Any]) -> TopKSelector | None:
+    top_k = filter_settings(args, config).get("top_k")
+    if not top_k:
+        return None
+    return TopKSelector(int(top_k), logger=logging.getLogger("tiktok_top_k"))
+
+def open_snapshot(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+    logger: logging.Logger,
+) -> UserSnapshot | None:
+    incremental_cfg = config.get("incremental", {})
+    if args.incremental is None and not incremental_cfg.get("enabled", False):
+        return None
+    snapshot_path = args.incremental or incremental_cfg.get(
+        "snapshot_path", "data/snapshot/users.sqlite3"
+    )
+    if not os.path.isabs(snapshot_path):
+        snapshot_path = os.path.join(PROJECT_ROOT, snapshot_path)
+    snapshot = UserSnapshot(
+        snapshot_path,
+        stop_after_unchanged_pages=incremental_cfg.get("stop_after_unchanged_pages", 2),
+        logger=logging.getLogger("tiktok_snapshot"),
+    )
+    logger.info("Incremental run %d against snapshot %s", snapshot.run, snapshot_path)
+    return snapshot
+
+def create_avatar_downloader(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+    user_agent: str,
+    metrics: ScrapeMetrics | None,
+    logger: logging.Logger,
+) -> AvatarDownloader | None:
+    avatars_cfg = config.get("avatars", {})
+    if args.avatars is None and not avatars_cfg.get("enabled", False):
+        return None
+    directory = args.avatars or avatars_cfg.get("directory", "data/avatars")
+    if not os.path.isabs(directory):
+        directory = os.path.join(PROJECT_ROOT, directory)
+    logger.info("Downloading avatars to %s", directory)
+    return AvatarDownloader.from_config(
+        avatars_cfg,
+        directory,
+        user_agent,
+        logger=logging.getLogger("tiktok_avatars"),
+        metrics=metrics,
+    )
+
+def write_keyword_merges(
+    dedup: DedupIndex,
+    output_dir: str,
+    base_filename: str,
+    logger: logging.Logger,
+) -> None:
+    # Streamed records carry no search_keywords; this sidecar holds every merged list
+    if not dedup.merged_count:
+        return
+    merges_path = os.path.join(output_dir, base_filename + ".search_keywords.jsonl")
+    merged = dedup.write_keyword_merges(merges_path)
+    logger.info("Wrote merged search_keywords for %d users to %s", merged, merges_path)
+
+def write_metrics_report(
+    metrics: ScrapeMetrics,
+    prometheus_file: str | None,
+    summary_path: str | None,
+    logger: logging.Logger,
+) -> None:
+    metrics.log_summary()
+    if prometheus_file:
+        metrics.write_prometheus(prometheus_file)
+    if summary_path:
+        metrics.write_summary(summary_path)
+        logger.info("Wrote metrics summary to %s", summary_path)
+    metrics.close()
+
+def open_keyword_queue(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+) -> Tuple[KeywordQueue, str]:
+    """
+    Open the distributed keyword queue and return it with its shard directory.
+    """
+    dist_cfg = config.get("distributed", {})
+    queue_path = args.queue or dist_cfg.get("queue_path", "data/queue/keywords.sqlite3")
+    if not os.path.isabs(queue_path):
+        queue_path = os.path.join(PROJECT_ROOT, queue_path)
+    queue = KeywordQueue(
+        queue_path,
+        lease_seconds=dist_cfg.get("lease_seconds", 300),
+        max_attempts=dist_cfg.get("max_attempts", 3),
+        logger=logging.getLogger("tiktok_queue"),
+    )
+    shard_dir = queue.get_meta().get("shard_dir") or dist_cfg.get("shard_dir")
+    if not shard_dir:
+        shard_dir = os.path.splitext(queue_path)[0] + "_shards"
+    elif not os.path.isabs(shard_dir):
+        shard_dir = os.path.join(PROJECT_ROOT, shard_dir)
+    return queue, shard_dir
+
+def worker_command(args: argparse.Namespace, queue_path: str, worker_id: str) -> List[str]:
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--config",
+        os.path.abspath(args.config),
+        "--queue",
+        queue_path,
+        "--role",
+        "worker",
+        "--worker-id",
+        worker_id,
+    ]
+    if args.cache is not None:
+        command += ["--cache", args.cache]
+    if args.offline:
+        command.append("--offline")
+    if args.fast_decode:
+        command.append("--fast-decode")
+    if args.hedge:
+        command.append("--hedge")
+    if args.circuit_breaker:
+        command.append("--circuit-breaker")
+    if args.no_metrics:
+        command.append("--no-metrics")
+    for option in ("min_followers", "max_followers", "signature_regex", "nickname_regex"):
+        if getattr(args, option) is not None:
+            command += ["--" + option.replace("_", "-"), str(getattr(args, option))]
+    if args.verified_only:
+        command.append("--verified-only")
+    return command
+
+def run_coordinator(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+    keywords: Iterable[KeywordSpec],
+    max_items: int,
+    output_format: str,
+    output_dir: str,
+    logger: logging.Logger,
+) -> None:
+    """
+    Queue `keywords`, start local workers, wait for the queue to drain and merge.
+
+    Keywords are streamed into the queue, keeping their own `max_items`
+    and priority. Per-keyword output formats are not supported: workers
+    all write shards that are merged into one output.
+
+    Running the coordinator again on the same queue only adds new keywords
+    and keeps the original output name, so an interrupted run picks up
+    where it stopped. With `--workers 0` it only waits for external workers.
+    """
+    dist_cfg = config.get("distributed", {})
+    queue, shard_dir = open_keyword_queue(args, config)
+    meta = queue.get_meta()
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    queue.set_meta(
+        {
+            "shard_dir": shard_dir,
+            "output_format": output_format,
+            "output_dir": output_dir,
+            "base_filename": meta.get("base_filename", f"tiktok_users_{timestamp}"),
+        }
+    )
+    overridden = 0
+
+    def queued_keywords() -> Iterator[KeywordSpec]:
+        nonlocal overridden
+        for spec in keywords:
+            if spec.output_format is not None:
+                overridden += 1
+            yield spec
+
+    added, seen = queue.enqueue(queued_keywords(), max_items)
+    logger.info(
+        "Queued %d new keywords in %s (%d already queued)",
+        added,
+        queue.path,
+        seen - added,
+    )
+    if overridden:
+        logger.warning(
+            "Ignoring per-keyword output formats of %d keywords with --queue; "
+            "everything is merged into one %s output",
+            overridden,
+            output_format,
+        )
+
+    worker_count = args.workers if args.workers is not None else dist_cfg.get("workers", 4)
+    host = socket.gethostname()
+    workers = [
+        subprocess.Popen(worker_command(args, queue.path, f"{host}-{os.getpid()}-w{index}"))
+        for index in range(worker_count)
+    ]
+    logger.info("Started %d local workers", len(workers))
+    try:
+        counts = wait_for_queue(
+            queue,
+            workers,
+            poll_interval=dist_cfg.get("poll_interval", 2.0),
+            logger=logger,
+        )
+    finally:
+        for process in workers:
+            process.wait()
+
+    for entry in queue.failed_keywords():
+        logger.error(
+            "Keyword '%s' failed after %d attempts: %s",
+            entry["keyword"],
+            entry["attempts"],
+            entry["error"],
+        )
+    if counts["pending"] or counts["leased"]:
+        logger.error("Queue not drained; merging the %d finished keywords only", counts["done"])
+    merge_queue(args, config, queue, shard_dir, logger)
+
+def merge_queue(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+    queue: KeywordQueue,
+    shard_dir: str,
+    logger: logging.Logger,
+) -> None:
+    meta = queue.get_meta()
+    output_format = args.output_format or meta.get("output_format", "json")
+    output_dir = resolve_output_directory(args.output_dir or meta.get("output_dir"), config)
+    base_filename = meta.get("base_filename") or "tiktok_users_merged"
+    dedup = create_dedup(args, config)
+    exporter = create_exporter(args, config)
+
+    try:
+        output_path, total = merge_shards(
+            queue,
+            shard_dir,
+            exporter,
+            output_format,
+            output_dir,
+            base_filename,
+            dedup=dedup,
+            logger=logger,
+        )
+    except Exception as exc:
+        logger.exception("Failed to merge shards: %s", exc)
+        raise SystemExit(1)
+    finally:
+        queue.close()
+
+    if dedup is not None:
+        dedup.log_summary()
+        write_keyword_merges(dedup, output_dir, base_filename, logger)
+    if output_path is None:
+        logger.warning("No users were collected for any keyword. Nothing to export.")
+        raise SystemExit(0)
+
+    logger.info("Merged %d records. File saved to: %s", total, output_path)
+    print(output_path)
+
+def run_queue_role(
+    args: argparse.Namespace,
+    config: Dict[str, Any],
+    logger: logging.Logger,
+) -> None:
+    """
+    Run a `--role worker` or `--role merge` process against the shared queue.
+    """
+    queue, shard_dir = open_keyword_queue(args, config)
+    if args.role == "merge":
+        merge_queue(args, config, queue, shard_dir, logger)
+        return
+
+    worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    response_cache = open_response_cache(args, config, logger)
+    # Local workers share one config, so only an explicit --metrics-port is served
+    metrics, metrics_file = create_metrics(args, config, use_config_port=False)
+    scraper = TikTokUserScraper(**build_scraper_kwargs(args, config, response_cache, metrics))
+    try:
+        run_worker(
+            queue,
+            scraper,
+            shard_dir,
+            worker_id,
+            poll_interval=config.get("distributed", {}).get("poll_interval", 2.0),
+            logger=logging.getLogger("tiktok_worker"),
+        )
+    finally:
+        queue.close()
+        if response_cache is not None:
+            response_cache.close()
+    if scraper.egress_pool is not None:
+        scraper.egress_pool.log_stats()
+    if metrics is not None:
+        summary_path = os.path.join(shard_dir, f"{worker_id}.metrics.json")
+        write_metrics_report(metrics, metrics_file, summary_path, logger)
+
+def iter_search_pages(
+    scraper: TikTokUserScraper,
+    keywords: Iterable[KeywordEntry],
+    max_items: int,
+    logger: logging.Logger,
+    start_state: Dict[str, Tuple[int, int]] | None = None,
+) -> Iterator[SearchPage]:
+    """
+    Yield result pages for every keyword, concurrently if the scraper supports it.
+
+    `keywords` is consumed lazily; an entry may pair a keyword with its own
+    max_items. Errors for one keyword are logged and end that keyword with
+    an empty page. `start_state` maps keywords to the (cursor, collected)
+    pair to resume from.
+    """
+    start_state = start_state or {}
+    iter_many = getattr(scraper, "iter_many", None)
+    if iter_many is not None:
+        yield from iter_many(keywords, max_items=max_items, start_state=start_state)
+        return
+
+    for entry in keywords:
+        keyword_str, keyword_max_items = keyword_limit(entry, max_items)
+        logger.info(
+            "Searching users for keyword='%s' with max_items=%s", keyword_str, keyword_max_items
+        )
+        start_cursor, collected = start_state.get(keyword_str, (0, 0))
+        try:
+            for page in scraper.iter_user_pages(
+                keyword_str,
+                max_items=keyword_max_items,
+                start_cursor=start_cursor,
+                start_collected=collected,
+            ):
+                collected = page.collected
+                yield page
+        except Exception as exc:
+            logger.exception("Unexpected error while scraping keyword '%s': %s", keyword_str, exc)
+            yield SearchPage(keyword_str, [], None, None, collected, "error", 0)
+
+def print_rows(rows: List[Dict[str, Any]], columns: Iterable[str], as_json: bool) -> None:
+    if as_json:
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        return
+    columns = list(columns)
+    cells = [
+        ["" if row.get(column) is None else str(row[column]) for column in columns] for row in rows
+    ]
+    widths = [
+        max([len(column)] + [len(line[index]) for line in cells])
+        for index, column in enumerate(columns)
+    ]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)).rstrip())
+    for line in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip())
+
+def run_query(args: argparse.Namespace, config: Dict[str, Any], logger: logging.Logger) -> None:
+    """
+    Answer a `query` subcommand from the SQLite user store.
+    """
+    db_path = args.db or resolve_sqlite_path(config)
+    if not db_path:
+        db_path = os.path.join(
+            resolve_output_directory(args.output_dir, config), DatasetExporter.SQLITE_FILENAME
+        )
+    if not os.path.exists(db_path):
+        logger.error("No user store at %s; scrape with --output-format sqlite first.", db_path)
+        raise SystemExit(1)
+
+    store = UserStore(db_path, logger=logging.getLogger("tiktok_user_store"))
+    try:
+        if args.query == "top":
+            rows = store.top_by_followers(args.keyword, limit=args.limit)
+            columns: Iterable[str] = QUERY_COLUMNS
+        elif args.query == "verified":
+            rows = store.verified_users(args.keyword, limit=args.limit)
+            columns = QUERY_COLUMNS
+        elif args.query == "user":
+            rows = store.find_user(args.handle)
+            columns = QUERY_COLUMNS + ("keywords", "first_seen_at")
+        else:
+            rows = store.keyword_counts()
+            columns = ("keyword", "users", "last_seen_at")
+    finally:
+        store.close()
+
+    if not rows:
+        logger.info("No matching users in %s", db_path)
+        return
+    print_rows(rows, columns, args.json)
+
+def run_serve(args: argparse.Namespace, config: Dict[str, Any], logger: logging.Logger) -> None:
+    """
+    Run the `serve` daemon: one warm scraper shared by jobs submitted over HTTP.
+
+    The session, connection pools, rate limiter, egress pool, response
+    cache and metrics are created once and shared by every job, so a job
+    costs no start-up and all jobs draw on one request budget. Each job
+    gets its own filter, dedup index, top-K selection and output file.
+    Checkpointing, incremental snapshots and avatars stay CLI-only.
+    """
+    serve_cfg = config.get("serve", {})
+    scraper_cfg = config.get("scraper", {})
+    concurrency = (
+        args.concurrency if args.concurrency is not None else scraper_cfg.get("concurrency", 1)
+    )
+    response_cache = open_response_cache(args, config, logger)
+    metrics, metrics_file = create_metrics(args, config)
+    scraper = create_scraper(
+        build_scraper_kwargs(args, config, response_cache, metrics, concurrency),
+        scraper_cfg,
+        concurrency,
+        args.prefetch if args.prefetch is not None else scraper_cfg.get("prefetch_depth", 0),
+    )
+    base_filters = filter_settings(args, config)
+    default_max_items = scraper_cfg.get("max_items", 50)
+    default_format = config.get("output", {}).get("format", "json")
+
+    def validate_job(spec: Dict[str, Any]) -> Dict[str, Any]:
+        entries = spec.get("keywords")
+        if not isinstance(entries, list):
+            raise ValueError("'keywords' must be a non-empty array")
+        keywords: List[KeywordSpec] = []
+        for index, entry in enumerate(entries):
+            if isinstance(entry, str) and not entry.strip():
+                continue
+            try:
+                keywords.append(parse_keyword_entry(entry, DatasetExporter.EXTENSIONS))
+            except ValueError as exc:
+                raise ValueError(f"keywords[{index}]: {exc}") from exc
+        if not keywords:
+            raise ValueError("'keywords' must be a non-empty array")
+        # Highest priority first; sorted() is stable, so ties keep their order
+        keywords.sort(key=lambda keyword: -keyword.priority)
+        max_items = spec.get("maxItems", default_max_items)
+        if not isinstance(max_items, int) or isinstance(max_items, bool) or max_items < 1:
+            raise ValueError("'maxItems' must be a positive integer")
+        output_format = str(spec.get("outputFormat") or default_format).lower()
+        if output_format not in DatasetExporter.EXTENSIONS:
+            raise ValueError(f"unsupported 'outputFormat': {output_format}")
+        dedup_mode = spec.get("dedup")
+        if dedup_mode not in (None, "off", "exact", "bloom"):
+            raise ValueError("'dedup' must be one of off, exact, bloom")
+        filters = spec.get("filters") or {}
+        if not isinstance(filters, dict):
+            raise ValueError("'filters' must be an object")
+        filters = {**base_filters, **filters}
+        try:
+            UserFilter.from_config(filters)
+        except re.error as exc:
+            raise ValueError(f"invalid filter pattern: {exc}") from exc
+        top = spec.get("top", filters.get("top_k"))
+        if top is not None and (not isinstance(top, int) or isinstance(top, bool) or top < 0):
+            raise ValueError("'top' must be a non-negative integer")
+        return {
+            "keywords": keywords,
+            "maxItems": max_items,
+            "outputFormat": output_format,
+            "outputDir": resolve_output_directory(spec.get("outputDir"), config),
+            "dedup": dedup_mode,
+            "filters": filters,
+            "top": top or None,
+            "streamRecords": bool(spec.get("streamRecords", False)),
+        }
+
+    def run_job(job: Job) -> Dict[str, Any]:
+        spec = job.spec
+        job_logger = logging.getLogger(f"tiktok_job.{job.id}")
+        job_scraper = scraper.derive(user_filter=UserFilter.from_config(spec["filters"]))
+        dedup = create_dedup(args, config, mode=spec["dedup"])
+        top_k = (
+            TopKSelector(spec["top"], logger=job_logger) if spec["top"] is not None else None
+        )
+        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        base_filename = f"tiktok_users_{timestamp}_{job.id}"
+        page_exporter = PageExporter(
+            create_exporter(args, config, metrics),
+            spec["outputFormat"],
+            spec["outputDir"],
+            base_filename,
+            dedup=dedup,
+            top_k=top_k,
+            logger=job_logger,
+        )
+        keyword_formats = {
+            keyword.keyword: keyword.output_format
+            for keyword in spec["keywords"]
+            if keyword.output_format is not None
+        }
+        job.progress.update(keywords_done=0, records=0)
+        try:
+            pages = iter_search_pages(
+                job_scraper,
+                [(keyword.keyword, keyword.max_items) for keyword in spec["keywords"]],
+                spec["maxItems"],
+                job_logger,
+            )
+            for page in pages:
+                written = page_exporter.write_page(page, keyword_formats.get(page.keyword))
+                event: Dict[str, Any] = {
+                    "event": "page",
+                    "keyword": page.keyword,
+                    "records": len(written),
+                    "collected": page.collected,
+                }
+                if page.next_cursor is None:
+                    job.progress["keywords_done"] += 1
+                    event["stop_reason"] = page.stop_reason
+                job.progress["records"] = page_exporter.total
+                if spec["streamRecords"] and written:
+                    event["users"] = [as_plain_dict(user) for user in written]
+                job.emit(event)
+            final = page_exporter.finish()
+            job.progress["records"] = page_exporter.total
+            if spec["streamRecords"] and final:
+                job.emit({"event": "records", "users": [as_plain_dict(user) for user in final]})
+        finally:
+            page_exporter.close()
+        if dedup is not None and not page_exporter.to_store and top_k is None:
+            write_keyword_merges(dedup, spec["outputDir"], base_filename, job_logger)
+        return {
+            "output_path": page_exporter.output_path,
+            "output_paths": page_exporter.output_paths,
+            "records": page_exporter.total,
+        }
+
+    server = JobServer(
+        run_job,
+        validate_job,
+        max_concurrent_jobs=(
+            args.max_jobs if args.max_jobs is not None else serve_cfg.get("max_concurrent_jobs", 4)
+        ),
+        keep_finished_jobs=serve_cfg.get("keep_finished_jobs", 100),
+        metrics=metrics,
+        logger=logging.getLogger("tiktok_serve"),
+    )
+    socket_path = args.socket or serve_cfg.get("socket")
+    if socket_path and not os.path.isabs(socket_path):
+        socket_path = os.path.join(PROJECT_ROOT, socket_path)
+    address = server.listen(
+        host=args.host or serve_cfg.get("host", "127.0.0.1"),
+        port=args.port if args.port is not None else serve_cfg.get("port", 8765),
+        socket_path=socket_path,
+    )
+    logger.info("Serving jobs on %s (%d at a time)", address, server.max_concurrent_jobs)
+    print(address, flush=True)
+
+    # SIGTERM stops the daemon the same way Ctrl-C does
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down; cancelling unfinished jobs")
+    finally:
+        server.shutdown()
+        if response_cache is not None:
+            response_cache.log_stats()
+            response_cache.close()
+        if scraper.egress_pool is not None:
+            scraper.egress_pool.log_stats()
+        if metrics is not None:
+            write_metrics_report(metrics, metrics_file, None, logger)
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="TikTok Users Scraper")
     parser.add_argument(
         "--input",
-        default=os.path.join(PROJECT_ROOT, "data", "input.sample.json"),
-        help="Path to input JSON file containing keywords and limits.",
+        default=None,
+        help="Path to the keyword input: a JSON file with keywords and limits, a JSON Lines "
+        "or CSV keyword list, or '-' for stdin.",
+    )
+    parser.add_argument(
+        "--input-format",
+        choices=INPUT_FORMATS,
+        default=None,
+        help="Format of --input (default: from the file extension; JSON Lines for stdin).",
     )
     parser.add_argument(
         "--config",
@@ -62,15 +947,280 @@ def main() -> None:
     parser.add_argument(
         "--output-format",
         default=None,
-        choices=["json", "csv", "xlsx", "html", "xml"],
+        choices=["json", "jsonl", "csv", "xlsx", "html", "xml", "parquet", "feather", "sqlite"],
         help="Output format (overrides input and config).",
     )
+    parser.add_argument(
+        "--compress",
+        choices=["gzip", "zstd", "none"],
+        default=None,
+        help="Compress text outputs (json, jsonl, csv, xml, html) while streaming "
+        "(overrides config; zstd needs the zstandard package before Python 3.14).",
+    )
+    parser.add_argument(
+        "--shard-records",
+        type=count_arg,
+        default=None,
+        metavar="N",
+        help="Roll the output over into numbered shards of N records, listed in a "
+        "<name>.manifest.json (overrides config).",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=size_arg,
+        default=None,
+        metavar="SIZE",
+        help="Roll the output over into a new shard once one reaches SIZE on disk, "
+        "e.g. 256MB (overrides config).",
+    )
     parser.add_argument(
         "--max-items",
         type=int,
         default=None,
         help="Maximum number of users to fetch per keyword (overrides input and config).",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Number of keywords to paginate concurrently (overrides config; 1 = sequential).",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Speculatively fetch up to N pages ahead within each keyword (overrides config; "
+        "0 = off).",
+    )
+    parser.add_argument(
+        "--dedup",
+        default=None,
+        choices=["off", "exact", "bloom"],
+        help="Cross-keyword deduplication mode (overrides config).",
+    )
+    parser.add_argument(
+        "--request-budget",
+        type=count_arg,
+        default=None,
+        metavar="N",
+        help="Spend at most N page requests on the run, favouring keywords that still find "
+        "new users, e.g. 20k (overrides config).",
+    )
+    parser.add_argument(
+        "--min-yield",
+        type=float,
+        default=None,
+        metavar="USERS",
+        help="Stop a keyword once its recent pages average fewer than USERS new unique users "
+        "per request (overrides config).",
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="Cache search pages on disk (optionally at PATH; default from config).",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Replay cached search pages only, without any network access (implies --cache).",
+    )
+    parser.add_argument(
+        "--fast-decode",
+        action="store_true",
+        default=None,
+        help="Decode responses with the typed msgspec fast path (overrides config).",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        default=None,
+        help="Send a duplicate of search requests slower than the recent p95 (overrides config).",
+    )
+    parser.add_argument(
+        "--circuit-breaker",
+        action="store_true",
+        default=None,
+        help="Fail search requests fast while the endpoint is mostly erroring (overrides config).",
+    )
+    parser.add_argument(
+        "--no-metrics",
+        action="store_true",
+        help="Disable instrumentation entirely (overrides config).",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        metavar="PORT",
+        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics (overrides config).",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        metavar="PATH",
+        help="Write Prometheus metrics to PATH, e.g. for a textfile collector (overrides config).",
+    )
+    parser.add_argument(
+        "--incremental",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="Export only new or changed users, compared against the snapshot at PATH "
+        "(default from config).",
+    )
+    parser.add_argument(
+        "--avatars",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="DIR",
+        help="Download avatars into the content-addressed store at DIR and record each "
+        "user's avatar_local_path (default from config).",
+    )
+    parser.add_argument(
+        "--min-followers",
+        type=count_arg,
+        default=None,
+        metavar="N",
+        help="Keep only users with at least N followers, e.g. 100k (overrides config).",
+    )
+    parser.add_argument(
+        "--max-followers",
+        type=count_arg,
+        default=None,
+        metavar="N",
+        help="Keep only users with at most N followers (overrides config).",
+    )
+    parser.add_argument(
+        "--verified-only",
+        action="store_true",
+        default=None,
+        help="Keep only verified users (overrides config).",
+    )
+    parser.add_argument(
+        "--signature-regex",
+        default=None,
+        metavar="REGEX",
+        help="Keep only users whose bio matches REGEX, case-insensitively (overrides config).",
+    )
+    parser.add_argument(
+        "--nickname-regex",
+        default=None,
+        metavar="REGEX",
+        help="Keep only users whose nickname matches REGEX, case-insensitively "
+        "(overrides config).",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=None,
+        metavar="K",
+        help="Export only the K most followed matching users across all keywords, most "
+        "followed first (overrides config).",
+    )
+    parser.add_argument(
+        "--queue",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="Distributed mode: use the shared keyword queue at PATH (default from config).",
+    )
+    parser.add_argument(
+        "--role",
+        default="coordinator",
+        choices=["coordinator", "worker", "merge"],
+        help="With --queue: queue keywords and merge (coordinator), process keywords "
+        "(worker) or only merge finished shards (merge).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Local worker processes the coordinator starts (overrides config; 0 = none).",
+    )
+    parser.add_argument(
+        "--worker-id",
+        default=None,
+        help="Worker name recorded in leases and shard names (default: host-pid).",
+    )
+    parser.add_argument(
+        "--resume",
+        default=None,
+        metavar="RUN_ID",
+        help="Resume an interrupted run: skip finished keywords and append to its output.",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", metavar="{query,serve}")
+    query_parser = subparsers.add_parser(
+        "query",
+        help="Look up users in the SQLite store written by --output-format sqlite.",
+    )
+    query_parser.add_argument(
+        "--db",
+        default=None,
+        metavar="PATH",
+        help="User store to query (default: output.sqlite_path, or tiktok_users.sqlite3 "
+        "in the output directory).",
+    )
+    query_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print one JSON object per row instead of a table.",
+    )
+    queries = query_parser.add_subparsers(dest="query", required=True)
+    top_parser = queries.add_parser("top", help="Users with the most followers.")
+    verified_parser = queries.add_parser("verified", help="Verified users, most followed first.")
+    for query_subparser, default_limit in ((top_parser, 10), (verified_parser, -1)):
+        query_subparser.add_argument(
+            "--keyword",
+            default=None,
+            help="Only users found under this keyword.",
+        )
+        query_subparser.add_argument(
+            "-n",
+            "--limit",
+            type=int,
+            default=default_limit,
+            help=f"Number of users to show (default: {default_limit}; -1 = all).",
+        )
+    user_parser = queries.add_parser("user", help="Look up one user by handle, uid or sec_uid.")
+    user_parser.add_argument("handle")
+    queries.add_parser("keywords", help="Keywords with their number of users.")
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Run as a daemon that accepts scrape jobs over a local HTTP API.",
+    )
+    serve_parser.add_argument(
+        "--host",
+        default=None,
+        help="Address to listen on (default from config: 127.0.0.1).",
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="TCP port to listen on (default from config: 8765; 0 = any free port).",
+    )
+    serve_parser.add_argument(
+        "--socket",
+        default=None,
+        metavar="PATH",
+        help="Listen on a Unix socket at PATH instead of TCP (overrides config).",
+    )
+    serve_parser.add_argument(
+        "--max-jobs",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Jobs to run at the same time; more are queued (overrides config).",
+    )
 
     args = parser.parse_args()
 
@@ -80,106 +1230,355 @@ def main() -> None:
     setup_logging(log_level)
     logger = logging.getLogger("tiktok_scraper_main")
 
+    if args.command == "query":
+        run_query(args, config, logger)
+        return
+    if args.command == "serve":
+        run_serve(args, config, logger)
+        return
+
     logger.info("Starting TikTok Users Scraper")
 
-    # Load input keywords and options
-    try:
-        input_payload = load_json_file(args.input)
-    except Exception as exc:
-        logger.error("Failed to load input file %s: %s", args.input, exc)
+    if args.queue is not None and args.role != "coordinator":
+        run_queue_role(args, config, logger)
+        return
+    if args.queue is not None and args.resume:
+        logger.error("--resume is not supported with --queue; rerun the coordinator instead.")
+        raise SystemExit(1)
+    if args.queue is not None and args.incremental is not None:
+        logger.error("--incremental is not supported with --queue.")
+        raise SystemExit(1)
+    if args.queue is not None and args.avatars is not None:
+        logger.error("--avatars is not supported with --queue.")
+        raise SystemExit(1)
+    top_k = create_top_k(args, config)
+    if top_k is not None and (args.queue is not None or args.resume):
+        logger.error("Top-K selection is not supported with --queue or --resume.")
         raise SystemExit(1)
 
-    keywords = input_payload.get("keywords") or []
-    if not isinstance(keywords, list) or not keywords:
-        logger.error("Input file must contain a non-empty 'keywords' array.")
+    checkpoint_cfg = config.get("checkpoint", {})
+    runs_dir = checkpoint_cfg.get("directory", os.path.join("data", "runs"))
+    if not os.path.isabs(runs_dir):
+        runs_dir = os.path.join(PROJECT_ROOT, runs_dir)
+
+    journal: CheckpointJournal | None = None
+    resume_meta: Dict[str, Any] = {}
+    if args.resume:
+        journal = CheckpointJournal(
+            runs_dir,
+            args.resume,
+            fsync_interval=checkpoint_cfg.get("fsync_interval", 1.0),
+            logger=logging.getLogger("tiktok_checkpoint"),
+        )
+        if not journal.exists():
+            logger.error("No checkpoint found for run '%s' in %s", args.resume, runs_dir)
+            raise SystemExit(1)
+        resume_meta = journal.load()
+        logger.info(
+            "Resuming run '%s': %d keywords finished, %d records already exported",
+            args.resume,
+            journal.keywords_done,
+            sum(records for _, records in journal.outputs.values()),
+        )
+
+    # Keywords are read lazily, so JSON Lines, CSV and stdin inputs can be any size
+    input_path = args.input or resume_meta.get("input") or DEFAULT_INPUT_PATH
+    input_format = (
+        args.input_format
+        or resume_meta.get("input_format")
+        or config.get("input", {}).get("format")
+    )
+    input_options: Dict[str, Any] = {}
+    try:
+        keyword_input = KeywordInput(
+            input_path,
+            input_format,
+            output_formats=DatasetExporter.EXTENSIONS,
+            logger=logging.getLogger("tiktok_input"),
+        )
+        if not keyword_input.is_stdin and not os.path.exists(input_path):
+            raise FileNotFoundError(f"Input file not found at: {input_path}")
+        # A resumed run takes its options from the checkpoint and may not need the input at all
+        if not resume_meta:
+            input_options = keyword_input.options()
+    except (OSError, ValueError) as exc:
+        logger.error("Failed to load input file %s: %s", input_path, exc)
         raise SystemExit(1)
 
     # Resolve limits and formats with priority: CLI > input > config
     max_items = (
         args.max_items
         if args.max_items is not None
-        else input_payload.get("maxItems")
-        if input_payload.get("maxItems") is not None
+        else input_options.get("maxItems")
+        if input_options.get("maxItems") is not None
         else config.get("scraper", {}).get("max_items", 50)
     )
 
     output_format = (
         args.output_format
         if args.output_format is not None
-        else input_payload.get("outputFormat")
-        if input_payload.get("outputFormat") is not None
+        else input_options.get("outputFormat")
+        if input_options.get("outputFormat") is not None
         else config.get("output", {}).get("format", "json")
     )
 
     output_dir = resolve_output_directory(args.output_dir, config)
 
+    # A resumed run must keep writing to the same file with the same limits
+    if resume_meta:
+        max_items = resume_meta["max_items"]
+        output_format = resume_meta["output_format"]
+        output_dir = resume_meta["output_dir"]
+
     logger.info(
-        "Resolved configuration - keywords=%s, max_items=%s, output_format=%s, output_dir=%s",
-        keywords,
+        "Resolved configuration - input=%s (%s), max_items=%s, output_format=%s, output_dir=%s",
+        input_path,
+        keyword_input.input_format,
         max_items,
         output_format,
         output_dir,
     )
 
-    # Instantiate scraper
-    tiktok_cfg = config.get("tiktok", {})
-    scraper = TikTokUserScraper(
-        base_url=tiktok_cfg.get("base_url", "https://www.tiktok.com/api/search/user/full/"),
-        user_agent=tiktok_cfg.get(
-            "user_agent",
-            (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/125.0 Safari/537.36"
-            ),
-        ),
-        timeout_seconds=tiktok_cfg.get("timeout", 10),
-        sleep_between_requests=config.get("scraper", {}).get("sleep_between_requests", 1.0),
-        logger=logging.getLogger("tiktok_scraper"),
+    scraper_cfg = config.get("scraper", {})
+    concurrency = (
+        args.concurrency
+        if args.concurrency is not None
+        else scraper_cfg.get("concurrency", 1)
     )
 
-    all_users: List[Dict[str, Any]] = []
+    if args.queue is not None:
+        try:
+            run_coordinator(
+                args, config, keyword_input, max_items, output_format, output_dir, logger
+            )
+        except (OSError, ValueError) as exc:
+            logger.error("Failed to read input file %s: %s", input_path, exc)
+            raise SystemExit(1)
+        return
+
+    response_cache = open_response_cache(args, config, logger)
+    metrics, metrics_file = create_metrics(args, config)
+    scraper_kwargs = build_scraper_kwargs(args, config, response_cache, metrics, concurrency)
+
+    snapshot = open_snapshot(args, config, logger)
+    if snapshot is not None and args.resume:
+        # The snapshot only commits once the export finishes, so the pages a
+        # resumed run skips would never reach it.
+        logger.error("Incremental mode is not supported with --resume.")
+        snapshot.close()
+        raise SystemExit(1)
+    if snapshot is not None and top_k is not None:
+        logger.error("Top-K selection is not supported with --incremental.")
+        snapshot.close()
+        raise SystemExit(1)
+    emit_not_seen = config.get("incremental", {}).get("emit_not_seen", True)
+    budget = create_yield_budget(args, config)
+    scraper_kwargs["stop_early"] = chain_stop_checks(
+        snapshot.should_stop if snapshot is not None else None,
+        budget.should_stop if budget is not None else None,
+    )
+
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    run_id = f"{timestamp}_{uuid.uuid4().hex[:6]}"
+
+    # The keyword list is spooled into the run directory and scheduled by priority from there
+    spool_dir = os.path.join(runs_dir, args.resume or run_id)
+    schedule = KeywordSchedule(
+        os.path.join(spool_dir, "keywords.sqlite3"), logger=logging.getLogger("tiktok_schedule")
+    )
 
-    for keyword in keywords:
-        keyword_str = str(keyword).strip()
-        if not keyword_str:
-            logger.warning("Skipping empty keyword entry in input.")
-            continue
+    def discard_spool(keep_for_resume: bool) -> None:
+        schedule.close()
+        if not keep_for_resume:
+            shutil.rmtree(spool_dir, ignore_errors=True)
 
-        logger.info("Searching users for keyword='%s' with max_items=%s", keyword_str, max_items)
+    if not schedule.complete:
+        if resume_meta and keyword_input.is_stdin:
+            logger.error(
+                "Run '%s' read its keywords from stdin, which cannot be read again.", args.resume
+            )
+            discard_spool(keep_for_resume=journal is not None)
+            raise SystemExit(1)
         try:
-            users = scraper.search_users(keyword_str, max_items=max_items)
-        except Exception as exc:
-            logger.exception("Unexpected error while scraping keyword '%s': %s", keyword_str, exc)
-            continue
+            schedule.load(keyword_input)
+        except (OSError, ValueError) as exc:
+            logger.error("Failed to read input file %s: %s", input_path, exc)
+            discard_spool(keep_for_resume=journal is not None)
+            raise SystemExit(1)
+        if keyword_input.skipped:
+            logger.warning("Skipped %d invalid input entries", keyword_input.skipped)
+    if resume_meta and journal is not None:
+        schedule.mark_done(journal.iter_done_keywords())
+    keyword_counts = schedule.counts()
+    if not keyword_counts["total"]:
+        logger.error("Input contains no keywords.")
+        discard_spool(keep_for_resume=journal is not None)
+        raise SystemExit(1)
+    extra_formats = [fmt for fmt in schedule.formats() if fmt != output_format.lower()]
+    if extra_formats and top_k is not None:
+        logger.warning("Per-keyword output formats are ignored with top-K selection.")
+        extra_formats = []
 
-        # Tag each user with the keyword used to discover them
-        for user in users:
-            user.setdefault("search_keyword", keyword_str)
-        logger.info("Collected %d users for keyword '%s'", len(users), keyword_str)
+    logger.info(
+        "Searching %d keywords with concurrency=%d", keyword_counts["pending"], concurrency
+    )
+    scraper = create_scraper(
+        scraper_kwargs,
+        scraper_cfg,
+        concurrency,
+        args.prefetch if args.prefetch is not None else scraper_cfg.get("prefetch_depth", 0),
+    )
 
-        all_users.extend(users)
+    dedup = create_dedup(args, config)
+    avatars = create_avatar_downloader(args, config, scraper_kwargs["user_agent"], metrics, logger)
+    base_filename = resume_meta.get("base_filename", f"tiktok_users_{timestamp}")
+    exporter = create_exporter(args, config, metrics)
+    metrics_summary_path = (
+        os.path.join(output_dir, base_filename + ".metrics.json")
+        if metrics is not None and config.get("metrics", {}).get("summary", True)
+        else None
+    )
 
-    if not all_users:
-        logger.warning("No users were collected for any keyword. Nothing to export.")
-        raise SystemExit(0)
+    # Appendable streaming runs are checkpointed so they can be resumed with --resume
+    # A top-K run only writes once every keyword is done, so there is nothing to resume
+    # Compressed and sharded outputs instead leave complete files (and shards) behind
+    resumable = top_k is None and all(
+        exporter.can_resume(fmt) for fmt in [output_format, *extra_formats]
+    )
+    if journal is None and resumable and checkpoint_cfg.get("enabled", True):
+        journal = CheckpointJournal(
+            runs_dir,
+            run_id,
+            fsync_interval=checkpoint_cfg.get("fsync_interval", 1.0),
+            logger=logging.getLogger("tiktok_checkpoint"),
+        )
+        journal.create(
+            {
+                "input": input_path if keyword_input.is_stdin else os.path.abspath(input_path),
+                "input_format": keyword_input.input_format,
+                "base_filename": base_filename,
+                "output_dir": output_dir,
+                "output_format": output_format,
+                "max_items": max_items,
+            }
+        )
+        logger.info("Checkpointing run '%s' (resume with --resume %s)", run_id, run_id)
+
+    # Every format is written page by page as records arrive
+    page_exporter = PageExporter(
+        exporter,
+        output_format,
+        output_dir,
+        base_filename,
+        dedup=dedup,
+        snapshot=snapshot,
+        top_k=top_k,
+        avatars=avatars,
+        journal=journal,
+        budget=budget,
+        logger=logger,
+    )
+    start_state: Dict[str, Tuple[int, int]] = {}
+    if resume_meta and journal is not None:
+        start_state = journal.start_state()
+        page_exporter.resume(journal.outputs)
+
+    # Formats of the keywords routed to another output, held only while they are in flight
+    keyword_formats: Dict[str, str] = {}
+    input_drained = False
 
-    base_filename = f"tiktok_users_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
-    exporter = DatasetExporter(logger=logging.getLogger("dataset_exporter"))
+    def scheduled_keywords() -> Iterator[KeywordEntry]:
+        nonlocal input_drained
+        for spec in schedule.pending():
+            if budget is not None and budget.exhausted:
+                logger.warning(
+                    "Request budget of %d spent; remaining keywords are left for --resume.",
+                    budget.max_requests,
+                )
+                return
+            if spec.output_format is not None and spec.output_format in extra_formats:
+                keyword_formats[spec.keyword] = spec.output_format
+            yield spec.keyword, spec.max_items
+        input_drained = True
+        if budget is not None:
+            budget.input_finished()
 
+    # Only a run that left keywords to retry keeps its journal and spool
+    run_complete = False
     try:
-        output_path = exporter.export(
-            records=all_users,
-            fmt=output_format,
-            output_dir=output_dir,
-            base_filename=base_filename,
-        )
+        pages = iter_search_pages(scraper, scheduled_keywords(), max_items, logger, start_state)
+        for page in pages:
+            page_exporter.write_page(page, keyword_formats.get(page.keyword))
+            if page.next_cursor is None:
+                keyword_formats.pop(page.keyword, None)
+                if metrics is not None and metrics_file:
+                    metrics.write_prometheus(metrics_file)
+        page_exporter.finish(emit_not_seen)
+        page_exporter.close()
+        if page_exporter.failed_keywords:
+            logger.warning(
+                "%d keyword(s) stopped early because fetching failed%s",
+                page_exporter.failed_keywords,
+                f"; retry them with --resume {journal.run_id}" if journal is not None else "",
+            )
+        run_complete = input_drained and not page_exporter.failed_keywords
     except Exception as exc:
         logger.exception("Failed to export dataset: %s", exc)
+        if snapshot is not None:
+            snapshot.close()
         raise SystemExit(1)
+    finally:
+        page_exporter.close()
+        if journal is not None:
+            journal.close()
+        discard_spool(keep_for_resume=journal is not None and not run_complete)
+        if avatars is not None:
+            avatars.close()
 
-    logger.info("Export complete. File saved to: %s", output_path)
-    print(output_path)
+    if dedup is not None:
+        dedup.log_summary()
+    if budget is not None:
+        budget.log_summary()
+        yield_path = os.path.join(output_dir, base_filename + ".yield.json")
+        budget.write_report(yield_path)
+        logger.info("Wrote per-keyword yield curves to %s", yield_path)
+    if avatars is not None:
+        avatars.log_stats()
+    if response_cache is not None:
+        response_cache.log_stats()
+        response_cache.close()
+    if scraper.egress_pool is not None:
+        scraper.egress_pool.log_stats()
+
+    output_paths = page_exporter.output_paths
+    if not output_paths:
+        if snapshot is not None:
+            snapshot.commit()
+            snapshot.log_summary()
+            snapshot.close()
+            logger.info("No new or changed users since the last run. Nothing to export.")
+        else:
+            logger.warning("No users were collected for any keyword. Nothing to export.")
+        if metrics is not None:
+            write_metrics_report(metrics, metrics_file, metrics_summary_path, logger)
+        raise SystemExit(0)
+
+    # Only now is every emitted change safely on disk
+    if snapshot is not None:
+        snapshot.commit()
+        snapshot.log_summary()
+        snapshot.close()
+
+    # Top-K records were held in memory until the end, so they already carry every keyword
+    if dedup is not None and not page_exporter.to_store and top_k is None:
+        write_keyword_merges(dedup, output_dir, base_filename, logger)
+
+    if metrics is not None:
+        write_metrics_report(metrics, metrics_file, metrics_summary_path, logger)
+
+    logger.info("Export complete. File saved to: %s", ", ".join(output_paths))
+    for output_path in output_paths:
+        print(output_path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
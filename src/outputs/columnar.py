@@ -0,0 +1,240 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from extractors.utils_normalize import parse_count
+from outputs.dataset_exporter import StreamingWriter
+
+def _require_pyarrow() -> Any:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise RuntimeError(
+            "Parquet/Feather export requires pyarrow; install it with `pip install pyarrow`."
+        ) from exc
+    return pyarrow
+
+def user_schema() -> Any:
+    """
+    Fixed Arrow schema for exported users.
+
+    Nested `avatar_thumb` is flattened into typed columns (with `url_list` as
+    a list column), counts are int64, `verified` is derived from
+    `custom_verify`, and the low-cardinality `search_keyword` is
+    dictionary-encoded. `platform_sync_info` stays a JSON string because
+    its shape is not stable. `change_type` and `changes` (a JSON string)
+    are only filled in by incremental runs, `avatar_local_path` only when
+    avatars are downloaded.
+    """
+    pa = _require_pyarrow()
+    return pa.schema(
+        [
+            pa.field("uid", pa.string()),
+            pa.field("sec_uid", pa.string()),
+            pa.field("unique_id", pa.string()),
+            pa.field("nickname", pa.string()),
+            pa.field("signature", pa.string()),
+            pa.field("follower_count", pa.int64()),
+            pa.field("verified", pa.bool_()),
+            pa.field("custom_verify", pa.string()),
+            pa.field("follow_status", pa.int32()),
+            pa.field("avatar_thumb_uri", pa.string()),
+            pa.field("avatar_thumb_url_list", pa.list_(pa.string())),
+            pa.field("avatar_thumb_width", pa.int32()),
+            pa.field("avatar_thumb_height", pa.int32()),
+            pa.field("avatar_local_path", pa.string()),
+            pa.field("platform_sync_info", pa.string()),
+            pa.field("search_keyword", pa.dictionary(pa.int32(), pa.string())),
+            pa.field("search_keywords", pa.list_(pa.string())),
+            pa.field("change_type", pa.dictionary(pa.int8(), pa.string())),
+            pa.field("changes", pa.string()),
+        ]
+    )
+
+def _str_or_none(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+def _int_or_none(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+def flatten_user(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map one exporter record onto the columns of `user_schema`.
+    """
+    avatar = record.get("avatar_thumb")
+    if not isinstance(avatar, dict):
+        avatar = {}
+    url_list = avatar.get("url_list")
+    platform_sync_info = record.get("platform_sync_info")
+    search_keywords = record.get("search_keywords")
+    changes = record.get("changes")
+
+    return {
+        "uid": _str_or_none(record.get("uid")),
+        "sec_uid": _str_or_none(record.get("sec_uid")),
+        "unique_id": _str_or_none(record.get("unique_id")),
+        "nickname": _str_or_none(record.get("nickname")),
+        "signature": _str_or_none(record.get("signature")),
+        "follower_count": parse_count(record.get("follower_count")),
+        "verified": bool(record.get("custom_verify")),
+        "custom_verify": _str_or_none(record.get("custom_verify")),
+        "follow_status": _int_or_none(record.get("follow_status")),
+        "avatar_thumb_uri": _str_or_none(avatar.get("uri")),
+        "avatar_thumb_url_list": (
+            [str(url) for url in url_list] if isinstance(url_list, list) else None
+        ),
+        "avatar_thumb_width": _int_or_none(avatar.get("width")),
+        "avatar_thumb_height": _int_or_none(avatar.get("height")),
+        "avatar_local_path": _str_or_none(record.get("avatar_local_path")),
+        "platform_sync_info": (
+            json.dumps(platform_sync_info, ensure_ascii=False)
+            if platform_sync_info is not None
+            else None
+        ),
+        "search_keyword": _str_or_none(record.get("search_keyword")),
+        "search_keywords": (
+            [str(keyword) for keyword in search_keywords]
+            if isinstance(search_keywords, list)
+            else None
+        ),
+        "change_type": _str_or_none(record.get("change_type")),
+        "changes": json.dumps(changes, ensure_ascii=False) if changes is not None else None,
+    }
+
+class _ColumnarStreamWriter(StreamingWriter):
+    """
+    Buffers flattened rows column-wise and writes one Arrow batch per `row_group_size` rows.
+
+    Columnar files carry a footer, so these writers cannot be resumed
+    after a crash the way the text formats can.
+    """
+
+    resumable = False
+
+    def __init__(self, path: str, row_group_size: int = 65536) -> None:
+        super().__init__(path)
+        self.row_group_size = max(1, int(row_group_size))
+        self._schema: Any = None
+        self._sink: Any = None
+        self._columns: Dict[str, List[Any]] = {}
+        self._buffered = 0
+
+    def open(
+        self,
+        resume_offset: Optional[int] = None,
+        records_written: int = 0,
+    ) -> "StreamingWriter":
+        if resume_offset is not None:
+            raise ValueError(f"{type(self).__name__} does not support resuming")
+        self._schema = user_schema()
+        self._columns = {name: [] for name in self._schema.names}
+        self._sink = self._open_sink()
+        return self
+
+    @property
+    def offset(self) -> int:
+        return 0
+
+    def _write_batch(self, records: Iterable[Dict[str, Any]]) -> int:
+        if self._sink is None:
+            raise RuntimeError("write_batch() called before open()")
+        count = 0
+        for record in records:
+            for name, value in flatten_user(record).items():
+                self._columns[name].append(value)
+            count += 1
+        self._buffered += count
+        self.records_written += count
+        if self._buffered >= self.row_group_size:
+            self._flush()
+        return count
+
+    def _flush(self) -> None:
+        if not self._buffered:
+            return
+        pa = _require_pyarrow()
+        batch = pa.RecordBatch.from_pydict(self._columns, schema=self._schema)
+        self._write_record_batch(batch)
+        self._columns = {name: [] for name in self._schema.names}
+        self._buffered = 0
+
+    def close(self) -> None:
+        if self._sink is None:
+            return
+        self._flush()
+        self._close_sink()
+        self._sink = None
+
+    def _open_sink(self) -> Any:
+        raise NotImplementedError
+
+    def _write_record_batch(self, batch: Any) -> None:
+        raise NotImplementedError
+
+    def _close_sink(self) -> None:
+        self._sink.close()
+
+class ParquetStreamWriter(_ColumnarStreamWriter):
+    """
+    Writes Parquet, one row group per `row_group_size` records.
+    """
+
+    format_name = "parquet"
+
+    def __init__(
+        self,
+        path: str,
+        row_group_size: int = 65536,
+        compression: str = "zstd",
+    ) -> None:
+        super().__init__(path, row_group_size=row_group_size)
+        self.compression = compression
+
+    def _open_sink(self) -> Any:
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(self.path, self._schema, compression=self.compression)
+
+    def _write_record_batch(self, batch: Any) -> None:
+        self._sink.write_batch(batch, row_group_size=self.row_group_size)
+
+class FeatherStreamWriter(_ColumnarStreamWriter):
+    """
+    Writes an Arrow IPC file (Feather v2), one record batch per `row_group_size` records.
+
+    An IPC file allows only one dictionary per field, extended by deltas,
+    so dictionary columns are re-encoded against a dictionary that grows
+    across batches instead of each batch carrying its own.
+    """
+
+    format_name = "feather"
+
+    def __init__(self, path: str, row_group_size: int = 65536) -> None:
+        super().__init__(path, row_group_size=row_group_size)
+        self._dictionaries: Dict[str, Dict[str, int]] = {}
+
+    def _open_sink(self) -> Any:
+        pa = _require_pyarrow()
+        self._dictionaries = {
+            field.name: {} for field in self._schema if pa.types.is_dictionary(field.type)
+        }
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        return pa.ipc.new_file(self.path, self._schema, options=options)
+
+    def _write_record_batch(self, batch: Any) -> None:
+        pa = _require_pyarrow()
+        columns = batch.columns
+        for name, known in self._dictionaries.items():
+            index = self._schema.get_field_index(name)
+            column = columns[index]
+            remap = [known.setdefault(value, len(known)) for value in column.dictionary.to_pylist()]
+            indices = pa.array(remap, type=column.type.index_type).take(column.indices)
+            columns[index] = pa.DictionaryArray.from_arrays(
+                indices, pa.array(list(known), type=column.type.value_type)
+            )
+        self._sink.write_batch(pa.RecordBatch.from_arrays(columns, schema=self._schema))
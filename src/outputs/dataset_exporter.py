@@ -1,18 +1,559 @@
-thonimport json
+thonimport csv
+import gzip
+import html
+import io
+import json
 import logging
 import os
-from typing import Any, Dict, List
+import re
+import time
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Mapping, Optional, TextIO
 
-import pandas as pd
+from extractors.fast_decoder import USER_FIELDS, as_plain_dict
+from extractors.metrics import ScrapeMetrics
+
+# File suffix of each supported stream compression
+COMPRESSIONS: Dict[str, str] = {"gzip": ".gz", "zstd": ".zst"}
+
+# Every key the pipeline stages can add to a record, in column order
+RECORD_FIELDS = USER_FIELDS + (
+    "search_keyword",
+    "search_keywords",
+    "avatar_local_path",
+    "change_type",
+    "changes",
+)
+
+# Control characters that XML, and therefore XLSX, cannot store
+_ILLEGAL_XLSX_CHARS = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+
+def _xml_escape(text: str) -> str:
+    return (
+        text.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+        .replace("'", "&apos;")
+    )
+
+def _xml_user_lines(record: Dict[str, Any]) -> List[str]:
+    lines: List[str] = ["  <user>"]
+    for key, value in record.items():
+        if value is None:
+            continue
+        if isinstance(value, (dict, list)):
+            serialized = _xml_escape(json.dumps(value, ensure_ascii=False))
+        else:
+            serialized = _xml_escape(str(value))
+        lines.append(f"    <{key}>{serialized}</{key}>")
+    lines.append("  </user>")
+    return lines
+
+def _cell_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+def _xlsx_cell(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return _ILLEGAL_XLSX_CHARS.sub("", _cell_text(value))
+
+def _compressed_stream(raw: BinaryIO, compression: str) -> Any:
+    if compression == "gzip":
+        return gzip.GzipFile(filename="", mode="wb", fileobj=raw)
+    if compression == "zstd":
+        try:
+            from compression import zstd  # type: ignore[import-not-found]  # Python 3.14+
+
+            return zstd.ZstdFile(raw, "wb")
+        except ImportError:
+            pass
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression requires the 'zstandard' package") from None
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+def _plain_records(records: Iterable[Mapping[str, Any]]) -> Iterator[Dict[str, Any]]:
+    for record in records:
+        if not isinstance(record, Mapping):
+            raise ValueError("records must be dictionaries")
+        yield as_plain_dict(record)
+
+class StreamingWriter:
+    """
+    Incremental writer used by the streaming export pipeline.
+
+    Call `open()`, then `write_batch()` once per page of records, then
+    `close()`. Each batch is flushed to disk immediately, so memory stays
+    bounded by the batch size and a crash keeps everything written so far.
+    Writers are also context managers.
+
+    When `metrics` is set (DatasetExporter.open_stream does this), each
+    batch's write time and record count are recorded under `format_name`.
+
+    With `compression` ("gzip" or "zstd") the file is written through a
+    compressor. Each batch is still flushed, so a crash leaves a readable
+    prefix, but a compressed file cannot be resumed.
+    """
+
+    # Whether an interrupted file can be reopened and appended to
+    resumable = True
+    format_name = ""
+    metrics: Optional[ScrapeMetrics] = None
+    compression: Optional[str] = None
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.records_written = 0
+        self._file: Optional[TextIO] = None
+        self._raw: Optional[BinaryIO] = None
+
+    def open(
+        self,
+        resume_offset: Optional[int] = None,
+        records_written: int = 0,
+    ) -> "StreamingWriter":
+        """
+        Create the file, or with `resume_offset` reopen an existing one.
+
+        Resuming truncates the file to `resume_offset` (the size recorded
+        after the last checkpointed batch, which never includes the footer)
+        and continues appending from there.
+        """
+        if self.compression is not None:
+            if resume_offset is not None:
+                raise ValueError(f"{self.compression}-compressed output cannot be resumed")
+            self._raw = open(self.path, "wb")
+            self._file = io.TextIOWrapper(
+                _compressed_stream(self._raw, self.compression), encoding="utf-8", newline=""
+            )
+            self._write_header()
+            return self
+
+        if resume_offset is None or not os.path.exists(self.path):
+            self._file = open(self.path, "w", encoding="utf-8", newline="")
+            self._write_header()
+            return self
+
+        self._file = open(self.path, "r+", encoding="utf-8", newline="")
+        self._file.truncate(resume_offset)
+        self._file.seek(0, os.SEEK_END)
+        self.records_written = records_written
+        self._resume()
+        if resume_offset == 0:
+            self._write_header()
+        return self
+
+    @property
+    def offset(self) -> int:
+        """
+        Current size of the output in bytes, excluding any footer.
+
+        For compressed output this is the compressed size written so far.
+        """
+        if self._raw is not None:
+            return self._raw.tell()
+        return self._file.tell() if self._file is not None else 0
+
+    @property
+    def file(self) -> Optional[TextIO]:
+        return self._file
+
+    def write_batch(self, records: Iterable[Dict[str, Any]]) -> int:
+        if self.metrics is None:
+            return self._write_batch(records)
+        start = time.perf_counter()
+        written = self._write_batch(records)
+        self.metrics.observe(
+            "tiktok_export_seconds", time.perf_counter() - start, format=self.format_name
+        )
+        self.metrics.inc("tiktok_export_records_total", written, format=self.format_name)
+        return written
+
+    def _write_batch(self, records: Iterable[Dict[str, Any]]) -> int:
+        if self._file is None:
+            raise RuntimeError("write_batch() called before open()")
+        written = self._write_records(records)
+        self._file.flush()
+        self.records_written += written
+        return written
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._write_footer()
+        self._file.close()
+        self._file = None
+        # The compressor leaves the file it writes to open
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+
+    def __enter__(self) -> "StreamingWriter":
+        return self.open()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _write_header(self) -> None:
+        pass
+
+    def _resume(self) -> None:
+        pass
+
+    def _write_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        raise NotImplementedError
+
+    def _write_footer(self) -> None:
+        pass
+
+class JsonArrayStreamWriter(StreamingWriter):
+    """
+    Streams a JSON array byte-identical to `json.dump(records, f, indent=2)`.
+
+    The closing bracket is only written by `close()`; use JSON Lines when
+    the file must stay parseable after a crash.
+    """
+
+    format_name = "json"
+
+    def _write_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        assert self._file is not None
+        count = 0
+        for record in records:
+            separator = ",\n" if self.records_written + count else "[\n"
+            body = json.dumps(as_plain_dict(record), indent=2, ensure_ascii=False)
+            body = body.replace("\n", "\n  ")
+            self._file.write(separator + "  " + body)
+            count += 1
+        return count
+
+    def _write_footer(self) -> None:
+        assert self._file is not None
+        self._file.write("\n]" if self.records_written else "[]")
+
+class JsonLinesStreamWriter(StreamingWriter):
+    """
+    Writes one compact JSON object per line.
+    """
+
+    format_name = "jsonl"
+
+    def _write_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        assert self._file is not None
+        count = 0
+        for record in records:
+            self._file.write(json.dumps(as_plain_dict(record), ensure_ascii=False))
+            self._file.write("\n")
+            count += 1
+        return count
+
+class _TabularStreamWriter(StreamingWriter):
+    """
+    Base for writers whose columns are fixed when the first record is written.
+
+    The header holds every field in RECORD_FIELDS, so keys that only some
+    records carry (dedup, snapshot and avatar fields) keep their column,
+    followed by any other keys of the first record. Unknown keys that
+    first appear later are dropped with a warning, as the header has
+    already been written by then.
+    """
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None) -> None:
+        super().__init__(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self.columns: Optional[List[str]] = None
+        self._column_set: frozenset = frozenset()
+        self._warned_keys: set = set()
+
+    def _set_columns(self, columns: List[str]) -> None:
+        self.columns = columns
+        self._column_set = frozenset(columns)
+
+    def _write_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        for record in records:
+            if self.columns is None:
+                self._set_columns(
+                    list(RECORD_FIELDS) + [key for key in record if key not in RECORD_FIELDS]
+                )
+                self._write_columns()
+            if not self._column_set.issuperset(record.keys()):
+                extra = set(record.keys()) - self._column_set - self._warned_keys
+                if extra:
+                    self._warned_keys |= extra
+                    self.logger.warning(
+                        "Dropping %s columns not present in header: %s",
+                        self.format_name.upper(),
+                        sorted(extra),
+                    )
+            self._write_row(record)
+            count += 1
+        return count
+
+    def _write_columns(self) -> None:
+        raise NotImplementedError
+
+    def _write_row(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+class CsvStreamWriter(_TabularStreamWriter):
+    """
+    Writes CSV rows incrementally; nested values are serialized as JSON.
+    """
+
+    format_name = "csv"
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None) -> None:
+        super().__init__(path, logger=logger)
+        self._writer: Optional[csv.DictWriter] = None
+
+    def _resume(self) -> None:
+        # Recover the column order from the header row already on disk
+        assert self._file is not None
+        end = self._file.tell()
+        self._file.seek(0)
+        header = next(csv.reader([self._file.readline()]), None) if end else None
+        self._file.seek(0, os.SEEK_END)
+        if header:
+            self._set_columns(header)
+            self._writer = csv.DictWriter(self._file, fieldnames=header, extrasaction="ignore")
+
+    def _write_columns(self) -> None:
+        assert self._file is not None and self.columns is not None
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def _write_row(self, record: Dict[str, Any]) -> None:
+        assert self._writer is not None
+        self._writer.writerow(
+            {
+                key: json.dumps(value, ensure_ascii=False)
+                if isinstance(value, (dict, list))
+                else value
+                for key, value in record.items()
+            }
+        )
+
+class HtmlStreamWriter(_TabularStreamWriter):
+    """
+    Writes an HTML table row by row, with the markup of pandas'
+    `to_html(index=False, border=0)`.
+
+    Missing values become empty cells and nested values are serialized as
+    JSON. Each batch is flushed as it is written.
+    """
+
+    resumable = False
+    format_name = "html"
+
+    def _write_columns(self) -> None:
+        assert self._file is not None and self.columns is not None
+        cells = "".join(
+            f"      <th>{html.escape(str(column), quote=False)}</th>\n" for column in self.columns
+        )
+        self._file.write(
+            '<table class="dataframe">\n  <thead>\n    <tr style="text-align: right;">\n'
+            f"{cells}    </tr>\n  </thead>\n  <tbody>\n"
+        )
+
+    def _write_row(self, record: Dict[str, Any]) -> None:
+        assert self._file is not None and self.columns is not None
+        cells = "".join(
+            f"      <td>{html.escape(_cell_text(record.get(column)), quote=False)}</td>\n"
+            for column in self.columns
+        )
+        self._file.write(f"    <tr>\n{cells}    </tr>\n")
+
+    def _write_footer(self) -> None:
+        assert self._file is not None
+        if self.columns is None:
+            self._set_columns([])
+            self._write_columns()
+        self._file.write("  </tbody>\n</table>")
+
+class XlsxStreamWriter(_TabularStreamWriter):
+    """
+    Writes XLSX with openpyxl's write-only mode, which streams rows to a
+    temporary file instead of keeping a cell object per value in memory.
+
+    A sheet holds at most `max_rows` rows including its header (Excel's
+    limit by default). Further rows continue on `Sheet1_2`, `Sheet1_3`, ...,
+    each with its own header. Nested values are serialized as JSON and
+    control characters Excel cannot store are dropped. The workbook is only
+    complete after `close()`, so it cannot be resumed.
+    """
+
+    resumable = False
+    format_name = "xlsx"
+    MAX_ROWS = 1_048_576
+
+    def __init__(
+        self,
+        path: str,
+        logger: Optional[logging.Logger] = None,
+        sheet_name: str = "Sheet1",
+        max_rows: int = MAX_ROWS,
+    ) -> None:
+        super().__init__(path, logger=logger)
+        self.sheet_name = sheet_name
+        self.max_rows = max(2, min(int(max_rows), self.MAX_ROWS))
+        self.sheets = 0
+        self._workbook: Any = None
+        self._sheet: Any = None
+        self._sheet_rows = 0
+
+    def open(
+        self,
+        resume_offset: Optional[int] = None,
+        records_written: int = 0,
+    ) -> "StreamingWriter":
+        if resume_offset is not None:
+            raise ValueError(f"{type(self).__name__} does not support resuming")
+        from openpyxl import Workbook
+
+        self._workbook = Workbook(write_only=True)
+        return self
+
+    @property
+    def offset(self) -> int:
+        return 0
+
+    def _write_batch(self, records: Iterable[Dict[str, Any]]) -> int:
+        if self._workbook is None:
+            raise RuntimeError("write_batch() called before open()")
+        written = self._write_records(records)
+        self.records_written += written
+        return written
+
+    def _add_sheet(self) -> None:
+        self.sheets += 1
+        name = self.sheet_name if self.sheets == 1 else f"{self.sheet_name}_{self.sheets}"
+        self._sheet = self._workbook.create_sheet(name)
+        self._sheet.append(self.columns or [])
+        self._sheet_rows = 1
+
+    def _write_columns(self) -> None:
+        self._add_sheet()
+
+    def _write_row(self, record: Dict[str, Any]) -> None:
+        if self._sheet_rows >= self.max_rows:
+            self._add_sheet()
+        self._sheet.append([_xlsx_cell(record.get(column)) for column in self.columns or []])
+        self._sheet_rows += 1
+
+    def close(self) -> None:
+        if self._workbook is None:
+            return
+        if self._sheet is None:
+            self._add_sheet()
+        self._workbook.save(self.path)
+        self._workbook = None
+        self._sheet = None
+        if self.sheets > 1:
+            self.logger.info(
+                "Split %d records over %d sheets in %s",
+                self.records_written,
+                self.sheets,
+                self.path,
+            )
+
+class XmlStreamWriter(StreamingWriter):
+    """
+    Writes an XML document of `<user>` elements, one user at a time.
+    """
+
+    format_name = "xml"
+
+    def _write_header(self) -> None:
+        assert self._file is not None
+        self._file.write('<?xml version="1.0" encoding="UTF-8"?>\n<users>')
+
+    def _write_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        assert self._file is not None
+        count = 0
+        for record in records:
+            self._file.write("\n" + "\n".join(_xml_user_lines(record)))
+            count += 1
+        return count
+
+    def _write_footer(self) -> None:
+        assert self._file is not None
+        self._file.write("\n</users>")
 
 class DatasetExporter:
     """
-    Export a list of records to different tabular formats.
-    Supported formats: json, csv, xlsx, html, xml
+    Export records to different tabular formats.
+    Supported formats: json, jsonl, csv, xlsx, html, xml, parquet, feather, sqlite
+
+    Every format has a StreamingWriter, so memory stays bounded by one batch
+    however large the export. `export` writes any iterable of records in one
+    call; `open_stream` returns the writer so records can be added batch by
+    batch as they arrive.
+
+    `sqlite` upserts into one database that is kept across runs, at
+    `sqlite_path` or `<output_dir>/tiktok_users.sqlite3`, instead of a new
+    timestamped file.
+
+    Text formats can be written through `compression` ("gzip" or "zstd";
+    the file name gets `.gz` / `.zst`). With `shard_max_records` and/or
+    `shard_max_bytes`, file formats roll over into numbered shards
+    (`<base>.00001.jsonl.gz`, ...) described by `<base>.manifest.json`,
+    whose path is then the output path (see ShardedStreamWriter).
     """
 
-    def __init__(self, logger: logging.Logger | None = None) -> None:
+    EXTENSIONS: Dict[str, str] = {
+        "json": ".json",
+        "jsonl": ".jsonl",
+        "csv": ".csv",
+        "xlsx": ".xlsx",
+        "html": ".html",
+        "xml": ".xml",
+        "parquet": ".parquet",
+        "feather": ".feather",
+        "sqlite": ".sqlite3",
+    }
+    STREAMING_FORMATS = frozenset(EXTENSIONS)
+    RESUMABLE_FORMATS = frozenset({"json", "jsonl", "csv", "xml", "sqlite"})
+    COMPRESSIBLE_FORMATS = frozenset({"json", "jsonl", "csv", "xml", "html"})
+    SQLITE_FILENAME = "tiktok_users.sqlite3"
+
+    def __init__(
+        self,
+        logger: logging.Logger | None = None,
+        metrics: Optional[ScrapeMetrics] = None,
+        sqlite_path: Optional[str] = None,
+        compression: Optional[str] = None,
+        shard_max_records: Optional[int] = None,
+        shard_max_bytes: Optional[int] = None,
+    ) -> None:
+        if compression is not None:
+            # Fail now, not after the first page was scraped, if the codec is missing
+            _compressed_stream(io.BytesIO(), compression).close()
         self.logger = logger or logging.getLogger(__name__)
+        self.metrics = metrics
+        self.sqlite_path = sqlite_path
+        self.compression = compression
+        self.shard_max_records = shard_max_records or None
+        self.shard_max_bytes = shard_max_bytes or None
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_max_records is not None or self.shard_max_bytes is not None
+
+    def can_resume(self, fmt: str) -> bool:
+        """
+        Whether a `fmt` stream from this exporter can be resumed after a crash.
+        """
+        fmt = fmt.lower()
+        if fmt == "sqlite":
+            return True
+        return fmt in self.RESUMABLE_FORMATS and self.compression is None and not self.sharded
 
     def _ensure_output_dir(self, output_dir: str) -> str:
         if not os.path.isabs(output_dir):
@@ -20,92 +561,121 @@ class DatasetExporter:
         os.makedirs(output_dir, exist_ok=True)
         return output_dir
 
-    def _export_json(self, records: List[Dict[str, Any]], path: str) -> None:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(records, f, indent=2, ensure_ascii=False)
-
-    def _export_csv(self, records: List[Dict[str, Any]], path: str) -> None:
-        df = pd.DataFrame(records)
-        df.to_csv(path, index=False)
-
-    def _export_xlsx(self, records: List[Dict[str, Any]], path: str) -> None:
-        df = pd.DataFrame(records)
-        df.to_excel(path, index=False)
-
-    def _export_html(self, records: List[Dict[str, Any]], path: str) -> None:
-        df = pd.DataFrame(records)
-        html = df.to_html(index=False, border=0)
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(html)
-
-    def _export_xml(self, records: List[Dict[str, Any]], path: str) -> None:
-        # Simple XML serialization without external dependencies
-        def escape(text: str) -> str:
-            return (
-                text.replace("&", "&amp;")
-                .replace("<", "&lt;")
-                .replace(">", "&gt;")
-                .replace('"', "&quot;")
-                .replace("'", "&apos;")
+    def _create_writer(self, fmt: str, output_dir: str, base_filename: str) -> StreamingWriter:
+        fmt_normalized = fmt.lower()
+        if fmt_normalized not in self.EXTENSIONS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        output_dir = self._ensure_output_dir(output_dir)
+        if fmt_normalized == "sqlite":
+            from outputs.sqlite_store import SqliteStreamWriter
+
+            path = self.sqlite_path or os.path.join(output_dir, self.SQLITE_FILENAME)
+            return SqliteStreamWriter(os.path.abspath(path), logger=self.logger)
+
+        if self.compression is not None and fmt_normalized not in self.COMPRESSIBLE_FORMATS:
+            self.logger.warning(
+                "%s output is written uncompressed; %s only applies to text formats",
+                fmt_normalized,
+                self.compression,
             )
+        if not self.sharded:
+            return self._create_file_writer(fmt_normalized, output_dir, base_filename)
 
-        lines: List[str] = ['<?xml version="1.0" encoding="UTF-8"?>', "<users>"]
-        for record in records:
-            lines.append("  <user>")
-            for key, value in record.items():
-                if value is None:
-                    continue
-                if isinstance(value, (dict, list)):
-                    serialized = escape(json.dumps(value, ensure_ascii=False))
-                else:
-                    serialized = escape(str(value))
-                lines.append(f"    <{key}>{serialized}</{key}>")
-            lines.append("  </user>")
-        lines.append("</users>")
-
-        with open(path, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines))
+        from outputs.shards import ShardedStreamWriter
+
+        return ShardedStreamWriter(
+            os.path.join(output_dir, base_filename + ".manifest.json"),
+            fmt_normalized,
+            lambda index: self._create_file_writer(
+                fmt_normalized, output_dir, f"{base_filename}.{index:05d}"
+            ),
+            max_records=self.shard_max_records,
+            max_bytes=self.shard_max_bytes,
+            compression=(
+                self.compression if fmt_normalized in self.COMPRESSIBLE_FORMATS else None
+            ),
+            logger=self.logger,
+        )
+
+    def _create_file_writer(
+        self, fmt_normalized: str, output_dir: str, base_filename: str
+    ) -> StreamingWriter:
+        path = os.path.join(output_dir, base_filename + self.EXTENSIONS[fmt_normalized])
+        compression = None
+        if self.compression is not None and fmt_normalized in self.COMPRESSIBLE_FORMATS:
+            compression = self.compression
+            path += COMPRESSIONS[compression]
+
+        writer_map: Dict[str, Any] = {
+            "json": JsonArrayStreamWriter,
+            "jsonl": JsonLinesStreamWriter,
+            "csv": CsvStreamWriter,
+            "xml": XmlStreamWriter,
+            "html": HtmlStreamWriter,
+            "xlsx": XlsxStreamWriter,
+        }
+        if fmt_normalized in {"parquet", "feather"}:
+            from outputs.columnar import FeatherStreamWriter, ParquetStreamWriter
+
+            writer_map["parquet"] = ParquetStreamWriter
+            writer_map["feather"] = FeatherStreamWriter
+        writer_cls = writer_map[fmt_normalized]
+        if issubclass(writer_cls, _TabularStreamWriter):
+            writer = writer_cls(path, logger=self.logger)
+        else:
+            writer = writer_cls(path)
+        writer.compression = compression
+        return writer
+
+    def open_stream(
+        self,
+        fmt: str,
+        output_dir: str,
+        base_filename: str,
+        resume_offset: Optional[int] = None,
+        records_written: int = 0,
+    ) -> StreamingWriter:
+        """
+        Open an incremental writer for `fmt` and return it.
+
+        Pass `resume_offset`/`records_written` from a checkpoint to append
+        to an interrupted export instead of rewriting it; only the formats
+        in RESUMABLE_FORMATS support this, and only uncompressed and
+        unsharded (see `can_resume`).
+        """
+        writer = self._create_writer(fmt, output_dir, base_filename)
+        self.logger.info("Streaming records to %s (%s)", writer.path, writer.format_name)
+        writer.metrics = self.metrics
+        return writer.open(resume_offset=resume_offset, records_written=records_written)
 
     def export(
         self,
-        records: List[Dict[str, Any]],
+        records: Iterable[Mapping[str, Any]],
         fmt: str,
         output_dir: str,
         base_filename: str,
     ) -> str:
         """
         Export records and return the absolute path to the written file.
+
+        `records` can be any iterable, e.g. a generator; it is consumed
+        once and never held in memory as a whole.
         """
-        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
-            raise ValueError("records must be a list of dictionaries")
+        if isinstance(records, (str, bytes, Mapping)) or not isinstance(records, Iterable):
+            raise ValueError("records must be an iterable of dictionaries")
 
-        fmt_normalized = fmt.lower()
-        if fmt_normalized not in {"json", "csv", "xlsx", "html", "xml"}:
-            raise ValueError(f"Unsupported export format: {fmt}")
+        writer = self._create_writer(fmt, output_dir, base_filename)
+        start = time.perf_counter()
+        with writer:
+            written = writer.write_batch(_plain_records(records))
+        self.logger.info(
+            "Exported %d records to %s (%s)", written, writer.path, writer.format_name
+        )
 
-        output_dir = self._ensure_output_dir(output_dir)
+        if self.metrics is not None:
+            self.metrics.observe(
+                "tiktok_export_seconds", time.perf_counter() - start, format=writer.format_name
+            )
+            self.metrics.inc("tiktok_export_records_total", written, format=writer.format_name)
 
-        extension_map = {
-            "json": ".json",
-            "csv": ".csv",
-            "xlsx": ".xlsx",
-            "html": ".html",
-            "xml": ".xml",
-        }
-        extension = extension_map[fmt_normalized]
-        path = os.path.join(output_dir, base_filename + extension)
-
-        self.logger.info("Exporting %d records to %s (%s)", len(records), path, fmt_normalized)
-
-        if fmt_normalized == "json":
-            self._export_json(records, path)
-        elif fmt_normalized == "csv":
-            self._export_csv(records, path)
-        elif fmt_normalized == "xlsx":
-            self._export_xlsx(records, path)
-        elif fmt_normalized == "html":
-            self._export_html(records, path)
-        elif fmt_normalized == "xml":
-            self._export_xml(records, path)
-
-        return os.path.abspath(path)
\ No newline at end of file
+        return os.path.abspath(writer.path)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from outputs.dataset_exporter import StreamingWriter
+
+def _digest(path: str) -> str:
+    """
+    SHA-256 of a finished shard, which is also fsynced so the manifest never lists lost data.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+        os.fsync(f.fileno())
+    return digest.hexdigest()
+
+class ShardedStreamWriter(StreamingWriter):
+    """
+    Splits one export into numbered shards and describes them in a manifest.
+
+    `open_shard(n)` creates the writer for shard `n` (counting from 1). A
+    shard is closed once it holds `max_records` records, or once it has
+    reached `max_bytes` on disk (compressed size when compressed, checked
+    after each batch, so a shard may overshoot by one page). The next shard
+    is opened with the next record. Batches are split, so record limits
+    are exact.
+
+    `path` is the manifest, a JSON file rewritten atomically whenever a
+    shard is closed. It lists each finished shard's file name, record
+    count, byte size, SHA-256 and the keywords it covers (the first and
+    last in write order, and how many). Shards are only listed once whole,
+    so an interrupted export leaves complete, verifiable shards behind;
+    `complete` turns true when the writer is closed. Sharded output is
+    not resumable.
+    """
+
+    resumable = False
+
+    def __init__(
+        self,
+        path: str,
+        format_name: str,
+        open_shard: Callable[[int], StreamingWriter],
+        max_records: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        compression: Optional[str] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        super().__init__(path)
+        self.format_name = format_name
+        self.open_shard = open_shard
+        self.max_records = max_records or None
+        self.max_bytes = max_bytes or None
+        self.shard_compression = compression
+        self.logger = logger or logging.getLogger(__name__)
+        self.shards: List[Dict[str, Any]] = []
+        self._shard: Optional[StreamingWriter] = None
+        self._opened = False
+        self._first_keyword: Optional[str] = None
+        self._last_keyword: Optional[str] = None
+        self._keywords: Set[str] = set()
+
+    def open(
+        self,
+        resume_offset: Optional[int] = None,
+        records_written: int = 0,
+    ) -> "StreamingWriter":
+        if resume_offset is not None:
+            raise ValueError(f"{type(self).__name__} does not support resuming")
+        self._opened = True
+        self._write_manifest(complete=False)
+        return self
+
+    @property
+    def offset(self) -> int:
+        return 0
+
+    def _shard_size(self, shard: StreamingWriter) -> int:
+        # Formats that do not track an offset (columnar) still grow on disk as they write
+        if shard.offset:
+            return shard.offset
+        return os.path.getsize(shard.path) if os.path.exists(shard.path) else 0
+
+    def _track(self, records: List[Any]) -> None:
+        for record in records:
+            keyword = record.get("search_keyword")
+            if keyword is None:
+                continue
+            if self._first_keyword is None:
+                self._first_keyword = keyword
+            self._last_keyword = keyword
+            self._keywords.add(keyword)
+
+    def _write_batch(self, records: Iterable[Dict[str, Any]]) -> int:
+        if not self._opened:
+            raise RuntimeError("write_batch() called before open()")
+        pending = list(records)
+        written = 0
+        while pending:
+            shard = self._shard
+            if shard is None:
+                shard = self._shard = self.open_shard(len(self.shards) + 1).open()
+            room = len(pending)
+            if self.max_records is not None:
+                room = min(room, self.max_records - shard.records_written)
+            chunk, pending = pending[:room], pending[room:]
+            shard.write_batch(chunk)
+            self._track(chunk)
+            written += len(chunk)
+            if (
+                self.max_records is not None and shard.records_written >= self.max_records
+            ) or (self.max_bytes is not None and self._shard_size(shard) >= self.max_bytes):
+                self._finish_shard()
+        self.records_written += written
+        return written
+
+    def _finish_shard(self) -> None:
+        shard = self._shard
+        if shard is None:
+            return
+        shard.close()
+        self._shard = None
+        entry = {
+            "file": os.path.basename(shard.path),
+            "records": shard.records_written,
+            "bytes": os.path.getsize(shard.path),
+            "sha256": _digest(shard.path),
+            "first_keyword": self._first_keyword,
+            "last_keyword": self._last_keyword,
+            "keywords": len(self._keywords),
+        }
+        self.shards.append(entry)
+        self._first_keyword = self._last_keyword = None
+        self._keywords = set()
+        self._write_manifest(complete=False)
+        self.logger.info(
+            "Finished shard %s (%d records, %d bytes)",
+            entry["file"],
+            entry["records"],
+            entry["bytes"],
+        )
+
+    def _write_manifest(self, complete: bool) -> None:
+        manifest = {
+            "format": self.format_name,
+            "compression": self.shard_compression,
+            "complete": complete,
+            "records": sum(shard["records"] for shard in self.shards),
+            "bytes": sum(shard["bytes"] for shard in self.shards),
+            "max_records": self.max_records,
+            "max_bytes": self.max_bytes,
+            "shards": self.shards,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def close(self) -> None:
+        if not self._opened:
+            return
+        self._finish_shard()
+        self._write_manifest(complete=True)
+        self._opened = False
@@ -0,0 +1,295 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from extractors.fast_decoder import as_plain_dict
+from outputs.columnar import flatten_user
+from outputs.dataset_exporter import StreamingWriter
+
+# Columns returned by the query helpers, in display order
+QUERY_COLUMNS = ("uid", "unique_id", "nickname", "follower_count", "custom_verify", "last_seen_at")
+
+def _utc_now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+def _json_or_none(value: Any) -> Optional[str]:
+    return json.dumps(value, ensure_ascii=False) if value is not None else None
+
+class UserStore:
+    """
+    Users from every run in one SQLite database (WAL mode), upserted by `uid`.
+
+    - `users` holds the latest version of each user. Typed columns match
+      the Parquet schema, and the full record is kept as JSON in `data`.
+      `first_seen_at` is set once, `last_seen_at` on every upsert.
+    - `keyword_users` links every keyword to every user found under it,
+      including users dropped as cross-keyword duplicates.
+
+    `unique_id`, `follower_count`, `custom_verify` and `search_keyword` are
+    indexed, so the lookups below never scan the whole table. Each call to
+    `upsert_users` or `link_keyword` is one transaction.
+    """
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None) -> None:
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.skipped = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " uid TEXT PRIMARY KEY,"
+            " sec_uid TEXT,"
+            " unique_id TEXT,"
+            " nickname TEXT,"
+            " signature TEXT,"
+            " follower_count INTEGER,"
+            " custom_verify TEXT,"
+            " follow_status INTEGER,"
+            " avatar_thumb TEXT,"
+            " platform_sync_info TEXT,"
+            " search_keyword TEXT,"
+            " data TEXT NOT NULL,"
+            " first_seen_at TEXT NOT NULL,"
+            " last_seen_at TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        for column in ("unique_id", "follower_count", "custom_verify", "search_keyword"):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS users_{column} ON users ({column})")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS keyword_users ("
+            " keyword TEXT NOT NULL,"
+            " uid TEXT NOT NULL,"
+            " first_seen_at TEXT NOT NULL,"
+            " last_seen_at TEXT NOT NULL,"
+            " PRIMARY KEY (keyword, uid)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS keyword_users_uid ON keyword_users (uid)")
+
+    def _write_links(self, links: Iterable[Tuple[str, str]], now: str) -> None:
+        self._conn.executemany(
+            "INSERT INTO keyword_users (keyword, uid, first_seen_at, last_seen_at)"
+            " VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (keyword, uid) DO UPDATE SET last_seen_at = excluded.last_seen_at",
+            [(keyword, uid, now, now) for keyword, uid in links],
+        )
+
+    def upsert_users(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Insert or update a batch of users and return how many records were consumed.
+
+        Records without a `uid` are skipped, as are incremental `not_seen`
+        markers, which carry no profile to store.
+        """
+        now = _utc_now()
+        rows: List[Tuple[Any, ...]] = []
+        links: Dict[Tuple[str, str], None] = {}
+        count = 0
+        for record in records:
+            count += 1
+            record = as_plain_dict(record)
+            row = flatten_user(record)
+            uid = row["uid"]
+            if not uid or record.get("change_type") == "not_seen":
+                self.skipped += 1
+                continue
+            rows.append(
+                (
+                    uid,
+                    row["sec_uid"],
+                    row["unique_id"],
+                    row["nickname"],
+                    row["signature"],
+                    row["follower_count"],
+                    row["custom_verify"],
+                    row["follow_status"],
+                    _json_or_none(record.get("avatar_thumb")),
+                    row["platform_sync_info"],
+                    row["search_keyword"],
+                    json.dumps(record, ensure_ascii=False, default=str),
+                    now,
+                    now,
+                )
+            )
+            for keyword in [row["search_keyword"], *(row["search_keywords"] or [])]:
+                if keyword:
+                    links[(keyword, uid)] = None
+
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT INTO users (uid, sec_uid, unique_id, nickname, signature,"
+                " follower_count, custom_verify, follow_status, avatar_thumb,"
+                " platform_sync_info, search_keyword, data, first_seen_at, last_seen_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (uid) DO UPDATE SET sec_uid = excluded.sec_uid,"
+                " unique_id = excluded.unique_id, nickname = excluded.nickname,"
+                " signature = excluded.signature, follower_count = excluded.follower_count,"
+                " custom_verify = excluded.custom_verify,"
+                " follow_status = excluded.follow_status, avatar_thumb = excluded.avatar_thumb,"
+                " platform_sync_info = excluded.platform_sync_info,"
+                " search_keyword = excluded.search_keyword, data = excluded.data,"
+                " last_seen_at = excluded.last_seen_at",
+                rows,
+            )
+            self._write_links(links, now)
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return count
+
+    def link_keyword(self, keyword: str, users: Iterable[Dict[str, Any]]) -> None:
+        """
+        Record that `users` were found under `keyword`, whether or not they are exported.
+        """
+        uids = {str(user["uid"]) for user in users if user.get("uid")}
+        if not uids:
+            return
+        self._conn.execute("BEGIN")
+        try:
+            self._write_links(((keyword, uid) for uid in sorted(uids)), _utc_now())
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _rows(self, sql: str, params: Tuple[Any, ...]) -> List[Dict[str, Any]]:
+        cursor = self._conn.execute(sql, params)
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def top_by_followers(
+        self,
+        keyword: Optional[str] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """
+        The `limit` users with the most followers, optionally only those found under `keyword`.
+        """
+        columns = ", ".join(f"u.{column}" for column in QUERY_COLUMNS)
+        if keyword is None:
+            return self._rows(
+                f"SELECT {columns} FROM users u"
+                " WHERE u.follower_count IS NOT NULL"
+                " ORDER BY u.follower_count DESC LIMIT ?",
+                (limit,),
+            )
+        return self._rows(
+            f"SELECT {columns} FROM keyword_users k JOIN users u ON u.uid = k.uid"
+            " WHERE k.keyword = ? ORDER BY u.follower_count DESC LIMIT ?",
+            (keyword, limit),
+        )
+
+    def verified_users(
+        self,
+        keyword: Optional[str] = None,
+        limit: int = -1,
+    ) -> List[Dict[str, Any]]:
+        """
+        Users with a non-empty `custom_verify`, most followed first (`limit=-1` for all).
+        """
+        columns = ", ".join(f"u.{column}" for column in QUERY_COLUMNS)
+        if keyword is None:
+            return self._rows(
+                f"SELECT {columns} FROM users u"
+                " WHERE u.custom_verify > '' ORDER BY u.follower_count DESC LIMIT ?",
+                (limit,),
+            )
+        return self._rows(
+            f"SELECT {columns} FROM keyword_users k JOIN users u ON u.uid = k.uid"
+            " WHERE k.keyword = ? AND u.custom_verify > ''"
+            " ORDER BY u.follower_count DESC LIMIT ?",
+            (keyword, limit),
+        )
+
+    def find_user(self, handle: str) -> List[Dict[str, Any]]:
+        """
+        Users whose `unique_id`, `uid` or `sec_uid` equals `handle` (a leading @ is ignored).
+        """
+        handle = handle[1:] if handle.startswith("@") else handle
+        rows = self._rows(
+            "SELECT *, (SELECT group_concat(keyword, ', ') FROM keyword_users k"
+            " WHERE k.uid = users.uid) AS keywords"
+            " FROM users WHERE unique_id = ? OR uid = ? OR sec_uid = ?",
+            (handle, handle, handle),
+        )
+        for row in rows:
+            for column in ("avatar_thumb", "platform_sync_info", "data"):
+                if row[column] is not None:
+                    row[column] = json.loads(row[column])
+        return rows
+
+    def keyword_counts(self) -> List[Dict[str, Any]]:
+        """
+        Every keyword with its number of users and when it last found one.
+        """
+        return self._rows(
+            "SELECT keyword, COUNT(*) AS users, MAX(last_seen_at) AS last_seen_at"
+            " FROM keyword_users GROUP BY keyword ORDER BY users DESC, keyword",
+            (),
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+class SqliteStreamWriter(StreamingWriter):
+    """
+    Upserts each batch into a UserStore, one transaction per batch.
+
+    The database outlives the run: later runs update the same file, so it
+    answers questions across runs. Upserts are idempotent, so resuming an
+    interrupted run just reopens the database and carries on.
+    """
+
+    format_name = "sqlite"
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None) -> None:
+        super().__init__(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self.store: Optional[UserStore] = None
+
+    def open(
+        self,
+        resume_offset: Optional[int] = None,
+        records_written: int = 0,
+    ) -> "StreamingWriter":
+        self.store = UserStore(self.path, logger=self.logger)
+        if resume_offset is not None:
+            self.records_written = records_written
+        return self
+
+    @property
+    def offset(self) -> int:
+        return 0
+
+    def _write_batch(self, records: Iterable[Dict[str, Any]]) -> int:
+        if self.store is None:
+            raise RuntimeError("write_batch() called before open()")
+        written = self.store.upsert_users(records)
+        self.records_written += written
+        return written
+
+    def link_keyword(self, keyword: str, users: Iterable[Dict[str, Any]]) -> None:
+        if self.store is None:
+            raise RuntimeError("link_keyword() called before open()")
+        self.store.link_keyword(keyword, users)
+
+    def close(self) -> None:
+        if self.store is None:
+            return
+        if self.store.skipped:
+            self.logger.info(
+                "Skipped %d records without a uid or profile when writing %s",
+                self.store.skipped,
+                self.path,
+            )
+        self.store.close()
+        self.store = None
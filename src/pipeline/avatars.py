@@ -0,0 +1,364 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from extractors.egress_pool import build_http_session
+from extractors.metrics import ScrapeMetrics
+
+_CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/heic": ".heic",
+    "image/avif": ".avif",
+}
+_URL_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".heic", ".avif"}
+
+def _extension(content_type: Optional[str], url: str) -> str:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in _CONTENT_TYPE_EXTENSIONS:
+        return _CONTENT_TYPE_EXTENSIONS[media_type]
+    suffix = os.path.splitext(urlparse(url).path)[1].lower()
+    if suffix in _URL_EXTENSIONS:
+        return ".jpg" if suffix == ".jpeg" else suffix
+    return ".bin"
+
+class AvatarStore:
+    """
+    Content-addressed avatar files with an index from avatar `uri` to file.
+
+    Files are named by the SHA-256 of their bytes and fanned out over
+    two-character subdirectories (`ab/abcdef....webp`), so two uris that
+    serve the same image share one file. `index.sqlite3` maps each `uri`
+    to its file; a uri found there (with the file still on disk) is never
+    downloaded again. Files are written to a temporary name and renamed,
+    so a crash never leaves a partial image under its final name.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        # Used by one thread at a time, but not always the one that opened it
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite3"),
+            timeout=60.0,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS avatars ("
+            " uri TEXT PRIMARY KEY,"
+            " path TEXT NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " source_url TEXT,"
+            " fetched_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def lookup(self, uris: List[str]) -> Dict[str, str]:
+        """
+        Absolute paths of the stored avatars among `uris`.
+        """
+        found: Dict[str, str] = {}
+        for start in range(0, len(uris), 500):
+            chunk = uris[start : start + 500]
+            rows = self._conn.execute(
+                "SELECT uri, path FROM avatars WHERE uri IN ({})".format(
+                    ",".join("?" * len(chunk))
+                ),
+                chunk,
+            )
+            for uri, path in rows:
+                full_path = os.path.join(self.directory, path)
+                if os.path.exists(full_path):
+                    found[uri] = full_path
+        return found
+
+    def put(self, uri: str, body: bytes, content_type: Optional[str], source_url: str) -> str:
+        """
+        Store one image for `uri` and return its absolute path.
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        path = os.path.join(digest[:2], digest + _extension(content_type, source_url))
+        full_path = os.path.join(self.directory, path)
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            tmp_path = f"{full_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, full_path)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO avatars (uri, path, sha256, size, source_url, fetched_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (uri, path, digest, len(body), source_url, time.time()),
+        )
+        return full_path
+
+    def close(self) -> None:
+        self._conn.close()
+
+class _Race:
+    """
+    Download state of one avatar: its mirrors and the attempts in flight.
+    """
+
+    def __init__(self, uri: str, urls: List[str]) -> None:
+        self.uri = uri
+        self.urls = urls
+        self.next_url = 0
+        self.in_flight: Set[Future] = set()
+        self.last_started = 0.0
+
+class AvatarDownloader:
+    """
+    Downloads the avatars of each page of users into an AvatarStore.
+
+    `process_page` sets `avatar_local_path` on every user: the stored file,
+    or None when the user has no avatar or every mirror failed. Avatars
+    already in the store, or already seen in this run, are not fetched again.
+
+    The remaining avatars are fetched over a pool of `max_concurrency`
+    threads, which also caps the number of requests in flight. Each avatar
+    starts with the first url in its `url_list`. A failed attempt (network
+    error, non-200 or empty body) moves straight on to the next mirror.
+    An attempt still running after `race_after` seconds is raced against
+    the next mirror, up to `max_racers` at once; the first good response
+    wins and the others are ignored.
+
+    Losing attempts keep running until they finish, and keep counting
+    against `max_concurrency` in later pages.
+
+    Mirrors are tried fastest first: each CDN host keeps a moving average
+    of its response time, with failures counted as a full timeout. Hosts
+    without any history sort first, so new mirrors get tried, and ties
+    keep the `url_list` order.
+
+    `submit_page` runs `process_page` on a stage thread of its own, one
+    page after another, so the caller can keep scraping while a page's
+    avatars download; at most `max_pending_pages` should be left waiting.
+    """
+
+    def __init__(
+        self,
+        store: AvatarStore,
+        user_agent: str,
+        max_concurrency: int = 8,
+        race_after: float = 1.0,
+        max_racers: int = 2,
+        timeout_seconds: float = 10.0,
+        max_bytes: int = 5 * 1024 * 1024,
+        max_pending_pages: int = 4,
+        logger: Optional[logging.Logger] = None,
+        metrics: Optional[ScrapeMetrics] = None,
+    ) -> None:
+        self.store = store
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.race_after = max(0.0, float(race_after))
+        self.max_racers = max(1, int(max_racers))
+        self.timeout_seconds = timeout_seconds
+        self.max_bytes = max_bytes
+        self.max_pending_pages = max(1, int(max_pending_pages))
+        self.logger = logger or logging.getLogger(__name__)
+        self.metrics = metrics
+        self.stats = {
+            "downloaded": 0,
+            "stored": 0,
+            "failed": 0,
+            "failovers": 0,
+            "races": 0,
+        }
+        self._failed_uris: Set[str] = set()
+        self._mirror_latency: Dict[str, float] = {}
+        self._session = build_http_session(
+            user_agent,
+            pool_connections=self.max_concurrency,
+            pool_maxsize=self.max_concurrency,
+        )
+        self._session.headers["Accept"] = "image/webp,image/*;q=0.9,*/*;q=0.8"
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="tiktok-avatar"
+        )
+        # Attempts in flight, including losers of races from earlier pages
+        self._futures: Dict[Future, Tuple[_Race, str, float]] = {}
+        self._stage = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tiktok-avatar-stage")
+
+    @classmethod
+    def from_config(
+        cls,
+        avatars_cfg: Dict[str, Any],
+        directory: str,
+        user_agent: str,
+        logger: Optional[logging.Logger] = None,
+        metrics: Optional[ScrapeMetrics] = None,
+    ) -> "AvatarDownloader":
+        return cls(
+            AvatarStore(directory),
+            user_agent,
+            max_concurrency=avatars_cfg.get("max_concurrency", 8),
+            race_after=avatars_cfg.get("race_after", 1.0),
+            max_racers=avatars_cfg.get("max_racers", 2),
+            timeout_seconds=avatars_cfg.get("timeout", 10.0),
+            max_bytes=int(avatars_cfg.get("max_mb", 5) * 1024 * 1024),
+            max_pending_pages=avatars_cfg.get("max_pending_pages", 4),
+            logger=logger,
+            metrics=metrics,
+        )
+
+    def _fetch(self, url: str) -> Tuple[bytes, Optional[str]]:
+        with self._session.get(url, timeout=self.timeout_seconds, stream=True) as response:
+            if response.status_code != 200:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            body = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                body += chunk
+                if len(body) > self.max_bytes:
+                    raise ValueError(f"avatar larger than {self.max_bytes} bytes")
+            if not body:
+                raise ValueError("empty avatar body")
+            return bytes(body), response.headers.get("Content-Type")
+
+    def _mirror_score(self, url: str) -> float:
+        return self._mirror_latency.get(urlparse(url).netloc, 0.0)
+
+    def _record_mirror(self, url: str, seconds: float, ok: bool) -> None:
+        host = urlparse(url).netloc
+        sample = seconds if ok else self.timeout_seconds
+        previous = self._mirror_latency.get(host)
+        self._mirror_latency[host] = sample if previous is None else 0.8 * previous + 0.2 * sample
+
+    def _start(self, race: _Race) -> None:
+        url = race.urls[race.next_url]
+        race.next_url += 1
+        race.last_started = time.monotonic()
+        future = self._executor.submit(self._fetch, url)
+        self._futures[future] = (race, url, race.last_started)
+        race.in_flight.add(future)
+
+    def _count(self, result: str) -> None:
+        if self.metrics is not None:
+            self.metrics.inc("tiktok_avatar_downloads_total", result=result)
+
+    def _download(self, jobs: Dict[str, List[str]]) -> Dict[str, Optional[str]]:
+        results: Dict[str, Optional[str]] = {}
+        waiting: Deque[_Race] = deque(_Race(uri, urls) for uri, urls in jobs.items())
+        racing: Dict[str, _Race] = {}
+        futures = self._futures
+
+        while waiting or racing:
+            now = time.monotonic()
+            next_due: Optional[float] = None
+            # Racing a slow mirror takes priority over starting another avatar
+            for race in racing.values():
+                if race.next_url >= len(race.urls) or len(race.in_flight) >= self.max_racers:
+                    continue
+                due = race.last_started + self.race_after
+                if due > now:
+                    next_due = due if next_due is None else min(next_due, due)
+                elif len(futures) < self.max_concurrency:
+                    self._start(race)
+                    self.stats["races"] += 1
+            while waiting and len(futures) < self.max_concurrency:
+                race = waiting.popleft()
+                race.urls.sort(key=self._mirror_score)
+                racing[race.uri] = race
+                self._start(race)
+
+            timeout = max(0.0, next_due - time.monotonic()) if next_due is not None else None
+            done, _ = wait(list(futures), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                race, url, started = futures.pop(future)
+                race.in_flight.discard(future)
+                if future.cancelled():
+                    continue
+                error = future.exception()
+                self._record_mirror(url, time.monotonic() - started, error is None)
+                if racing.get(race.uri) is not race:
+                    # Another mirror already won this race, possibly on an earlier page
+                    continue
+                if error is not None:
+                    self.logger.debug("Avatar mirror %s failed: %s", url, error)
+                    if race.in_flight:
+                        continue
+                    if race.next_url < len(race.urls):
+                        self._start(race)
+                        self.stats["failovers"] += 1
+                        continue
+                    del racing[race.uri]
+                    results[race.uri] = None
+                    self.stats["failed"] += 1
+                    self._count("failed")
+                    continue
+                body, content_type = future.result()
+                del racing[race.uri]
+                results[race.uri] = self.store.put(race.uri, body, content_type, url)
+                for other in race.in_flight:
+                    other.cancel()
+                self.stats["downloaded"] += 1
+                self._count("downloaded")
+        return results
+
+    def process_page(self, users: List[Dict[str, Any]]) -> None:
+        """
+        Download the page's missing avatars and set `avatar_local_path` on every user.
+        """
+        jobs: Dict[str, List[str]] = {}
+        for user in users:
+            avatar = user.get("avatar_thumb")
+            if not isinstance(avatar, dict) or not avatar.get("uri"):
+                continue
+            urls = [str(url) for url in avatar.get("url_list") or [] if url]
+            if urls:
+                jobs.setdefault(str(avatar["uri"]), urls)
+
+        paths: Dict[str, Optional[str]] = self.store.lookup(sorted(jobs))
+        self.stats["stored"] += len(paths)
+        if paths and self.metrics is not None:
+            self.metrics.inc("tiktok_avatar_downloads_total", len(paths), result="stored")
+        missing = {
+            uri: urls
+            for uri, urls in jobs.items()
+            if uri not in paths and uri not in self._failed_uris
+        }
+        if missing:
+            paths.update(self._download(missing))
+            self._failed_uris.update(uri for uri in missing if paths.get(uri) is None)
+
+        for user in users:
+            avatar = user.get("avatar_thumb")
+            uri = str(avatar.get("uri")) if isinstance(avatar, dict) and avatar.get("uri") else None
+            user["avatar_local_path"] = paths.get(uri) if uri is not None else None
+
+    def submit_page(self, users: List[Dict[str, Any]]) -> "Future[None]":
+        """
+        Run `process_page` on the stage thread; pages are processed in submission order.
+        """
+        return self._stage.submit(self.process_page, users)
+
+    def log_stats(self) -> None:
+        self.logger.info(
+            "Avatars: %d downloaded, %d already stored, %d failed, %d mirror failovers, "
+            "%d raced mirrors",
+            self.stats["downloaded"],
+            self.stats["stored"],
+            self.stats["failed"],
+            self.stats["failovers"],
+            self.stats["races"],
+        )
+
+    def close(self) -> None:
+        self._stage.shutdown(wait=True, cancel_futures=True)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._session.close()
+        self.store.close()
@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+def atomic_write_json(path: str, data: Any) -> None:
+    """
+    Write JSON to `path` so readers only ever see the old or the new content.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+class CheckpointJournal:
+    """
+    Durable per-keyword pagination state for crash-safe resume.
+
+    A run lives in `<runs_dir>/<run_id>/`:
+    - `run.json` holds run metadata (output file, format, limits). It is
+      written atomically once.
+    - `journal.jsonl` gets one line per exported page with the keyword's
+      next cursor, records emitted so far, whether it is done, and the
+      output file's size and record count after that page. Pages routed
+      to a per-keyword output format also name that format.
+
+    Journal appends are cheap. Each page only writes a line to the page
+    cache, and `fsync` runs at most every `fsync_interval` seconds and when
+    a keyword finishes. On resume the output is truncated back to the last
+    journaled size, so pages written after the last durable entry are
+    fetched again instead of being duplicated.
+
+    Only unfinished keywords are kept in memory; finished ones are counted
+    and can be streamed back from the journal with `iter_done_keywords()`.
+    A run that finishes with nothing left to resume has its directory
+    removed by the caller.
+    """
+
+    JOURNAL_NAME = "journal.jsonl"
+    META_NAME = "run.json"
+
+    def __init__(
+        self,
+        runs_dir: str,
+        run_id: str,
+        fsync_interval: float = 1.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.run_id = run_id
+        self.run_dir = os.path.join(runs_dir, run_id)
+        self.fsync_interval = fsync_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.keywords: Dict[str, Dict[str, Any]] = {}
+        self.keywords_done = 0
+        self.output_offset = 0
+        self.records_written = 0
+        # (offset, records) per extra output format; the run's own output is keyed None
+        self.outputs: Dict[Optional[str], Tuple[int, int]] = {}
+        self._journal = None
+        self._last_sync = 0.0
+        # Size of the journal up to its last complete line, once it has been read
+        self._journal_end: Optional[int] = None
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.run_dir, self.JOURNAL_NAME)
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.run_dir, self.META_NAME)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_path)
+
+    def create(self, metadata: Dict[str, Any]) -> None:
+        os.makedirs(self.run_dir, exist_ok=True)
+        atomic_write_json(self.meta_path, dict(metadata, run_id=self.run_id))
+
+    def _entries(self) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.journal_path):
+            return
+        end = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated line")
+                    entry = json.loads(line)
+                except ValueError:
+                    self.logger.warning("Ignoring torn checkpoint entry in %s", self.journal_path)
+                    break
+                end += len(line)
+                yield entry
+        self._journal_end = end
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        keyword = entry["keyword"]
+        if entry["done"]:
+            self.keywords.pop(keyword, None)
+            self.keywords_done += 1
+        else:
+            self.keywords[keyword] = {"cursor": entry["cursor"], "collected": entry["collected"]}
+        offsets = (entry["output_offset"], entry["records_written"])
+        self.outputs[entry.get("output_format")] = offsets
+        if entry.get("output_format") is None:
+            self.output_offset, self.records_written = offsets
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Read run metadata and replay the journal; returns the metadata.
+
+        A torn final line (crash mid-append) is ignored, and cut off before
+        the next entry is appended.
+        """
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        for entry in self._entries():
+            self._apply(entry)
+        return metadata
+
+    def iter_done_keywords(self) -> Iterator[str]:
+        """
+        Stream the keywords the journal records as finished.
+        """
+        for entry in self._entries():
+            if entry["done"]:
+                yield entry["keyword"]
+
+    def start_state(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Map unfinished keywords to (next cursor, records already emitted).
+        """
+        return {
+            keyword: (state["cursor"], state["collected"])
+            for keyword, state in self.keywords.items()
+            if state["cursor"] is not None
+        }
+
+    def record_page(
+        self,
+        keyword: str,
+        cursor: Optional[int],
+        collected: int,
+        done: bool,
+        output_offset: int,
+        records_written: int,
+        output_files: Sequence[Any] = (),
+        output_format: Optional[str] = None,
+    ) -> None:
+        """
+        Append the state after one page. `output_files` are fsynced before
+        the journal so a durable entry never points past durable output.
+        `output_format` names the output the offsets refer to when it is not
+        the run's own.
+        """
+        if self._journal is None:
+            os.makedirs(self.run_dir, exist_ok=True)
+            if self._journal_end is not None and os.path.exists(self.journal_path):
+                os.truncate(self.journal_path, self._journal_end)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+        entry = {
+            "keyword": keyword,
+            "cursor": cursor,
+            "collected": collected,
+            "done": done,
+            "output_offset": output_offset,
+            "records_written": records_written,
+        }
+        if output_format is not None:
+            entry["output_format"] = output_format
+        self._apply(entry)
+        self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal.flush()
+
+        now = time.monotonic()
+        if done or now - self._last_sync >= self.fsync_interval:
+            for output_file in output_files:
+                os.fsync(output_file.fileno())
+            os.fsync(self._journal.fileno())
+            self._last_sync = now
+
+    def close(self) -> None:
+        if self._journal is not None:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal.close()
+            self._journal = None
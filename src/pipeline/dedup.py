@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import math
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+IDENTITY_FIELDS = ("uid", "sec_uid", "unique_id")
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Sized from the expected number of items and target false-positive rate;
+    memory stays at roughly 1.2 bytes per item for a 1% rate, independent of
+    how long the identifiers are.
+    """
+
+    def __init__(self, expected_items: int, false_positive_rate: float = 0.001) -> None:
+        expected_items = max(1, int(expected_items))
+        false_positive_rate = min(max(false_positive_rate, 1e-9), 0.5)
+        self.num_bits = max(
+            8, int(-expected_items * math.log(false_positive_rate) / (math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, round(self.num_bits / expected_items * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Kirsch-Mitzenmacher double hashing from one 128-bit digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+class DedupIndex:
+    """
+    Drops users already seen under another keyword and merges their keywords.
+
+    A user is a duplicate when any of `uid`, `sec_uid` or `unique_id` matches
+    a user seen earlier in the run.
+
+    - mode="exact": an in-memory identity index. Every unique record gets a
+      `search_keywords` list that later duplicates append to. Records still
+      held in memory see the merge directly. Records streamed to disk are
+      written before later keywords can merge into them, so callers pass
+      `tag=False` and `write_keyword_merges` writes the final keyword lists
+      afterwards.
+    - mode="bloom": a memory-bounded Bloom filter for very large runs. Up
+      to `expected_items` users, it drops about `false_positive_rate` of
+      genuinely new users, and `search_keywords` only holds the first keyword.
+
+    Per-keyword counters of seen/duplicate users are kept in both modes.
+    """
+
+    def __init__(
+        self,
+        mode: str = "exact",
+        expected_items: int = 1_000_000,
+        false_positive_rate: float = 0.001,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        if mode not in {"exact", "bloom"}:
+            raise ValueError(f"Unsupported dedup mode: {mode}")
+        self.mode = mode
+        self.logger = logger or logging.getLogger(__name__)
+        # Every user adds a key per identity field and is dropped if any one of
+        # them hits, so the filter holds that many keys at a share of the rate each
+        self._bloom = (
+            BloomFilter(
+                max(1, int(expected_items)) * len(IDENTITY_FIELDS),
+                false_positive_rate / len(IDENTITY_FIELDS),
+            )
+            if mode == "bloom"
+            else None
+        )
+        # Exact mode: one dict per identity field pointing at a shared keyword list
+        self._index: Dict[str, Dict[str, List[str]]] = {field: {} for field in IDENTITY_FIELDS}
+        self._owners: Dict[int, Tuple[Any, ...]] = {}
+        self._merged: Dict[int, List[str]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _identity(user: Dict[str, Any]) -> List[Tuple[str, str]]:
+        return [(field, str(user[field])) for field in IDENTITY_FIELDS if user.get(field)]
+
+    def _lookup(self, identity: List[Tuple[str, str]]) -> Optional[List[str]]:
+        for field, value in identity:
+            keywords = self._index[field].get(value)
+            if keywords is not None:
+                return keywords
+        return None
+
+    def filter_page(
+        self, keyword: str, users: List[Dict[str, Any]], tag: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Return only the users not seen before, tagging each with `search_keywords` if `tag`.
+        """
+        stats = self._stats.setdefault(keyword, {"seen": 0, "duplicates": 0})
+        unique: List[Dict[str, Any]] = []
+
+        for user in users:
+            stats["seen"] += 1
+            identity = self._identity(user)
+
+            if self._bloom is not None:
+                keys = [f"{field}:{value}" for field, value in identity]
+                duplicate = any(key in self._bloom for key in keys)
+                for key in keys:
+                    self._bloom.add(key)
+                if duplicate:
+                    stats["duplicates"] += 1
+                else:
+                    if tag:
+                        user["search_keywords"] = [keyword]
+                    unique.append(user)
+                continue
+
+            keywords = self._lookup(identity)
+            if keywords is None:
+                keywords = [keyword]
+                if tag:
+                    user["search_keywords"] = keywords
+                self._owners[id(keywords)] = tuple(user.get(field) for field in IDENTITY_FIELDS)
+                unique.append(user)
+            else:
+                stats["duplicates"] += 1
+                if keyword not in keywords:
+                    keywords.append(keyword)
+                    self._merged[id(keywords)] = keywords
+            # Register every identifier so later partial matches resolve too
+            for field, value in identity:
+                self._index[field].setdefault(value, keywords)
+
+        return unique
+
+    def keyword_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Seen/duplicate counts and duplicate rate per keyword.
+        """
+        return {
+            keyword: {
+                "seen": stats["seen"],
+                "duplicates": stats["duplicates"],
+                "duplicate_rate": stats["duplicates"] / stats["seen"] if stats["seen"] else 0.0,
+            }
+            for keyword, stats in self._stats.items()
+        }
+
+    def log_summary(self) -> None:
+        seen = sum(stats["seen"] for stats in self._stats.values())
+        duplicates = sum(stats["duplicates"] for stats in self._stats.values())
+        self.logger.info(
+            "Dedup (%s): %d users seen, %d duplicates dropped (%.1f%%)",
+            self.mode,
+            seen,
+            duplicates,
+            100.0 * duplicates / seen if seen else 0.0,
+        )
+        for keyword, stats in self.keyword_stats().items():
+            self.logger.info(
+                "Dedup keyword '%s': seen=%d duplicates=%d rate=%.1f%%",
+                keyword,
+                stats["seen"],
+                stats["duplicates"],
+                100.0 * stats["duplicate_rate"],
+            )
+
+    @property
+    def merged_count(self) -> int:
+        return len(self._merged)
+
+    def write_keyword_merges(self, path: str) -> int:
+        """
+        Write the final `search_keywords` of every user that gained keywords as JSON Lines.
+
+        Streamed records carry no `search_keywords`, only the `search_keyword`
+        that found them, so this sidecar is where their merged lists live.
+        Returns the number of lines.
+        """
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for slot, keywords in self._merged.items():
+                line: Dict[str, Any] = dict(zip(IDENTITY_FIELDS, self._owners[slot]))
+                line["search_keywords"] = keywords
+                f.write(json.dumps(line, ensure_ascii=False))
+                f.write("\n")
+                count += 1
+        return count
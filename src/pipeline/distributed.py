@@ -0,0 +1,208 @@
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from extractors.tiktok_parser import FAILED_STOP_REASONS, TikTokUserScraper
+from outputs.dataset_exporter import DatasetExporter, JsonLinesStreamWriter, StreamingWriter
+from pipeline.dedup import DedupIndex
+from pipeline.work_queue import KeywordQueue, Lease
+
+def shard_name(keyword: str, worker_id: str) -> str:
+    """
+    File name of a keyword's shard; hashed so any keyword is a safe file name.
+    """
+    digest = hashlib.sha1(keyword.encode("utf-8")).hexdigest()[:16]
+    return f"{digest}.{worker_id}.jsonl"
+
+class KeywordFailed(Exception):
+    """
+    A keyword stopped without finishing, e.g. because its pages could not be fetched.
+    """
+
+def _scrape_to_shard(
+    queue: KeywordQueue,
+    scraper: TikTokUserScraper,
+    lease: Lease,
+    worker_id: str,
+    path: str,
+) -> Optional[int]:
+    """
+    Paginate one leased keyword into a JSONL file, renewing the lease as pages
+    arrive. Returns the number of records, or None if the lease was lost.
+    Raises KeywordFailed when pagination stopped with a failed stop reason.
+    """
+    renew_every = queue.lease_seconds / 3
+    last_renewal = time.monotonic()
+    with JsonLinesStreamWriter(path) as writer:
+        for page in scraper.iter_user_pages(lease.keyword, max_items=lease.max_items):
+            for user in page.users:
+                user.setdefault("search_keyword", page.keyword)
+            writer.write_batch(page.users)
+            if page.stop_reason in FAILED_STOP_REASONS:
+                raise KeywordFailed(f"stopped with {page.stop_reason} at cursor {page.cursor}")
+            if time.monotonic() - last_renewal >= renew_every:
+                if not queue.renew(worker_id, lease.keyword):
+                    return None
+                last_renewal = time.monotonic()
+        return writer.records_written
+
+def run_worker(
+    queue: KeywordQueue,
+    scraper: TikTokUserScraper,
+    shard_dir: str,
+    worker_id: str,
+    poll_interval: float = 2.0,
+    logger: Optional[logging.Logger] = None,
+) -> Dict[str, int]:
+    """
+    Lease keywords from `queue` until none are left and write one shard per keyword.
+
+    A shard is written under a temporary name and renamed into place before
+    the keyword is marked done, so a completed keyword always points at a
+    whole file. While other workers still hold leases, the worker keeps
+    polling so it can pick up keywords whose leases expire.
+    """
+    logger = logger or logging.getLogger(__name__)
+    os.makedirs(shard_dir, exist_ok=True)
+    stats = {"keywords": 0, "records": 0, "lost_leases": 0, "failures": 0}
+
+    while True:
+        lease = queue.lease(worker_id)
+        if lease is None:
+            if not queue.outstanding():
+                break
+            time.sleep(poll_interval)
+            continue
+
+        logger.info(
+            "Worker %s leased keyword '%s' (attempt %d)", worker_id, lease.keyword, lease.attempts
+        )
+        name = shard_name(lease.keyword, worker_id)
+        path = os.path.join(shard_dir, name)
+        tmp_path = path + ".tmp"
+        try:
+            records = _scrape_to_shard(queue, scraper, lease, worker_id, tmp_path)
+        except KeywordFailed as exc:
+            logger.warning("Worker %s failed keyword '%s': %s", worker_id, lease.keyword, exc)
+            queue.fail(worker_id, lease.keyword, str(exc))
+            stats["failures"] += 1
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            continue
+        except Exception as exc:
+            logger.exception("Worker %s failed keyword '%s': %s", worker_id, lease.keyword, exc)
+            queue.fail(worker_id, lease.keyword, repr(exc))
+            stats["failures"] += 1
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            continue
+
+        if records is not None:
+            os.replace(tmp_path, path)
+            if queue.complete(worker_id, lease.keyword, name, records):
+                stats["keywords"] += 1
+                stats["records"] += records
+                continue
+            os.remove(path)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        stats["lost_leases"] += 1
+        logger.warning(
+            "Worker %s lost its lease on '%s'; another worker will finish it",
+            worker_id,
+            lease.keyword,
+        )
+
+    logger.info(
+        "Worker %s finished: %d keywords, %d records, %d lost leases, %d failures",
+        worker_id,
+        stats["keywords"],
+        stats["records"],
+        stats["lost_leases"],
+        stats["failures"],
+    )
+    return stats
+
+def wait_for_queue(
+    queue: KeywordQueue,
+    workers: List[subprocess.Popen],
+    poll_interval: float = 2.0,
+    logger: Optional[logging.Logger] = None,
+) -> Dict[str, int]:
+    """
+    Block until every keyword is done or failed and return the final counts.
+
+    Progress is logged as it changes. With local `workers`, waiting stops
+    early if they have all exited while keywords are still outstanding, since
+    nothing would be left to process them.
+    """
+    logger = logger or logging.getLogger(__name__)
+    last_counts: Dict[str, int] = {}
+    while True:
+        counts = queue.counts()
+        if counts != last_counts:
+            logger.info(
+                "Queue: %d pending, %d leased, %d done, %d failed",
+                counts["pending"],
+                counts["leased"],
+                counts["done"],
+                counts["failed"],
+            )
+            last_counts = counts
+        if not counts["pending"] and not counts["leased"]:
+            return counts
+        if workers and all(process.poll() is not None for process in workers):
+            logger.error("All local workers exited with %d keywords outstanding", counts["pending"])
+            return counts
+        time.sleep(poll_interval)
+
+def _read_shard(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def merge_shards(
+    queue: KeywordQueue,
+    shard_dir: str,
+    exporter: DatasetExporter,
+    output_format: str,
+    output_dir: str,
+    base_filename: str,
+    dedup: Optional[DedupIndex] = None,
+    logger: Optional[logging.Logger] = None,
+) -> Tuple[Optional[str], int]:
+    """
+    Combine the shards of all finished keywords into one dataset.
+
+    Shards are read in enqueue order, one keyword at a time, and optionally
+    passed through `dedup` before being exported; merged keyword lists are
+    left to `DedupIndex.write_keyword_merges`. Returns the output path
+    (None if there were no records) and the number of records written.
+    """
+    logger = logger or logging.getLogger(__name__)
+    writer: Optional[StreamingWriter] = None
+    total = 0
+
+    for entry in queue.completed_shards():
+        path = os.path.join(shard_dir, entry["shard"])
+        try:
+            users = _read_shard(path)
+        except OSError as exc:
+            logger.error("Skipping unreadable shard for '%s': %s", entry["keyword"], exc)
+            continue
+        if dedup is not None:
+            users = dedup.filter_page(entry["keyword"], users, tag=False)
+        if not users:
+            continue
+        if writer is None:
+            writer = exporter.open_stream(output_format, output_dir, base_filename)
+        writer.write_batch(users)
+        total += len(users)
+
+    if writer is None:
+        return None, 0
+    writer.close()
+    return os.path.abspath(writer.path), total
@@ -0,0 +1,381 @@
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from extractors.metrics import ScrapeMetrics
+
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+class JobCancelled(Exception):
+    """
+    Raised inside a running job once it has been cancelled.
+    """
+
+class Job:
+    """
+    One submitted job: its spec, state, progress and event log.
+
+    The runner reports through `emit`, which raises JobCancelled once the
+    job is cancelled, so cancellation takes effect at the next event. Any
+    number of clients can `follow` the log: it replays past events, then
+    blocks for new ones until the job finishes.
+
+    Streamed records (an event's `users`) only go to clients following
+    when they are emitted; the log keeps the event without them, so a
+    long job does not hold every record it exported in memory.
+    """
+
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.spec = spec
+        self.state = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.progress: Dict[str, Any] = {}
+        self.result: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self._followers: List[Deque[Dict[str, Any]]] = []
+        self._cond = threading.Condition()
+        self._cancelled = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _append(self, event: Dict[str, Any]) -> None:
+        with self._cond:
+            event = {"job": self.id, "time": round(time.time(), 3), **event}
+            if "users" in event:
+                self.events.append({key: value for key, value in event.items() if key != "users"})
+            else:
+                self.events.append(event)
+            for pending in self._followers:
+                pending.append(event)
+            self._cond.notify_all()
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        if self._cancelled.is_set():
+            raise JobCancelled(self.id)
+        self._append(event)
+
+    def set_state(self, state: str, **fields: Any) -> None:
+        with self._cond:
+            self.state = state
+            now = time.time()
+            if state == "running":
+                self.started_at = now
+            elif state in FINISHED_STATES:
+                self.finished_at = now
+            self._append({"event": state, **fields})
+
+    def cancel(self) -> bool:
+        """
+        Ask the job to stop; returns False if it already finished.
+        """
+        if self.finished:
+            return False
+        self._cancelled.set()
+        return True
+
+    def follow(self) -> Iterator[Dict[str, Any]]:
+        """
+        Past events, then every new one until the job finishes.
+
+        The follower is registered by this call, not by the first `next()`,
+        so no event emitted after it returns is missed.
+        """
+        pending: Deque[Dict[str, Any]] = deque()
+        with self._cond:
+            replay = list(self.events)
+            if not self.finished:
+                self._followers.append(pending)
+        return self._follow(replay, pending)
+
+    def _follow(
+        self, replay: List[Dict[str, Any]], pending: Deque[Dict[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        try:
+            yield from replay
+            while True:
+                with self._cond:
+                    while not pending and not self.finished:
+                        self._cond.wait(timeout=1.0)
+                    batch = list(pending)
+                    pending.clear()
+                    finished = self.finished
+                yield from batch
+                if finished:
+                    return
+        finally:
+            with self._cond:
+                if pending in self._followers:
+                    self._followers.remove(pending)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "keywords": len(self.spec.get("keywords") or []),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+        }
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class JobServer:
+    """
+    Runs scrape jobs submitted over a local HTTP API, several at a time.
+
+    The server owns no scraping logic: `validate` turns a submitted spec
+    into a normalised one (raising ValueError for a 400), and `run_job`
+    executes a Job, reporting through `job.emit` and returning the result.
+    Jobs run on a pool of `max_concurrent_jobs` threads; further jobs wait
+    in FIFO order. Only the last `keep_finished_jobs` finished jobs are kept.
+
+    Endpoints (JSON bodies, NDJSON for streams):
+
+    - `POST /jobs`: submit a job, answers 202 with its description.
+      With `?stream=1` the response is instead the job's event stream.
+    - `GET /jobs`, `GET /jobs/<id>`: describe all jobs or one.
+    - `GET /jobs/<id>/events`: replay and follow one job's events (streamed
+      records only from the moment of the request).
+    - `DELETE /jobs/<id>`: cancel a queued or running job.
+    - `GET /health`, plus `GET /metrics` when `metrics` is given.
+
+    It listens on TCP (`host`/`port`) or on a Unix socket (`socket_path`).
+    """
+
+    def __init__(
+        self,
+        run_job: Callable[[Job], Dict[str, Any]],
+        validate: Callable[[Dict[str, Any]], Dict[str, Any]],
+        max_concurrent_jobs: int = 4,
+        keep_finished_jobs: int = 100,
+        metrics: Optional[ScrapeMetrics] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.run_job = run_job
+        self.validate = validate
+        self.max_concurrent_jobs = max(1, int(max_concurrent_jobs))
+        self.keep_finished_jobs = max(0, int(keep_finished_jobs))
+        self.metrics = metrics
+        self.logger = logger or logging.getLogger(__name__)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_jobs, thread_name_prefix="tiktok-job"
+        )
+        self._server: Any = None
+
+    def create(self, spec: Dict[str, Any]) -> Job:
+        """
+        Validate and register a job without starting it, so it can be followed from the start.
+        """
+        job = Job(self.validate(spec))
+        with self._lock:
+            self._jobs[job.id] = job
+        job.set_state("queued")
+        return job
+
+    def start(self, job: Job) -> None:
+        self._executor.submit(self._run, job)
+        self.logger.info("Queued job %s (%d keywords)", job.id, len(job.spec["keywords"]))
+
+    def submit(self, spec: Dict[str, Any]) -> Job:
+        job = self.create(spec)
+        self.start(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _run(self, job: Job) -> None:
+        if job.cancelled:
+            job.set_state("cancelled")
+            return
+        job.set_state("running")
+        try:
+            job.result = self.run_job(job)
+        except JobCancelled:
+            self.logger.info("Job %s cancelled", job.id)
+            job.set_state("cancelled")
+        except Exception as exc:
+            self.logger.exception("Job %s failed: %s", job.id, exc)
+            job.error = str(exc)
+            job.set_state("failed", error=job.error)
+        else:
+            self.logger.info("Job %s done: %s", job.id, job.result)
+            job.set_state("done", **job.result)
+        finally:
+            self._prune()
+
+    def _prune(self) -> None:
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+            for job_id in finished[: max(len(finished) - self.keep_finished_jobs, 0)]:
+                del self._jobs[job_id]
+
+    def _make_handler(self) -> Any:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send_json(self, status: int, payload: Any) -> None:
+                body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, events: Iterator[Dict[str, Any]]) -> None:
+                # HTTP/1.0 without Content-Length: the stream ends when the job does
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                try:
+                    for event in events:
+                        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+                        self.wfile.write(line.encode("utf-8"))
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _route(self) -> List[str]:
+                return [part for part in urlparse(self.path).path.split("/") if part]
+
+            def do_GET(self) -> None:
+                parts = self._route()
+                if parts == ["health"]:
+                    counts: Dict[str, int] = {}
+                    for job in server.jobs():
+                        counts[job.state] = counts.get(job.state, 0) + 1
+                    self._send_json(200, {"status": "ok", "jobs": counts})
+                elif parts == ["metrics"] and server.metrics is not None:
+                    body = server.metrics.render_prometheus().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif parts == ["jobs"]:
+                    self._send_json(200, [job.describe() for job in server.jobs()])
+                elif len(parts) in (2, 3) and parts[0] == "jobs":
+                    job = server.get(parts[1])
+                    if job is None:
+                        self._send_json(404, {"error": f"unknown job {parts[1]}"})
+                    elif len(parts) == 2:
+                        self._send_json(200, job.describe())
+                    elif parts[2] == "events":
+                        self._stream(job.follow())
+                    else:
+                        self._send_json(404, {"error": "not found"})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self) -> None:
+                if self._route() != ["jobs"]:
+                    self._send_json(404, {"error": "not found"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    spec = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(spec, dict):
+                        raise ValueError("job spec must be a JSON object")
+                    job = server.create(spec)
+                except ValueError as exc:
+                    self._send_json(400, {"error": str(exc)})
+                    return
+                query = parse_qs(urlparse(self.path).query)
+                if query.get("stream", ["0"])[0] not in ("", "0", "false"):
+                    # Follow before starting, so the submitter receives every streamed record
+                    events = job.follow()
+                    server.start(job)
+                    self._stream(events)
+                else:
+                    server.start(job)
+                    self._send_json(202, job.describe())
+
+            def do_DELETE(self) -> None:
+                parts = self._route()
+                job = server.get(parts[1]) if len(parts) == 2 and parts[0] == "jobs" else None
+                if job is None:
+                    self._send_json(404, {"error": "not found"})
+                elif job.cancel():
+                    self._send_json(202, job.describe())
+                else:
+                    self._send_json(409, {"error": f"job {job.id} already {job.state}"})
+
+        return Handler
+
+    def listen(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        socket_path: Optional[str] = None,
+    ) -> str:
+        """
+        Bind the API and return its address; `serve_forever` then handles requests.
+        """
+        handler = self._make_handler()
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+            self._server = _UnixHTTPServer(socket_path, handler)
+            os.chmod(socket_path, 0o600)
+            return f"unix:{socket_path}"
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        bound_host, bound_port = self._server.server_address[:2]
+        return f"http://{bound_host}:{bound_port}"
+
+    def serve_forever(self) -> None:
+        if self._server is None:
+            raise RuntimeError("serve_forever() called before listen()")
+        self._server.serve_forever()
+
+    def shutdown(self, cancel_running: bool = True) -> None:
+        """
+        Stop accepting requests, cancel queued (and optionally running) jobs and wait for them.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            if isinstance(self._server, _UnixHTTPServer):
+                try:
+                    os.unlink(self._server.server_address)
+                except OSError:
+                    pass
+            self._server = None
+        for job in self.jobs():
+            if job.state == "queued" or (cancel_running and job.state == "running"):
+                job.cancel()
+        self._executor.shutdown(wait=True)
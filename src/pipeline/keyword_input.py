@@ -0,0 +1,233 @@
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import sys
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+INPUT_FORMATS = ("json", "jsonl", "csv")
+
+_EXTENSION_FORMATS = {
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".txt": "jsonl",
+    ".csv": "csv",
+    ".tsv": "csv",
+}
+
+# Accepted spellings of the per-keyword fields (input JSON uses camelCase)
+_FIELD_ALIASES = {
+    "keyword": ("keyword", "term", "query"),
+    "max_items": ("maxItems", "max_items"),
+    "priority": ("priority",),
+    "output_format": ("outputFormat", "output_format", "format"),
+}
+
+class KeywordSpec(NamedTuple):
+    """
+    One input keyword with its optional per-keyword overrides.
+
+    `max_items` and `output_format` fall back to the run's values when None.
+    Keywords with a higher `priority` are scraped first; ties keep input order.
+    """
+
+    keyword: str
+    max_items: Optional[int] = None
+    priority: int = 0
+    output_format: Optional[str] = None
+
+def _field(entry: Dict[str, Any], name: str) -> Any:
+    for alias in _FIELD_ALIASES[name]:
+        value = entry.get(alias)
+        if value not in (None, ""):
+            return value
+    return None
+
+def parse_keyword_entry(
+    entry: Any, output_formats: Optional[Collection[str]] = None
+) -> KeywordSpec:
+    """
+    Turn a keyword string or object into a KeywordSpec; raises ValueError if invalid.
+
+    With `output_formats`, a per-keyword format must be one of them.
+    """
+    if not isinstance(entry, dict):
+        entry = {"keyword": entry}
+    keyword = str(_field(entry, "keyword") or "").strip()
+    if not keyword:
+        raise ValueError("empty keyword")
+
+    max_items = _field(entry, "max_items")
+    if max_items is not None:
+        try:
+            max_items = int(max_items)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid maxItems {max_items!r}") from None
+        if max_items < 1:
+            raise ValueError(f"maxItems must be positive, got {max_items}")
+
+    priority = _field(entry, "priority")
+    try:
+        priority = int(priority) if priority is not None else 0
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid priority {priority!r}") from None
+
+    output_format = _field(entry, "output_format")
+    if output_format is not None:
+        output_format = str(output_format).lower()
+        if output_formats is not None and output_format not in output_formats:
+            raise ValueError(f"unsupported outputFormat {output_format!r}")
+    return KeywordSpec(keyword, max_items, priority, output_format)
+
+def detect_input_format(path: str) -> str:
+    """
+    Input format from the file extension; stdin ("-") and unknown extensions read as JSON Lines.
+    """
+    return _EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower(), "jsonl")
+
+class KeywordInput:
+    """
+    Reads input keywords lazily from a JSON, JSON Lines or CSV file, or stdin ("-").
+
+    - `json`: the classic input object. It is small by nature and loaded
+      whole; `keywords` entries may be strings or objects, and `maxItems`
+      and `outputFormat` become run-level options.
+    - `jsonl`: one keyword per line, either a JSON object
+      (`{"keyword": ..., "maxItems": ..., "priority": ..., "outputFormat": ...}`),
+      a JSON string, or plain text. Blank lines and `#` comments are skipped.
+    - `csv`: a header row naming `keyword` and any of `maxItems`,
+      `priority` and `outputFormat`. Without such a header, every row's
+      first column is a keyword.
+
+    Only one line is held at a time for `jsonl` and `csv`, so inputs of
+    any size are read in constant memory. Invalid entries, including
+    formats not in `output_formats`, are logged with their line number and
+    skipped; `skipped` counts them.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        input_format: Optional[str] = None,
+        output_formats: Optional[Collection[str]] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.path = path
+        self.input_format = input_format or detect_input_format(path)
+        if self.input_format not in INPUT_FORMATS:
+            raise ValueError(f"Unsupported input format: {self.input_format}")
+        self.output_formats = output_formats
+        self.logger = logger or logging.getLogger(__name__)
+        self.skipped = 0
+        self._payload: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_stdin(self) -> bool:
+        return self.path == "-"
+
+    def _open(self) -> Tuple[TextIO, bool]:
+        if self.is_stdin:
+            return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig"), False
+        return open(self.path, "r", encoding="utf-8-sig", newline=""), True
+
+    @staticmethod
+    def _release(handle: TextIO, owned: bool) -> None:
+        if owned:
+            handle.close()
+        else:
+            # Leave stdin itself open once the wrapper goes away
+            handle.detach()  # type: ignore[attr-defined]
+
+    def _load_payload(self) -> Dict[str, Any]:
+        if self._payload is None:
+            handle, owned = self._open()
+            try:
+                payload = json.load(handle)
+            finally:
+                self._release(handle, owned)
+            if not isinstance(payload, dict):
+                raise ValueError("JSON input must be an object with a 'keywords' array")
+            self._payload = payload
+        return self._payload
+
+    def options(self) -> Dict[str, Any]:
+        """
+        Run-level options carried by the input (`maxItems`, `outputFormat`); JSON input only.
+        """
+        if self.input_format != "json":
+            return {}
+        payload = self._load_payload()
+        return {key: payload[key] for key in ("maxItems", "outputFormat") if key in payload}
+
+    def _skip(self, line: int, error: Exception) -> None:
+        self.skipped += 1
+        self.logger.warning("Skipping input entry at %s:%d: %s", self.path, line, error)
+
+    def _iter_json(self) -> Iterator[KeywordSpec]:
+        keywords = self._load_payload().get("keywords")
+        if not isinstance(keywords, list):
+            raise ValueError("JSON input must contain a 'keywords' array")
+        for index, entry in enumerate(keywords, start=1):
+            try:
+                yield parse_keyword_entry(entry, self.output_formats)
+            except ValueError as exc:
+                self._skip(index, exc)
+
+    def _iter_lines(self, handle: TextIO) -> Iterator[KeywordSpec]:
+        for number, line in enumerate(handle, start=1):
+            text = line.strip()
+            if not text or text.startswith("#"):
+                continue
+            try:
+                entry: Any = json.loads(text) if text[0] in "{\"" else text
+                yield parse_keyword_entry(entry, self.output_formats)
+            except ValueError as exc:
+                self._skip(number, exc)
+
+    def _iter_csv(self, handle: TextIO) -> Iterator[KeywordSpec]:
+        dialect = "excel-tab" if self.path.lower().endswith(".tsv") else "excel"
+        reader = csv.reader(handle, dialect=dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        names: List[str] = [name.strip() for name in header]
+        rows: Iterable[List[str]] = reader
+        if not any(name in _FIELD_ALIASES["keyword"] for name in names):
+            # No header row: the first row is data and column one the keyword
+            names = []
+            rows = itertools.chain([header], reader)
+        for row in rows:
+            if not any(cell.strip() for cell in row):
+                continue
+            entry: Any = dict(zip(names, row)) if names else row[0]
+            try:
+                yield parse_keyword_entry(entry, self.output_formats)
+            except ValueError as exc:
+                self._skip(reader.line_num, exc)
+
+    def __iter__(self) -> Iterator[KeywordSpec]:
+        if self.input_format == "json":
+            yield from self._iter_json()
+            return
+        handle, owned = self._open()
+        try:
+            if self.input_format == "csv":
+                yield from self._iter_csv(handle)
+            else:
+                yield from self._iter_lines(handle)
+        finally:
+            self._release(handle, owned)
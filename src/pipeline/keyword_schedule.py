@@ -0,0 +1,174 @@
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from pipeline.keyword_input import KeywordSpec
+
+class KeywordSchedule:
+    """
+    Input keywords spooled to SQLite and handed out in priority order.
+
+    `load()` streams specs into the spool in batches, so the keyword list
+    lives on disk whatever its size. `pending()` then yields unfinished
+    keywords by descending priority, ties in input order, reading
+    `batch_size` rows at a time with keyset seeks on the `(done, rank, seq)`
+    index. A keyword listed twice keeps its first entry.
+
+    Kept in a run directory, the spool survives restarts: `complete` tells
+    whether the input was fully loaded, and after `mark_done()` with the
+    keywords a run already finished, `pending()` yields only the rest.
+    All methods may be called from any thread.
+    """
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None) -> None:
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.duplicates = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=60.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # `rank` is the negated priority, so one ascending index serves the scan order
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS keywords ("
+            " seq INTEGER PRIMARY KEY,"
+            " keyword TEXT NOT NULL UNIQUE,"
+            " max_items INTEGER,"
+            " rank INTEGER NOT NULL,"
+            " output_format TEXT,"
+            " done INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS keywords_order ON keywords (done, rank, seq)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    @property
+    def complete(self) -> bool:
+        """
+        True once `load()` has read its whole input into the spool.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'complete'").fetchone()
+        return row is not None and row[0] == "1"
+
+    def _insert(self, batch: List[KeywordSpec]) -> int:
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO keywords (keyword, max_items, rank, output_format)"
+                    " VALUES (?, ?, ?, ?)",
+                    [
+                        (spec.keyword, spec.max_items, -spec.priority, spec.output_format)
+                        for spec in batch
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    def load(self, specs: Iterable[KeywordSpec], batch_size: int = 10000) -> int:
+        """
+        Spool `specs` and mark the spool complete; returns how many keywords were new.
+
+        Safe to repeat after an interrupted load: keywords already spooled are kept.
+        """
+        added = 0
+        seen = 0
+        batch: List[KeywordSpec] = []
+        for spec in specs:
+            batch.append(spec)
+            if len(batch) >= batch_size:
+                added += self._insert(batch)
+                seen += len(batch)
+                batch = []
+        if batch:
+            added += self._insert(batch)
+            seen += len(batch)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('complete', '1')")
+        self.duplicates = seen - added
+        if self.duplicates:
+            self.logger.info("Ignored %d repeated keyword(s) in the input", self.duplicates)
+        return added
+
+    def pending(self, batch_size: int = 1000) -> Iterator[KeywordSpec]:
+        """
+        Yield keywords not marked done, highest priority first.
+        """
+        columns = "SELECT keyword, max_items, rank, output_format, seq FROM keywords"
+        rank, seq = -(2**63), -1
+        while True:
+            # Rest of the current priority, then the next ones: two index seeks per batch
+            with self._lock:
+                rows = self._conn.execute(
+                    columns + " WHERE done = 0 AND rank = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (rank, seq, batch_size),
+                ).fetchall()
+                if len(rows) < batch_size:
+                    rows += self._conn.execute(
+                        columns + " WHERE done = 0 AND rank > ? ORDER BY rank, seq LIMIT ?",
+                        (rank, batch_size - len(rows)),
+                    ).fetchall()
+            for keyword, max_items, rank, output_format, seq in rows:
+                yield KeywordSpec(keyword, max_items, -rank, output_format)
+            if len(rows) < batch_size:
+                return
+
+    def mark_done(self, keywords: Iterable[str], batch_size: int = 10000) -> None:
+        batch: List[str] = []
+        for keyword in keywords:
+            batch.append(keyword)
+            if len(batch) >= batch_size:
+                self._mark(batch)
+                batch = []
+        if batch:
+            self._mark(batch)
+
+    def _mark(self, keywords: List[str]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE keywords SET done = 1 WHERE keyword = ?",
+                    [(keyword,) for keyword in keywords],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def formats(self) -> List[str]:
+        """
+        Per-keyword output formats requested by unfinished keywords.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT output_format FROM keywords"
+                " WHERE done = 0 AND output_format IS NOT NULL ORDER BY output_format"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        counts = {"pending": 0, "done": 0}
+        with self._lock:
+            for done, count in self._conn.execute(
+                "SELECT done, COUNT(*) FROM keywords GROUP BY done"
+            ):
+                counts["done" if done else "pending"] = count
+        counts["total"] = counts["pending"] + counts["done"]
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
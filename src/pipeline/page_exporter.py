@@ -0,0 +1,252 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from extractors.tiktok_parser import FAILED_STOP_REASONS, SearchPage
+from outputs.dataset_exporter import DatasetExporter, StreamingWriter
+from outputs.sqlite_store import SqliteStreamWriter
+from pipeline.avatars import AvatarDownloader
+from pipeline.checkpoint import CheckpointJournal
+from pipeline.dedup import DedupIndex
+from pipeline.snapshot import UserSnapshot
+from pipeline.top_k import TopKSelector
+from pipeline.yield_budget import YieldBudget
+
+class PageExporter:
+    """
+    Writes search pages to their output as they arrive.
+
+    Each page is tagged with its keyword, linked in the SQLite store (every
+    user, duplicates included), deduplicated, classified against the
+    snapshot, then either offered to top-K selection or written right away.
+    The page is journaled afterwards; keywords that stopped because
+    fetching failed are journaled as unfinished and counted in
+    `failed_keywords`. The number of users left after deduplication is the
+    page's yield for the request budget.
+
+    With avatars, a page's records wait for their downloads on the
+    downloader's stage thread while the caller moves on; pages are still
+    written and journaled in order, by later `write_page` calls or by
+    `finish()`. Only when `max_pending_pages` pages are waiting does
+    `write_page` block on the oldest.
+    `finish()` writes the top-K winners and the snapshot's `not_seen`
+    markers.
+
+    Pages go to the `output_format` output unless `write_page` routes them
+    to another format (per-keyword overrides); each format gets its own
+    file next to the main one, and `finish()` always writes to the main
+    output. All stages are optional. A writer is opened with its first
+    record, or by `resume()`, and `close()` must always be called.
+    """
+
+    def __init__(
+        self,
+        exporter: DatasetExporter,
+        output_format: str,
+        output_dir: str,
+        base_filename: str,
+        dedup: Optional[DedupIndex] = None,
+        snapshot: Optional[UserSnapshot] = None,
+        top_k: Optional[TopKSelector] = None,
+        avatars: Optional[AvatarDownloader] = None,
+        journal: Optional[CheckpointJournal] = None,
+        budget: Optional[YieldBudget] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.exporter = exporter
+        self.output_format = output_format
+        self.output_dir = output_dir
+        self.base_filename = base_filename
+        self.dedup = dedup
+        self.snapshot = snapshot
+        self.top_k = top_k
+        self.avatars = avatars
+        self.journal = journal
+        self.budget = budget
+        self.logger = logger or logging.getLogger(__name__)
+        self.output_format = output_format.lower()
+        self.writers: Dict[str, StreamingWriter] = {}
+        self.total = 0
+        self.failed_keywords = 0
+        # Pages waiting for their avatars, oldest first
+        self._pending: Deque[Tuple[Optional["Future[None]"], SearchPage, str, List[Any]]] = deque()
+
+    @property
+    def writer(self) -> Optional[StreamingWriter]:
+        return self.writers.get(self.output_format)
+
+    @property
+    def to_store(self) -> bool:
+        return self.output_format == "sqlite"
+
+    def _open(self, output_format: str) -> StreamingWriter:
+        writer = self.writers.get(output_format)
+        if writer is None:
+            writer = self.exporter.open_stream(
+                output_format, self.output_dir, self._filename(output_format)
+            )
+            self.writers[output_format] = writer
+        return writer
+
+    def _filename(self, output_format: str) -> str:
+        # Extra outputs carry their format in the name, next to the main file
+        if output_format == self.output_format:
+            return self.base_filename
+        return f"{self.base_filename}_{output_format}"
+
+    def _write(self, output_format: str, records: List[Any]) -> None:
+        self._open(output_format).write_batch(records)
+        self.total += len(records)
+
+    def resume(self, offsets: Dict[Optional[str], Tuple[int, int]]) -> None:
+        """
+        Reopen the outputs of an interrupted run at their last journaled state.
+
+        `offsets` maps each output format (None for the main one) to its
+        (offset, records written).
+        """
+        for output_format, (resume_offset, records_written) in offsets.items():
+            output_format = output_format or self.output_format
+            self.writers[output_format] = self.exporter.open_stream(
+                output_format,
+                self.output_dir,
+                self._filename(output_format),
+                resume_offset=resume_offset,
+                records_written=records_written,
+            )
+            self.total += records_written
+
+    def write_page(self, page: SearchPage, output_format: Optional[str] = None) -> List[Any]:
+        """
+        Run one page through every stage and return the records written for it.
+
+        `output_format` sends the page's records to that format's output
+        instead of the main one; top-K runs ignore it. With avatars the
+        records may only be written by a later call.
+        """
+        if output_format is None or self.top_k is not None:
+            output_format = self.output_format
+        output_format = output_format.lower()
+        # Tag each user with the keyword used to discover them
+        for user in page.users:
+            user.setdefault("search_keyword", page.keyword)
+
+        # The store links every user found to the keyword, duplicates included
+        if output_format == "sqlite" and page.users:
+            writer = self._open(output_format)
+            if isinstance(writer, SqliteStreamWriter):
+                writer.link_keyword(page.keyword, page.users)
+
+        users = page.users
+        if self.dedup is not None:
+            # Only top-K records are still in memory when later keywords merge into them
+            users = self.dedup.filter_page(page.keyword, users, tag=self.top_k is not None)
+        if self.budget is not None:
+            self.budget.record_page(
+                page.keyword,
+                len(users),
+                page.requests,
+                page.stop_reason,
+                finished=page.next_cursor is None,
+            )
+        if self.snapshot is not None:
+            users = self.snapshot.classify_page(page.keyword, users)
+            if page.next_cursor is None:
+                self.snapshot.finish_keyword(page.keyword, page.stop_reason, page.collected)
+        if self.top_k is not None:
+            self.top_k.offer(users)
+            users = []
+        if self.avatars is not None:
+            # Pages without users queue up too, so the journal stays in page order
+            download = self.avatars.submit_page(users) if users else None
+            self._pending.append((download, page, output_format, users))
+            self._flush(self.avatars.max_pending_pages)
+        else:
+            self._finish_page(page, output_format, users)
+        return users
+
+    def _flush(self, max_pending: int = 0) -> None:
+        # Finish pages whose avatars are in, and wait for the oldest while too many are left
+        while self._pending:
+            download, page, output_format, users = self._pending[0]
+            if len(self._pending) <= max_pending and download is not None and not download.done():
+                return
+            if download is not None:
+                download.result()
+            self._pending.popleft()
+            self._finish_page(page, output_format, users)
+
+    def _finish_page(self, page: SearchPage, output_format: str, users: List[Any]) -> None:
+        if users:
+            self._write(output_format, users)
+
+        failed = page.stop_reason in FAILED_STOP_REASONS
+        if failed:
+            self.failed_keywords += 1
+        # A failed keyword stays unfinished, so a resumed run retries it from the failed page
+        if self.journal is not None and not (failed and page.cursor is None):
+            writer = self.writers.get(output_format)
+            self.journal.record_page(
+                page.keyword,
+                page.cursor if failed else page.next_cursor,
+                page.collected,
+                page.next_cursor is None and not failed,
+                writer.offset if writer is not None else 0,
+                writer.records_written if writer is not None else 0,
+                output_files=[w.file for w in self.writers.values() if w.file is not None],
+                output_format=output_format if output_format != self.output_format else None,
+            )
+
+        if page.next_cursor is None:
+            self.logger.info("Collected %d users for keyword '%s'", page.collected, page.keyword)
+
+    def finish(self, emit_not_seen: bool = True) -> List[Any]:
+        """
+        Write what can only be known once every page is in, and return those records.
+        """
+        self._flush()
+        written: List[Any] = []
+        # Only the winners are written, so only their avatars are downloaded
+        if self.top_k is not None and len(self.top_k):
+            self.top_k.log_summary()
+            winners = self.top_k.results()
+            if self.avatars is not None:
+                self.avatars.process_page(winners)
+            self._write(self.output_format, winners)
+            written.extend(winners)
+
+        if self.snapshot is not None and emit_not_seen:
+            markers = self.snapshot.not_seen_markers()
+            if markers:
+                self._write(self.output_format, markers)
+                written.extend(markers)
+        return written
+
+    @property
+    def output_paths(self) -> List[str]:
+        """
+        Absolute paths of the outputs that received records, the main one first.
+        """
+        return [
+            os.path.abspath(writer.path)
+            for output_format, writer in sorted(
+                self.writers.items(), key=lambda item: item[0] != self.output_format
+            )
+            if writer.records_written
+        ]
+
+    @property
+    def output_path(self) -> Optional[str]:
+        """
+        Absolute path of the main output, or None while nothing has been written.
+        """
+        writer = self.writer
+        if writer is None or not writer.records_written:
+            return None
+        return os.path.abspath(writer.path)
+
+    def close(self) -> None:
+        for writer in self.writers.values():
+            writer.close()
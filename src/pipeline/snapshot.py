@@ -0,0 +1,256 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+TRACKED_FIELDS = ("follower_count", "nickname", "signature", "custom_verify")
+
+# Stop reasons after which a keyword's result list was read to its natural end
+COMPLETE_STOP_REASONS = frozenset({"has_more", "no_cursor", "no_users"})
+
+def _encode(values: Sequence[Any]) -> str:
+    return json.dumps(list(values), separators=(",", ":"), ensure_ascii=False, default=str)
+
+def _digest(encoded: str) -> int:
+    digest = hashlib.blake2b(encoded.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+class UserSnapshot:
+    """
+    Last known state of every user, for incremental re-crawls.
+
+    One SQLite database (WAL mode) holds a row per user keyed by `uid`
+    (`sec_uid` when there is no uid). Each row holds a 64-bit digest of the
+    tracked fields, the field values themselves (needed for diffs), the
+    keyword the user was last found under and the run that last saw them.
+
+    `classify_page` compares a page against the snapshot and returns only
+    the users that are new (`change_type="insert"`) or whose tracked fields
+    changed (`change_type="update"`, with `changes` mapping each field to
+    its old and new value). Unchanged users only cost a digest comparison.
+
+    After `stop_after_unchanged_pages` consecutive pages without a single
+    insert or update, `should_stop(keyword)` turns True; pass it to the
+    scraper as `stop_early` to skip the rest of that keyword.
+
+    `not_seen_markers` reports users that were not found again under a
+    keyword whose results were read to the end this run. Keywords that
+    stopped early (including at `max_items`), failed or returned nothing
+    are skipped, since their missing users may simply not have been fetched.
+
+    The whole run is one transaction: nothing is stored until `commit()`,
+    so a run that fails before its export finishes is replayed in full
+    next time instead of losing changes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        stop_after_unchanged_pages: int = 2,
+        tracked_fields: Sequence[str] = TRACKED_FIELDS,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.path = path
+        self.stop_after_unchanged_pages = max(0, int(stop_after_unchanged_pages))
+        self.tracked_fields = tuple(tracked_fields)
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats = {"inserts": 0, "updates": 0, "unchanged": 0, "not_seen": 0}
+        self.stopped_keywords: Set[str] = set()
+        self._unchanged_pages: Dict[str, int] = {}
+        self._complete_keywords: List[str] = []
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " key TEXT PRIMARY KEY,"
+            " digest INTEGER NOT NULL,"
+            " fields TEXT NOT NULL,"
+            " uid TEXT,"
+            " sec_uid TEXT,"
+            " unique_id TEXT,"
+            " keyword TEXT,"
+            " last_seen_run INTEGER NOT NULL,"
+            " missing INTEGER NOT NULL DEFAULT 0"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS users_keyword ON users (keyword, last_seen_run)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        # Held until commit(), which also keeps a second run from interleaving
+        self._conn.execute("BEGIN IMMEDIATE")
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'run'").fetchone()
+        self.run = (int(row[0]) if row else 0) + 1
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('run', ?)", (str(self.run),)
+        )
+
+    @staticmethod
+    def _key(user: Dict[str, Any]) -> Optional[str]:
+        if user.get("uid"):
+            return str(user["uid"])
+        if user.get("sec_uid"):
+            return "sec_uid:" + str(user["sec_uid"])
+        return None
+
+    def _lookup(self, keys: List[str]) -> Dict[str, Tuple[int, str, int]]:
+        found: Dict[str, Tuple[int, str, int]] = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            rows = self._conn.execute(
+                "SELECT key, digest, fields, missing FROM users WHERE key IN ({})".format(
+                    ",".join("?" * len(chunk))
+                ),
+                chunk,
+            )
+            for key, digest, fields, missing in rows:
+                found[key] = (digest, fields, missing)
+        return found
+
+    def classify_page(self, keyword: str, users: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Record a page of users and return the inserted or updated ones, tagged in place.
+        """
+        keyed = [(self._key(user), user) for user in users]
+        known = self._lookup(sorted({key for key, _ in keyed if key is not None}))
+        changed: List[Dict[str, Any]] = []
+        rows: List[Tuple[Any, ...]] = []
+
+        for key, user in keyed:
+            values = [user.get(field) for field in self.tracked_fields]
+            fields = _encode(values)
+            digest = _digest(fields)
+            previous = known.get(key) if key is not None else None
+            if previous is None or previous[2]:
+                user["change_type"] = "insert"
+                user["changes"] = None
+                self.stats["inserts"] += 1
+                changed.append(user)
+            elif previous[0] != digest:
+                old_values = json.loads(previous[1])
+                user["change_type"] = "update"
+                user["changes"] = {
+                    field: {"old": old, "new": new}
+                    for field, old, new in zip(self.tracked_fields, old_values, values)
+                    if _encode([old]) != _encode([new])
+                }
+                self.stats["updates"] += 1
+                changed.append(user)
+            else:
+                self.stats["unchanged"] += 1
+
+            if key is not None:
+                known[key] = (digest, fields, 0)
+                rows.append(
+                    (
+                        key,
+                        digest,
+                        fields,
+                        user.get("uid"),
+                        user.get("sec_uid"),
+                        user.get("unique_id"),
+                        keyword,
+                        self.run,
+                    )
+                )
+
+        self._conn.executemany(
+            "INSERT INTO users"
+            " (key, digest, fields, uid, sec_uid, unique_id, keyword, last_seen_run, missing)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)"
+            " ON CONFLICT (key) DO UPDATE SET digest = excluded.digest,"
+            " fields = excluded.fields, uid = excluded.uid, sec_uid = excluded.sec_uid,"
+            " unique_id = excluded.unique_id, keyword = excluded.keyword,"
+            " last_seen_run = excluded.last_seen_run, missing = 0",
+            rows,
+        )
+
+        if changed:
+            self._unchanged_pages[keyword] = 0
+        else:
+            self._unchanged_pages[keyword] = self._unchanged_pages.get(keyword, 0) + 1
+        return changed
+
+    def should_stop(self, keyword: str) -> bool:
+        """
+        True once `keyword` had `stop_after_unchanged_pages` pages in a row with no changes.
+        """
+        return bool(
+            self.stop_after_unchanged_pages
+            and self._unchanged_pages.get(keyword, 0) >= self.stop_after_unchanged_pages
+        )
+
+    def finish_keyword(self, keyword: str, stop_reason: Optional[str], collected: int) -> None:
+        """
+        Note how a keyword ended, which decides whether it gets not-seen markers.
+        """
+        if stop_reason == "unchanged":
+            self.stopped_keywords.add(keyword)
+        elif stop_reason in COMPLETE_STOP_REASONS and collected:
+            self._complete_keywords.append(keyword)
+
+    def not_seen_markers(self) -> List[Dict[str, Any]]:
+        """
+        Markers for users last found under a fully read keyword but not seen this run.
+
+        Each user is reported once; it is flagged as missing and comes back
+        as an insert if it reappears later.
+        """
+        markers: List[Dict[str, Any]] = []
+        for keyword in self._complete_keywords:
+            rows = self._conn.execute(
+                "SELECT uid, sec_uid, unique_id FROM users"
+                " WHERE keyword = ? AND last_seen_run < ? AND missing = 0",
+                (keyword, self.run),
+            ).fetchall()
+            if not rows:
+                continue
+            self._conn.execute(
+                "UPDATE users SET missing = 1"
+                " WHERE keyword = ? AND last_seen_run < ? AND missing = 0",
+                (keyword, self.run),
+            )
+            for uid, sec_uid, unique_id in rows:
+                markers.append(
+                    {
+                        "uid": uid,
+                        "sec_uid": sec_uid,
+                        "unique_id": unique_id,
+                        "search_keyword": keyword,
+                        "change_type": "not_seen",
+                        "changes": None,
+                    }
+                )
+        self.stats["not_seen"] += len(markers)
+        return markers
+
+    def commit(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """
+        Close the database, discarding the run's changes unless `commit()` was called.
+        """
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+        self._conn.close()
+
+    def log_summary(self) -> None:
+        self.logger.info(
+            "Incremental run %d: %d inserts, %d updates, %d unchanged, %d not seen; "
+            "%d keywords stopped early",
+            self.run,
+            self.stats["inserts"],
+            self.stats["updates"],
+            self.stats["unchanged"],
+            self.stats["not_seen"],
+            len(self.stopped_keywords),
+        )
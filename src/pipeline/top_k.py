@@ -0,0 +1,88 @@
+import heapq
+import itertools
+import logging
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from extractors.utils_normalize import parse_count
+from pipeline.dedup import IDENTITY_FIELDS
+
+class TopKSelector:
+    """
+    The `k` users with the most followers across all keywords, in bounded memory.
+
+    Users are offered page by page; a min-heap keeps only the current top
+    `k`, so a run holds at most `k` records however many it parses. Once
+    the heap is full, `threshold` is the follower count a user must beat
+    to get in. Ties keep the user seen first. A user offered again (same
+    `uid`, `sec_uid` or `unique_id`) keeps its first slot, so the result
+    is distinct users even without cross-keyword dedup. Users without a
+    follower count are never selected.
+    """
+
+    def __init__(self, k: int, logger: Optional[logging.Logger] = None) -> None:
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self.logger = logger or logging.getLogger(__name__)
+        self.offered = 0
+        self._heap: List[Tuple[int, int, Tuple[str, ...], Any]] = []
+        self._held: Set[str] = set()
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def threshold(self) -> Optional[int]:
+        return self._heap[0][0] if len(self._heap) >= self.k else None
+
+    @staticmethod
+    def _identities(user: Any) -> Tuple[str, ...]:
+        return tuple(
+            f"{field}:{user.get(field)}" for field in IDENTITY_FIELDS if user.get(field)
+        )
+
+    def offer(self, users: Iterable[Any]) -> int:
+        """
+        Consider a page of users and return how many entered the top `k`.
+        """
+        admitted = 0
+        heap = self._heap
+        for user in users:
+            self.offered += 1
+            followers = user.get("follower_count")
+            if not isinstance(followers, int):
+                followers = parse_count(followers)
+            if followers is None:
+                continue
+            if len(heap) >= self.k and followers <= heap[0][0]:
+                continue
+            identities = self._identities(user)
+            if any(identity in self._held for identity in identities):
+                continue
+            # Later arrivals sort lower, so they are evicted first among equals
+            entry = (followers, -next(self._order), identities, user)
+            if len(heap) < self.k:
+                heapq.heappush(heap, entry)
+            else:
+                evicted = heapq.heapreplace(heap, entry)
+                for identity in evicted[2]:
+                    self._held.discard(identity)
+            self._held.update(identities)
+            admitted += 1
+        return admitted
+
+    def results(self) -> List[Any]:
+        """
+        The selected users, most followed first.
+        """
+        return [entry[3] for entry in sorted(self._heap, reverse=True)]
+
+    def log_summary(self) -> None:
+        self.logger.info(
+            "Top-%d selection: kept %d of %d offered users (threshold: %s followers)",
+            self.k,
+            len(self._heap),
+            self.offered,
+            self.threshold if self.threshold is not None else "none",
+        )
@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from pipeline.keyword_input import KeywordSpec
+
+class Lease(NamedTuple):
+    """
+    A keyword handed to a worker until `expires_at` (epoch seconds).
+    """
+
+    keyword: str
+    max_items: int
+    attempts: int
+    expires_at: float
+
+class KeywordQueue:
+    """
+    Durable keyword work queue shared by a coordinator and its workers.
+
+    Backed by one SQLite database (WAL mode), so any number of processes on
+    the same machine, or on hosts sharing a filesystem with working locks,
+    can use it at once. A keyword moves through these states:
+
+    - `pending`: waiting for a worker. Workers take the highest
+      `priority` first, then keywords in enqueue order.
+    - `leased`: held by one worker until its lease expires. Workers extend
+      the lease with `renew()` while they paginate. An expired lease is
+      handed to the next worker that asks, so a crashed worker's keywords
+      are retried automatically.
+    - `done`: finished; `shard` points at the worker's output file.
+    - `failed`: gave up after `max_attempts` leases, whether they ended in
+      `fail()` or expired (a keyword that keeps crashing its worker).
+
+    `complete()`, `renew()` and `fail()` only succeed for the worker that
+    currently holds the lease. A worker whose lease was reclaimed cannot
+    overwrite the result of the worker that took over.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 300.0,
+        max_attempts: int = 3,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, int(max_attempts))
+        self.logger = logger or logging.getLogger(__name__)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS keywords ("
+            " position INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " keyword TEXT NOT NULL UNIQUE,"
+            " max_items INTEGER NOT NULL,"
+            " priority INTEGER NOT NULL DEFAULT 0,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " worker_id TEXT,"
+            " lease_expires REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " shard TEXT,"
+            " records INTEGER,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(keywords)")}
+        if "priority" not in columns:
+            # Queues created before per-keyword priorities
+            self._conn.execute(
+                "ALTER TABLE keywords ADD COLUMN priority INTEGER NOT NULL DEFAULT 0"
+            )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS keywords_status ON keywords (status, lease_expires)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS keywords_lease"
+            " ON keywords (status, priority DESC, position)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def set_meta(self, values: Dict[str, Any]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in values.items()],
+        )
+
+    def get_meta(self) -> Dict[str, Any]:
+        rows = self._conn.execute("SELECT key, value FROM meta").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def _insert(self, rows: List[Tuple[str, int, int, float]]) -> int:
+        before = self._conn.total_changes
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO keywords (keyword, max_items, priority, updated_at)"
+                " VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return self._conn.total_changes - before
+
+    def enqueue(
+        self,
+        keywords: Iterable[Union[str, KeywordSpec]],
+        max_items: int,
+        batch_size: int = 10000,
+    ) -> Tuple[int, int]:
+        """
+        Add keywords that are not queued yet; returns (added, seen).
+
+        Entries may be plain keywords or KeywordSpecs with their own
+        `max_items` and priority. They are inserted `batch_size` at a time,
+        so the input is never held in memory as a whole.
+        """
+        added = 0
+        seen = 0
+        rows: List[Tuple[str, int, int, float]] = []
+        for entry in keywords:
+            spec = KeywordSpec(entry) if isinstance(entry, str) else entry
+            rows.append(
+                (
+                    spec.keyword,
+                    spec.max_items if spec.max_items is not None else max_items,
+                    spec.priority,
+                    time.time(),
+                )
+            )
+            if len(rows) >= batch_size:
+                added += self._insert(rows)
+                seen += len(rows)
+                rows = []
+        if rows:
+            added += self._insert(rows)
+            seen += len(rows)
+        return added, seen
+
+    def lease(self, worker_id: str) -> Optional[Lease]:
+        """
+        Atomically take the next pending (or expired) keyword for `worker_id`.
+
+        Expired leases that used the last attempt are marked failed instead.
+        """
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            exhausted = self._conn.execute(
+                "UPDATE keywords SET status = 'failed', worker_id = NULL, lease_expires = NULL,"
+                " error = 'lease expired', updated_at = ?"
+                " WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            ).rowcount
+            reclaimed = self._conn.execute(
+                "UPDATE keywords SET status = 'pending', worker_id = NULL, updated_at = ?"
+                " WHERE status = 'leased' AND lease_expires < ?",
+                (now, now),
+            ).rowcount
+            row = self._conn.execute(
+                "SELECT position, keyword, max_items, attempts FROM keywords"
+                " WHERE status = 'pending' ORDER BY priority DESC, position LIMIT 1"
+            ).fetchone()
+            lease: Optional[Lease] = None
+            if row is not None:
+                position, keyword, max_items, attempts = row
+                lease = Lease(keyword, max_items, attempts + 1, now + self.lease_seconds)
+                self._conn.execute(
+                    "UPDATE keywords SET status = 'leased', worker_id = ?, lease_expires = ?,"
+                    " attempts = attempts + 1, updated_at = ? WHERE position = ?",
+                    (worker_id, lease.expires_at, now, position),
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        if exhausted:
+            self.logger.warning(
+                "Gave up on %d keyword(s) whose last lease expired after %d attempts",
+                exhausted,
+                self.max_attempts,
+            )
+        if reclaimed:
+            self.logger.warning("Reclaimed %d expired keyword lease(s)", reclaimed)
+        return lease
+
+    def renew(self, worker_id: str, keyword: str) -> bool:
+        """
+        Extend the lease on `keyword`; False means it was lost to another worker.
+        """
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE keywords SET lease_expires = ?, updated_at = ?"
+            " WHERE keyword = ? AND worker_id = ? AND status = 'leased'",
+            (now + self.lease_seconds, now, keyword, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, worker_id: str, keyword: str, shard: str, records: int) -> bool:
+        cursor = self._conn.execute(
+            "UPDATE keywords SET status = 'done', shard = ?, records = ?, lease_expires = NULL,"
+            " error = NULL, updated_at = ?"
+            " WHERE keyword = ? AND worker_id = ? AND status = 'leased'",
+            (shard, records, time.time(), keyword, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, worker_id: str, keyword: str, error: str) -> None:
+        """
+        Release a keyword after an error: back to pending, or failed once out of attempts.
+        """
+        self._conn.execute(
+            "UPDATE keywords SET"
+            " status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+            " worker_id = NULL, lease_expires = NULL, error = ?, updated_at = ?"
+            " WHERE keyword = ? AND worker_id = ? AND status = 'leased'",
+            (self.max_attempts, error, time.time(), keyword, worker_id),
+        )
+
+    def counts(self) -> Dict[str, int]:
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for status, count in self._conn.execute(
+            "SELECT status, COUNT(*) FROM keywords GROUP BY status"
+        ):
+            counts[status] = count
+        return counts
+
+    def outstanding(self) -> int:
+        """
+        Keywords not finished yet (pending or leased).
+        """
+        counts = self.counts()
+        return counts["pending"] + counts["leased"]
+
+    def completed_shards(self) -> List[Dict[str, Any]]:
+        """
+        Finished keywords in enqueue order with their shard paths and record counts.
+        """
+        rows = self._conn.execute(
+            "SELECT keyword, shard, records FROM keywords WHERE status = 'done' ORDER BY position"
+        ).fetchall()
+        return [{"keyword": k, "shard": shard, "records": records} for k, shard, records in rows]
+
+    def failed_keywords(self) -> List[Dict[str, Any]]:
+        rows = self._conn.execute(
+            "SELECT keyword, attempts, error FROM keywords WHERE status = 'failed'"
+            " ORDER BY position"
+        ).fetchall()
+        return [{"keyword": k, "attempts": attempts, "error": error} for k, attempts, error in rows]
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,187 @@
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+class _KeywordYield:
+    __slots__ = ("curve", "requests", "stop_reason")
+
+    def __init__(self) -> None:
+        self.curve: List[int] = []
+        self.requests = 0
+        self.stop_reason: Optional[str] = None
+
+class YieldBudget:
+    """
+    Spends a run's page requests on the keywords that still find new users.
+
+    `record_page` is told, for every page, how many requests it cost and
+    how many of its users were new to the run (after deduplication). A
+    keyword's yield is the mean number of new users per request over its
+    last `window` pages, and its yield curve is that count page by page.
+
+    `should_stop(keyword)` is meant for the scraper's `stop_early` hook and
+    returns a stop reason, or None to keep paginating:
+
+    - `"budget"` once `max_requests` page requests were spent. No keyword
+      gets another page, and the caller should start no new keywords.
+    - `"low_yield"` when the keyword's yield fell below the bar. The bar is
+      `min_yield`, raised with a budget to the share of the budget spent
+      times the average yield of keywords' first pages. Late in the budget
+      a deep page must do about as well as opening a fresh keyword, so the
+      remaining requests go where they find the most new users. Once
+      `input_finished()` says no keywords are left, only `min_yield` applies.
+
+    Only keywords still paginating are tracked in full. The report keeps
+    the curves of the first `report_keywords` finished keywords; later
+    ones only add to the totals of `other_keywords` and the count of their
+    stop reason, so memory stays bounded on very long keyword lists.
+
+    Pages are counted when the consumer records them, so a concurrent run
+    can overshoot the budget by the requests already in flight. All
+    methods may be called from any thread.
+    """
+
+    def __init__(
+        self,
+        max_requests: Optional[int] = None,
+        min_yield: float = 0.0,
+        window: int = 2,
+        report_keywords: int = 1000,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.max_requests = max_requests or None
+        self.min_yield = max(0.0, float(min_yield))
+        self.window = max(1, int(window))
+        self.report_keywords = max(0, int(report_keywords))
+        self.logger = logger or logging.getLogger(__name__)
+        self.requests = 0
+        self.new_users = 0
+        # Keywords still paginating, and the finished ones kept for the report
+        self._keywords: Dict[str, _KeywordYield] = {}
+        self._finished: Dict[str, _KeywordYield] = {}
+        self._other = {"keywords": 0, "requests": 0, "new_users": 0}
+        self._stop_reasons: Dict[Optional[str], int] = {}
+        self._first_pages = 0
+        self._first_page_users = 0
+        self._input_finished = False
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.max_requests is not None and self.requests >= self.max_requests
+
+    def input_finished(self) -> None:
+        """
+        Note that every keyword has been started, so budget no longer has to be saved for new ones.
+        """
+        with self._lock:
+            self._input_finished = True
+
+    def record_page(
+        self,
+        keyword: str,
+        new_users: int,
+        requests: int = 1,
+        stop_reason: Optional[str] = None,
+        finished: bool = False,
+    ) -> None:
+        with self._lock:
+            stats = self._keywords.get(keyword)
+            if stats is None:
+                stats = self._keywords[keyword] = _KeywordYield()
+            if requests:
+                if not stats.curve:
+                    self._first_pages += 1
+                    self._first_page_users += new_users
+                stats.curve.append(new_users)
+                stats.requests += requests
+                self.requests += requests
+            self.new_users += new_users
+            if finished:
+                stats.stop_reason = stop_reason
+                del self._keywords[keyword]
+                self._stop_reasons[stop_reason] = self._stop_reasons.get(stop_reason, 0) + 1
+                if len(self._finished) < self.report_keywords:
+                    self._finished[keyword] = stats
+                else:
+                    self._other["keywords"] += 1
+                    self._other["requests"] += stats.requests
+                    self._other["new_users"] += sum(stats.curve)
+
+    def _bar(self) -> float:
+        bar = self.min_yield
+        if self.max_requests is not None and not self._input_finished and self._first_pages:
+            spent = min(self.requests / self.max_requests, 1.0)
+            bar = max(bar, spent * self._first_page_users / self._first_pages)
+        return bar
+
+    def should_stop(self, keyword: str) -> Optional[str]:
+        with self._lock:
+            if self.exhausted:
+                return "budget"
+            stats = self._keywords.get(keyword)
+            if stats is None or len(stats.curve) < self.window:
+                return None
+            recent = stats.curve[-self.window:]
+            if sum(recent) / len(recent) < self._bar():
+                return "low_yield"
+        return None
+
+    def keyword_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Totals and curve of each finished keyword kept for the report and each one still running.
+        """
+        with self._lock:
+            return {
+                keyword: {
+                    "requests": stats.requests,
+                    "new_users": sum(stats.curve),
+                    "yield": round(sum(stats.curve) / stats.requests, 3) if stats.requests else 0.0,
+                    "curve": list(stats.curve),
+                    "stop_reason": stats.stop_reason,
+                }
+                for keyword, stats in [*self._finished.items(), *self._keywords.items()]
+            }
+
+    def summary(self) -> Dict[str, Any]:
+        keywords = self.keyword_stats()
+        return {
+            "max_requests": self.max_requests,
+            "min_yield": self.min_yield,
+            "window": self.window,
+            "requests": self.requests,
+            "new_users": self.new_users,
+            "yield": round(self.new_users / self.requests, 3) if self.requests else 0.0,
+            "keywords": keywords,
+            "other_keywords": dict(self._other),
+            "stop_reasons": {str(reason): count for reason, count in self._stop_reasons.items()},
+        }
+
+    def write_report(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2, ensure_ascii=False)
+
+    def log_summary(self) -> None:
+        keywords = self.keyword_stats()
+        stopped = self._stop_reasons.get("low_yield", 0)
+        self.logger.info(
+            "Yield: %d new users from %d requests (%.1f per request)%s; "
+            "%d of %d keywords stopped for low yield",
+            self.new_users,
+            self.requests,
+            self.new_users / self.requests if self.requests else 0.0,
+            f", budget {self.max_requests}" if self.max_requests is not None else "",
+            stopped,
+            len(keywords) + self._other["keywords"],
+        )
+        for keyword, stats in keywords.items():
+            self.logger.info(
+                "Yield keyword '%s': requests=%d new=%d yield=%.1f curve=%s stop=%s",
+                keyword,
+                stats["requests"],
+                stats["new_users"],
+                stats["yield"],
+                ",".join(str(count) for count in stats["curve"]),
+                stats["stop_reason"],
+            )
@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT_DIR, "src"), os.path.join(ROOT_DIR, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
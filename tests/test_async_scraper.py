@@ -0,0 +1,40 @@
+from typing import Any, Dict, List
+
+import pytest
+
+from extractors.async_scraper import AsyncTikTokUserScraper
+from extractors.fast_decoder import as_plain_dict
+from extractors.tiktok_parser import TikTokUserScraper
+from fake_server import FakeTikTokServer
+
+KEYWORDS = [f"kw{i}" for i in range(6)]
+
+@pytest.fixture(scope="module")
+def server():
+    with FakeTikTokServer(latency=0.005, results_per_keyword=120, max_page_size=30) as fake_server:
+        yield fake_server
+
+def _sequential(url: str, max_items: int) -> Dict[str, List[Dict[str, Any]]]:
+    scraper = TikTokUserScraper(url, "test", sleep_between_requests=0)
+    records: Dict[str, List[Dict[str, Any]]] = {}
+    for keyword in KEYWORDS:
+        for page in scraper.iter_user_pages(keyword, max_items):
+            records.setdefault(keyword, []).extend(map(as_plain_dict, page.users))
+    return records
+
+def _concurrent(url: str, max_items: int, **kwargs: Any) -> Dict[str, List[Dict[str, Any]]]:
+    scraper = AsyncTikTokUserScraper(url, "test", sleep_between_requests=0, **kwargs)
+    records: Dict[str, List[Dict[str, Any]]] = {}
+    for page in scraper.iter_many(KEYWORDS, max_items):
+        records.setdefault(page.keyword, []).extend(map(as_plain_dict, page.users))
+    return records
+
+@pytest.mark.parametrize("max_items", [50, 120, 500])
+@pytest.mark.parametrize("prefetch_depth", [0, 2])
+def test_concurrent_records_match_sequential(server, max_items, prefetch_depth):
+    expected = _sequential(server.url, max_items)
+
+    records = _concurrent(server.url, max_items, max_concurrency=4, prefetch_depth=prefetch_depth)
+
+    assert records == expected
+    assert all(len(users) == min(max_items, 120) for users in records.values())
@@ -0,0 +1,24 @@
+from pipeline.dedup import DedupIndex
+
+def _users(start: int, count: int):
+    return [
+        {"uid": str(index), "sec_uid": f"MS4w{index}", "unique_id": f"user{index}"}
+        for index in range(start, start + count)
+    ]
+
+def test_bloom_false_duplicate_rate_at_capacity():
+    expected_items = 20000
+    false_positive_rate = 0.01
+    dedup = DedupIndex("bloom", expected_items, false_positive_rate)
+
+    kept = sum(len(dedup.filter_page("kw", _users(start, 1000))) for start in range(0, 20000, 1000))
+
+    false_duplicate_rate = 1 - kept / expected_items
+    assert false_duplicate_rate < 2 * false_positive_rate
+
+def test_bloom_drops_users_seen_under_any_identifier():
+    dedup = DedupIndex("bloom", 1000, 0.001)
+    dedup.filter_page("a", _users(0, 10))
+
+    again = [{"uid": "3"}, {"sec_uid": "MS4w4"}, {"unique_id": "user5"}, {"uid": "new"}]
+    assert dedup.filter_page("b", again) == [{"uid": "new", "search_keywords": ["b"]}]